@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+As-Of Alignment of Sensor Streams
+Joins any number of sensor streams onto one time grid with searchsorted on int64 timestamps, with an on-disk cache
+"""
+
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (CACHE_DIR_NAME, HOURLY_FILE, HUMIDITY_FILE, TEMPERATURE_FILE, load_hourly, load_humidity,
+                         load_temperature, resolve_data_dir)
+
+DEFAULT_TOLERANCE = pd.Timedelta('1h')
+DIRECTIONS = ('backward', 'forward', 'nearest')
+ALIGNED_CACHE_VERSION = 1
+
+# sensor file -> (loader, columns joined onto the hourly voltage grid)
+SENSOR_STREAMS = {
+    TEMPERATURE_FILE: (load_temperature, ['Temp_Midpoint']),
+    HUMIDITY_FILE: (load_humidity, ['Humidity']),
+}
+
+
+def _epoch_ns(datetimes):
+    # Naive datetimes of any unit as int64 ns; a no-copy view when already datetime64[ns]
+    return np.asarray(datetimes, dtype='datetime64[ns]').view(np.int64)
+
+
+def asof_indices(grid_ns, t_ns, tolerance=None, direction='backward'):
+    """Row of `t_ns` (sorted int64) matched to each grid time, or -1 where there is none.
+
+    Same rules as pd.merge_asof: 'backward' takes the last row at or before
+    the grid time, 'forward' the first at or after, 'nearest' the closer of
+    the two (backward on ties). A match further than `tolerance` away is
+    dropped. The grid need not be sorted.
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {DIRECTIONS}, got {direction!r}")
+    grid_ns = np.asarray(grid_ns, dtype=np.int64)
+    n = len(t_ns)
+    if n == 0:
+        return np.full(len(grid_ns), -1, dtype=np.int64)
+
+    if direction != 'forward':
+        back = np.searchsorted(t_ns, grid_ns, side='right') - 1
+        back_ok = back >= 0
+        back_dist = grid_ns - t_ns[np.maximum(back, 0)]
+    if direction != 'backward':
+        fwd = np.searchsorted(t_ns, grid_ns, side='left')
+        fwd_ok = fwd < n
+        fwd_dist = t_ns[np.minimum(fwd, n - 1)] - grid_ns
+
+    if direction == 'backward':
+        idx, ok, dist = back, back_ok, back_dist
+    elif direction == 'forward':
+        idx, ok, dist = fwd, fwd_ok, fwd_dist
+    else:
+        use_fwd = fwd_ok & (~back_ok | (fwd_dist < back_dist))
+        idx = np.where(use_fwd, fwd, back)
+        ok = use_fwd | back_ok
+        dist = np.where(use_fwd, fwd_dist, back_dist)
+    if tolerance is not None:
+        ok &= dist <= pd.Timedelta(tolerance).value
+    return np.where(ok, idx, -1)
+
+
+def align(base, streams, tolerance=DEFAULT_TOLERANCE, direction='backward', time_col='Datetime'):
+    """`base` with the given columns of every stream joined as of its timestamps.
+
+    `streams` is a list of (frame, columns) pairs. Each stream's timestamps
+    are converted to int64 once and sorted only if they are out of order, and
+    its match for every base row is one pair of searchsorted calls, so N
+    streams cost N passes with no re-sorting of `base`, which keeps its row
+    order. Unmatched rows get NaN (or the column's missing value).
+    """
+    grid_ns = _epoch_ns(base[time_col])
+    out = base.copy()
+    for frame, columns in streams:
+        clash = [c for c in columns if c in out.columns]
+        if clash:
+            raise ValueError(f"columns already present on the grid: {clash}")
+        t_ns = _epoch_ns(frame[time_col])
+        rows = np.arange(len(t_ns))
+        if len(t_ns) > 1 and (t_ns[1:] < t_ns[:-1]).any():
+            rows = np.argsort(t_ns, kind='stable')
+            t_ns = t_ns[rows]
+        idx = asof_indices(grid_ns, t_ns, tolerance, direction)
+        take = np.full(len(idx), -1, dtype=np.int64)
+        hit = idx >= 0
+        take[hit] = rows[idx[hit]]
+        for column in columns:
+            values = pd.api.extensions.take(frame[column].to_numpy(), take, allow_fill=True)
+            out[column] = values
+    return out
+
+
+# ============================================================================
+# CACHED SENSOR ALIGNMENT
+# ============================================================================
+
+def _source_stamps(data_dir):
+    stamps = {}
+    for filename in [HOURLY_FILE, *SENSOR_STREAMS]:
+        path = data_dir / filename
+        if path.exists():
+            st = path.stat()
+            stamps[filename] = [st.st_mtime_ns, st.st_size]
+    return stamps
+
+
+def load_aligned(data_dir=None, tolerance=DEFAULT_TOLERANCE, direction='backward', use_cache=True):
+    """Hourly voltage with Temp_Midpoint and Humidity joined as of each hour.
+
+    Every voltage row is kept (sensor columns are NaN where no reading is
+    within `tolerance`), so the correlation, diurnal and humidity analyses
+    can each drop what they need. The result is cached in the data
+    directory's .cache and reused until one of the exports changes.
+    """
+    data_dir = resolve_data_dir(data_dir)
+    tolerance = pd.Timedelta(tolerance)
+    cache_dir = data_dir / CACHE_DIR_NAME
+    data_path = cache_dir / f'aligned.{direction}.{tolerance.value}.pkl'
+    meta_path = data_path.with_suffix('.json')
+    meta = {'version': ALIGNED_CACHE_VERSION, 'sources': _source_stamps(data_dir)}
+
+    if use_cache and data_path.exists() and meta_path.exists():
+        try:
+            if json.loads(meta_path.read_text()) == meta:
+                with open(data_path, 'rb') as f:
+                    return pickle.load(f)
+        except (OSError, ValueError, pickle.UnpicklingError):
+            pass
+
+    streams = [(loader(data_dir), columns) for filename, (loader, columns) in SENSOR_STREAMS.items()
+               if filename in meta['sources']]
+    aligned = align(load_hourly(data_dir), streams, tolerance, direction)
+    for _, columns in SENSOR_STREAMS.values():
+        for column in columns:
+            if column not in aligned.columns:
+                aligned[column] = np.nan   # export missing for this bank
+
+    if use_cache:
+        try:
+            cache_dir.mkdir(exist_ok=True)
+            with open(data_path, 'wb') as f:
+                pickle.dump(aligned, f, protocol=pickle.HIGHEST_PROTOCOL)
+            meta_path.write_text(json.dumps(meta))
+        except OSError:
+            # Read-only data directory: the cache is an optimisation, not a requirement
+            pass
+    return aligned
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Online Anomaly Detector
+Streaming robust baselines with pluggable rules for voltage dips, spread spikes, EMI events and step changes
+"""
+
+import argparse
+import csv
+import math
+import os
+from collections import deque
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DEFAULT_DATA_DIR, load_hourly, resolve_data_dir
+from quantization import ADC_STEP_MV
+
+MAD_TO_SD = 1.4826          # median absolute deviation -> standard deviation (normal data)
+MEAN_AD_TO_SD = 1.2533      # mean absolute deviation -> standard deviation (normal data)
+MIN_SCALE_MV = ADC_STEP_MV / 2  # scales never drop below half an ADC step
+
+EVENT_COLUMNS = ['Bank', 'Datetime', 'Rule', 'Value', 'Threshold', 'Detail']
+
+# Events per rule from the default rules and EWMA baselines on the shipped
+# Data/ export (`anomaly.py --check`). The three step changes are the
+# recharge after the November test (onset Nov 5), the settling after it
+# (Nov 9) and the post-Eco drop (Dec 26); more means wander is reported.
+REFERENCE_EVENTS = {'min_dip': 2, 'spread_spike': 9, 'emi': 3, 'step_change': 3}
+
+
+class AnomalyEvent(NamedTuple):
+    bank: str
+    time: pd.Timestamp
+    rule: str
+    value: float       # mV for spreads and changes, V for voltages
+    threshold: float   # same units as value
+    detail: str
+
+
+# ============================================================================
+# ROBUST BASELINES (O(1) PER SAMPLE)
+# ============================================================================
+
+class RobustEWMA:
+    """Exponentially weighted centre and scale with winsorized updates.
+
+    Each sample is clipped to centre ± `clip` scales before it is folded in,
+    so a spike moves the baseline by at most a few scales however large it
+    is. The scale is an EWMA of absolute deviations converted to a standard
+    deviation. Values are in mV.
+    """
+
+    def __init__(self, alpha=0.05, clip=3.0, warmup=24, min_scale=MIN_SCALE_MV):
+        self.alpha = alpha
+        self.clip = clip
+        self.warmup = warmup
+        self.min_scale = min_scale
+        self.n = 0
+        self._center = 0.0
+        self._abs_dev = 0.0
+
+    @property
+    def ready(self):
+        return self.n >= self.warmup
+
+    @property
+    def center(self):
+        return self._center
+
+    @property
+    def scale(self):
+        return max(self._abs_dev * MEAN_AD_TO_SD, self.min_scale)
+
+    def update(self, x):
+        self.n += 1
+        if self.n == 1:
+            self._center = x
+            return
+        # Plain running averages until warm, then a fixed forgetting rate
+        alpha = max(self.alpha, 1 / self.n) if self.n <= self.warmup else self.alpha
+        if self.n > 2:
+            bound = self.clip * self.scale
+            x = min(max(x, self._center - bound), self._center + bound)
+        dev = abs(x - self._center)
+        self._center += alpha * (x - self._center)
+        self._abs_dev += alpha * (dev - self._abs_dev)
+
+    def reset(self, x):
+        """Re-centre on `x` keeping the scale (after a confirmed level shift)."""
+        self._center = x
+
+
+class WindowMedianMAD:
+    """Median and MAD over the last `window` samples (a fixed-size ring buffer).
+
+    Each update costs O(window) however long the stream is.
+    """
+
+    def __init__(self, window=48, warmup=24, min_scale=MIN_SCALE_MV):
+        self.window = window
+        self.warmup = warmup
+        self.min_scale = min_scale
+        self.buffer = deque(maxlen=window)
+        self._center = 0.0
+        self._scale = min_scale
+
+    @property
+    def n(self):
+        return len(self.buffer)
+
+    @property
+    def ready(self):
+        return self.n >= self.warmup
+
+    @property
+    def center(self):
+        return self._center
+
+    @property
+    def scale(self):
+        return self._scale
+
+    def update(self, x):
+        self.buffer.append(x)
+        values = np.fromiter(self.buffer, dtype=np.float64, count=len(self.buffer))
+        self._center = float(np.median(values))
+        mad = float(np.median(np.abs(values - self._center)))
+        self._scale = max(mad * MAD_TO_SD, self.min_scale)
+
+    def reset(self, x):
+        self.buffer.clear()
+        self.update(x)
+
+
+BASELINES = {'ewma': RobustEWMA, 'median': WindowMedianMAD}
+
+
+class Sample(NamedTuple):
+    time: pd.Timestamp
+    min_mv: float
+    max_mv: float
+
+    @property
+    def spread_mv(self):
+        return self.max_mv - self.min_mv
+
+
+# ============================================================================
+# RULES
+# ============================================================================
+
+class Rule:
+    """A test applied to each sample against the bank's baselines.
+
+    `check` returns (value, threshold, detail) when the rule fires and None
+    otherwise. The baselines hold the state *before* the sample is folded
+    in. A rule that stays true over consecutive samples is reported once,
+    at onset.
+    """
+    name = 'rule'
+
+    def check(self, sample, baselines):
+        raise NotImplementedError
+
+
+class MinDip(Rule):
+    """Min below an absolute floor (section 5: Min < 13.20 V)."""
+    name = 'min_dip'
+
+    def __init__(self, floor_v=13.20):
+        self.floor_mv = floor_v * 1000
+
+    def check(self, sample, baselines):
+        if sample.min_mv < self.floor_mv:
+            return (sample.min_mv / 1000, self.floor_mv / 1000,
+                    f"Min={sample.min_mv / 1000:.2f}V, Max={sample.max_mv / 1000:.2f}V")
+
+
+class SpreadSpike(Rule):
+    """Spread above the robust baseline by `k` scales and above `floor_mv`."""
+    name = 'spread_spike'
+
+    def __init__(self, k=3.0, floor_mv=60.0):
+        self.k = k
+        self.floor_mv = floor_mv
+
+    def check(self, sample, baselines):
+        spread = baselines['spread']
+        threshold = self.floor_mv
+        if spread.ready:
+            threshold = max(threshold, spread.center + self.k * spread.scale)
+        if sample.spread_mv > threshold:
+            return sample.spread_mv, threshold, f"typical {spread.center:.1f}mV"
+
+
+class EMISignature(Rule):
+    """Dec 19 pattern: Min dips sharply while Max holds its level.
+
+    A real load pulls both envelopes down, whereas interference on the
+    measurement line shows as a one-sided Min excursion.
+    """
+    name = 'emi'
+
+    def __init__(self, min_drop_mv=25.0, max_hold_mv=10.0, k=4.0):
+        self.min_drop_mv = min_drop_mv
+        self.max_hold_mv = max_hold_mv
+        self.k = k
+
+    def check(self, sample, baselines):
+        vmin, vmax = baselines['min'], baselines['max']
+        if not (vmin.ready and vmax.ready):
+            return None
+        drop = vmin.center - sample.min_mv
+        threshold = max(self.min_drop_mv, self.k * vmin.scale)
+        if drop > threshold and abs(sample.max_mv - vmax.center) <= self.max_hold_mv:
+            return drop, threshold, f"Min={sample.min_mv / 1000:.2f}V, Max held at {sample.max_mv / 1000:.2f}V"
+
+
+class StepChange(Rule):
+    """Level shift in Min (e.g. Eco Mode) that holds against a frozen baseline.
+
+    Onset is a `shift_mv` difference between adjacent `window`-sample means
+    (running sums keep that O(1); with 24-hour windows the diurnal swing
+    cancels). The older mean is then frozen as the base, and the shift is
+    reported only once the newer mean has stayed more than `shift_mv` past
+    it, in the same direction, for `persist` samples. During stasis Min
+    wanders by up to ~20 mV between adjacent days, but the wander reverts
+    within 1-3 days, whereas a real step (Eco Mode, a charge or discharge)
+    stays put. The defaults (8 mV held for 4 days) report exactly three
+    steps on Data/ (see REFERENCE_EVENTS): the recharge after the November
+    test, the settling after it and the post-Eco drop. The Eco step itself
+    (~7.5 mV on Dec 23) is no larger than a day of wander, so it is only
+    confirmed once the level settles ~14 mV lower from Dec 26. The report
+    lags the onset by `persist` samples; the detail gives the onset time.
+    The Min and Max baselines are re-centred on the new level when it is
+    reported, so it is not also reported as a run of dips.
+    """
+    name = 'step_change'
+
+    def __init__(self, shift_mv=8.0, window=24, persist=96):
+        self.shift_mv = shift_mv
+        self.window = window
+        self.persist = persist
+        self._values = deque(maxlen=2 * window)
+        self._old = 0.0   # sum of the older window
+        self._new = 0.0   # sum of the newer window
+        self._pending = None  # (base mV, direction, onset time) of an unconfirmed shift
+        self._held = 0
+
+    def check(self, sample, baselines):
+        values, w = self._values, self.window
+        if len(values) == 2 * w:
+            self._old -= values[0]
+        if len(values) >= w:
+            self._old += values[-w]
+            self._new -= values[-w]
+        values.append(sample.min_mv)
+        self._new += sample.min_mv
+        if len(values) < 2 * w:
+            return None
+        new = self._new / w
+        if self._pending is None:
+            shift = new - self._old / w
+            if abs(shift) > self.shift_mv:
+                self._pending = (self._old / w, 1 if shift > 0 else -1, sample.time)
+                self._held = 1
+            return None
+
+        base, direction, onset = self._pending
+        shift = new - base
+        if shift * direction <= self.shift_mv:
+            self._pending = None   # reverted: wander, not a step
+            return None
+        self._held += 1
+        if self._held < self.persist:
+            return None
+        # Confirmed: move both baselines onto the new level and re-arm
+        self._pending = None
+        offset = new - baselines['min'].center
+        baselines['min'].reset(baselines['min'].center + offset)
+        baselines['max'].reset(baselines['max'].center + offset)
+        return shift, self.shift_mv, f"{base / 1000:.3f}V -> {new / 1000:.3f}V since {onset:%Y-%m-%d %H:%M}"
+
+
+def default_rules():
+    """The report's checks: Min dips, spread spikes, EMI events and step changes."""
+    return [MinDip(), SpreadSpike(), EMISignature(), StepChange()]
+
+
+# ============================================================================
+# DETECTOR
+# ============================================================================
+
+class AnomalyDetector:
+    """Per-bank streaming detector: O(1) baseline updates plus a rule pass per sample.
+
+    Feed hourly envelopes with update(time, min_v, max_v), or raw readings
+    with update(time, v). Events are appended to `events` and, when given,
+    to `log`.
+    """
+
+    def __init__(self, bank='bank', rules=None, baseline='ewma', log=None, **baseline_kwargs):
+        self.bank = bank
+        self.rules = default_rules() if rules is None else rules
+        make = BASELINES[baseline]
+        self.baselines = {key: make(**baseline_kwargs) for key in ('min', 'max', 'spread')}
+        self.events = []
+        self.log = log
+        self._active = set()
+
+    def update(self, time, min_v, max_v=None):
+        """Test one sample against the rules, then fold it into the baselines."""
+        max_v = min_v if max_v is None else max_v
+        if math.isnan(min_v) or math.isnan(max_v):
+            return []
+        sample = Sample(pd.Timestamp(time), min_v * 1000, max_v * 1000)
+        fired = []
+        for rule in self.rules:
+            hit = rule.check(sample, self.baselines)
+            if hit is None:
+                self._active.discard(rule.name)
+                continue
+            if rule.name in self._active:
+                continue
+            self._active.add(rule.name)
+            value, threshold, detail = hit
+            fired.append(AnomalyEvent(self.bank, sample.time, rule.name, value, threshold, detail))
+
+        self.baselines['min'].update(sample.min_mv)
+        self.baselines['max'].update(sample.max_mv)
+        self.baselines['spread'].update(sample.spread_mv)
+        self.events.extend(fired)
+        if self.log is not None:
+            self.log.write(fired)
+        return fired
+
+    def replay(self, times, min_v, max_v=None):
+        """Feed a whole series in order; returns the events it raised."""
+        max_v = min_v if max_v is None else max_v
+        fired = []
+        for time, lo, hi in zip(pd.DatetimeIndex(times), np.asarray(min_v, dtype=float).tolist(),
+                                np.asarray(max_v, dtype=float).tolist()):
+            fired.extend(self.update(time, lo, hi))
+        return fired
+
+
+class FleetDetector:
+    """One AnomalyDetector per bank, sharing a rule factory and an event log."""
+
+    def __init__(self, rules=default_rules, log=None, **detector_kwargs):
+        self.rules = rules
+        self.log = log
+        self.detector_kwargs = detector_kwargs
+        self.detectors = {}
+
+    def detector(self, bank):
+        if bank not in self.detectors:
+            self.detectors[bank] = AnomalyDetector(bank, self.rules(), log=self.log, **self.detector_kwargs)
+        return self.detectors[bank]
+
+    def update(self, bank, time, min_v, max_v=None):
+        return self.detector(bank).update(time, min_v, max_v)
+
+    @property
+    def events(self):
+        return sorted((e for d in self.detectors.values() for e in d.events), key=lambda e: e.time)
+
+
+class EventLog:
+    """Append-only CSV event log; the header is written once per file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._header = not os.path.exists(path) or os.path.getsize(path) == 0
+
+    def write(self, events):
+        if not events:
+            return
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if self._header:
+                writer.writerow(EVENT_COLUMNS)
+                self._header = False
+            for e in events:
+                writer.writerow([e.bank, e.time.isoformat(), e.rule, f'{e.value:.4f}', f'{e.threshold:.4f}', e.detail])
+
+
+def events_frame(events):
+    """Events as a DataFrame with EVENT_COLUMNS."""
+    return pd.DataFrame([tuple(e) for e in events], columns=EVENT_COLUMNS)
+
+
+def detect_hourly(hourly, bank='bank', **detector_kwargs):
+    """Replay an hourly Min/Max frame through a fresh detector."""
+    detector = AnomalyDetector(bank, **detector_kwargs)
+    return detector.replay(hourly['Datetime'], hourly['Min'], hourly['Max'])
+
+
+def check_reference(data_dir=DEFAULT_DATA_DIR):
+    """Differences between the events on `data_dir` and REFERENCE_EVENTS, as {rule: (expected, found)}."""
+    hourly = load_hourly(data_dir)
+    events = detect_hourly(hourly, Path(data_dir).name)
+    found = {name: 0 for name in REFERENCE_EVENTS}
+    for e in events:
+        found[e.rule] = found.get(e.rule, 0) + 1
+    return {name: (REFERENCE_EVENTS.get(name, 0), n) for name, n in found.items()
+            if n != REFERENCE_EVENTS.get(name, 0)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay hourly exports through the streaming anomaly detector')
+    parser.add_argument('data_dirs', nargs='*', help='bank data directories (default: $LIFEPO4_DATA_DIR or Data/)')
+    parser.add_argument('--baseline', choices=sorted(BASELINES), default='ewma')
+    parser.add_argument('--log', default=None, help='append events to this CSV')
+    parser.add_argument('--check', action='store_true',
+                        help='verify the event counts on the shipped Data/ export and exit')
+    args = parser.parse_args()
+
+    if args.check:
+        mismatches = check_reference()
+        for name, (expected, found) in mismatches.items():
+            print(f"{name}: expected {expected} events on Data/, found {found}")
+        if mismatches:
+            raise SystemExit(1)
+        print(f"Data/ matches the reference: {sum(REFERENCE_EVENTS.values())} events")
+        return
+
+    log = EventLog(args.log) if args.log else None
+    fleet = FleetDetector(log=log, baseline=args.baseline)
+    for data_dir in args.data_dirs or [None]:
+        path = resolve_data_dir(data_dir)
+        hourly = load_hourly(path)
+        fleet.detector(path.name).replay(hourly['Datetime'], hourly['Min'], hourly['Max'])
+
+    events = events_frame(fleet.events)
+    print(f"{len(events)} events from {len(fleet.detectors)} bank(s)")
+    if len(events):
+        print(events.to_string(index=False, float_format=lambda v: f'{v:.3f}'))
+
+
+if __name__ == '__main__':
+    main()
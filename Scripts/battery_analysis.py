@@ -11,6 +11,18 @@ from scipy import stats
 import warnings
 warnings.filterwarnings('ignore')
 
+from align import load_aligned
+from anomaly import detect_hourly, events_frame
+from bootstrap import HOURLY_BLOCK, bootstrap_mean, bootstrap_slope
+from data_loader import load_hourly, load_temperature, load_humidity, open_raw_history
+from instrument import tracer_from_env
+from ma60 import MA60Aggregator
+from phases import load_phases
+from thermal_rls import DEFAULT_FORGETTING, ThermalRLS
+
+# Section timings; set LIFEPO4_TRACE=trace.json (and LIFEPO4_PROFILE=dir) to record them
+tracer = tracer_from_env()
+
 # ============================================================================
 # LOAD ALL DATA
 # ============================================================================
@@ -20,45 +32,44 @@ print("12V 500Ah LiFePO4 SYSTEM - COMPREHENSIVE DATA VERIFICATION")
 print("Analysis Date: January 8, 2026")
 print("=" * 80)
 
-# Load hourly aggregated data
-hourly_df = pd.read_csv('/mnt/user-data/uploads/combined_output.csv')
-hourly_df['Datetime'] = pd.to_datetime(hourly_df['Date'] + ' ' + hourly_df['Time'], 
-                                        format='%d/%m/%Y %H:%M')
-hourly_df = hourly_df.sort_values('Datetime')
-hourly_df['Midpoint'] = (hourly_df['Min'] + hourly_df['Max']) / 2
-
-# Load high-frequency data
-hf_df = pd.read_csv('/mnt/user-data/uploads/history.csv')
-# Filter out non-numeric values (e.g., 'unavailable')
-hf_df = hf_df[pd.to_numeric(hf_df['state'], errors='coerce').notna()]
-hf_df['Datetime'] = pd.to_datetime(hf_df['last_changed'])
-hf_df['voltage'] = hf_df['state'].astype(float)
-hf_df = hf_df.sort_values('Datetime')
-
-# Load temperature data
-temp_df = pd.read_csv('/mnt/user-data/uploads/Combined_Temperature_Data.csv')
-temp_df['Datetime'] = pd.to_datetime(temp_df['Date'] + ' ' + temp_df['Time'], 
-                                      format='%d/%m/%Y %H:%M')
-temp_df['Temp_Midpoint'] = (temp_df['Min'] + temp_df['Max']) / 2
-temp_df = temp_df.sort_values('Datetime')
-
-# Load humidity data
-humid_df = pd.read_csv('/mnt/user-data/uploads/Combined_Humidity_Data.csv')
-humid_df['Datetime'] = pd.to_datetime(humid_df['Date'] + ' ' + humid_df['Time'], 
-                                       format='%d/%m/%Y %H:%M')
-humid_df = humid_df.sort_values('Datetime')
+tracer.mark('Load data')
+hourly_df = load_hourly()
+# Raw readings stay memory-mapped (int64 ns / int16 counts); sections slice only what they need
+raw_history = open_raw_history()
+temp_df = load_temperature()
+humid_df = load_humidity()
+tracer.rows(len(hourly_df) + len(temp_df) + len(humid_df))
+
+# Phase windows are sliced by row bounds computed once per frame
+phases = load_phases()
+hourly_phases = phases.index(hourly_df)
+
+# Drift and spread intervals: moving-block bootstrap over day-long blocks, so
+# the diurnal and thermal autocorrelation in hourly residuals is kept
+BOOTSTRAP_SEED = 0
+
+def drift_trend(frame):
+    """OLS trend of Midpoint in mV/day with its block-bootstrap 95% CI."""
+    return bootstrap_slope(frame['Datetime'], frame['Midpoint'] * 1000,
+                           block_len=HOURLY_BLOCK, seed=BOOTSTRAP_SEED)
+
+def spread_mean(spread):
+    """Mean spread in mV with its block-bootstrap 95% CI."""
+    return bootstrap_mean(spread * 1000, block_len=HOURLY_BLOCK, seed=BOOTSTRAP_SEED)
 
 print(f"\n📊 DATA COVERAGE:")
 print(f"   Hourly data: {hourly_df['Datetime'].min()} to {hourly_df['Datetime'].max()}")
-print(f"   High-freq data: {hf_df['Datetime'].min()} to {hf_df['Datetime'].max()}")
+if raw_history is not None:
+    print(f"   High-freq data: {raw_history.start} to {raw_history.end}")
 print(f"   Temperature data: {temp_df['Datetime'].min()} to {temp_df['Datetime'].max()}")
 print(f"   Total hourly records: {len(hourly_df)}")
-print(f"   Total high-freq records: {len(hf_df)}")
+print(f"   Total high-freq records: {len(raw_history) if raw_history is not None else 0}")
 
 # ============================================================================
 # SECTION 1: VERIFY REPORT CLAIMS
 # ============================================================================
 
+tracer.mark('1. Verify report claims', rows=len(hourly_df))
 print("\n" + "=" * 80)
 print("SECTION 1: VERIFICATION OF REPORT V8.2 CLAIMS")
 print("=" * 80)
@@ -66,8 +77,7 @@ print("=" * 80)
 # 1.1 Verify "100% Resting" voltage claim (13.33V at 65°F)
 print("\n📌 CLAIM 1: '13.33V is the true 100% Resting voltage at 65°F'")
 # Look at settlement period (Nov 4 - Nov 22)
-settlement = hourly_df[(hourly_df['Datetime'] >= '2025-11-08') & 
-                       (hourly_df['Datetime'] <= '2025-11-22')]
+settlement = hourly_phases['settled_stasis']
 if len(settlement) > 0:
     settlement_mean = settlement['Midpoint'].mean()
     settlement_end = settlement.tail(48)['Midpoint'].mean()  # Last 2 days
@@ -78,8 +88,8 @@ if len(settlement) > 0:
 # 1.2 Verify "Winter Drift" (~90mV over 55 days)
 print("\n📌 CLAIM 2: 'Winter Drift of ~90mV over 55 days'")
 # Nov 22 to Dec 23 is the original period
-drift_start = hourly_df[hourly_df['Datetime'].dt.date == pd.Timestamp('2025-11-22').date()]
-drift_end = hourly_df[hourly_df['Datetime'].dt.date == pd.Timestamp('2025-12-22').date()]
+drift_start = hourly_phases.day(phases.event('drift_start'))
+drift_end = hourly_phases.day('2025-12-22')
 if len(drift_start) > 0 and len(drift_end) > 0:
     v_start = drift_start['Midpoint'].mean()
     v_end = drift_end['Midpoint'].mean()
@@ -89,23 +99,24 @@ if len(drift_start) > 0 and len(drift_end) > 0:
     print(f"   Nov 22 mean: {v_start:.4f}V")
     print(f"   Dec 22 mean: {v_end:.4f}V")
     print(f"   30-day drift: {drift_mv:.1f}mV ({drift_rate:.2f}mV/day)")
+    print(f"   Hourly trend: {drift_trend(hourly_phases['winter_drift']).format(unit='mV/day')}")
 
 # Extended analysis through Jan 7
-jan_data = hourly_df[hourly_df['Datetime'].dt.date >= pd.Timestamp('2026-01-01').date()]
+jan_data = hourly_phases['january']
 if len(jan_data) > 0:
     jan_mean = jan_data['Midpoint'].mean()
     print(f"   Jan 1-7, 2026 mean: {jan_mean:.4f}V")
-    total_days = (pd.Timestamp('2026-01-07') - pd.Timestamp('2025-11-22')).days
+    total_days = (pd.Timestamp('2026-01-07') - phases.event('drift_start')).days
     if len(drift_start) > 0:
         total_drift = (v_start - jan_mean) * 1000
         print(f"   Total {total_days}-day drift: {total_drift:.1f}mV ({total_drift/total_days:.2f}mV/day)")
+        total_trend = drift_trend(hourly_phases.between(phases.event('drift_start'), '2026-01-08'))
+        print(f"   Hourly trend: {total_trend.format(unit='mV/day')}")
 
 # 1.3 Verify Eco Mode baseline shift (-9mV)
 print("\n📌 CLAIM 3: 'Eco Mode produced ~-9mV baseline shift on Dec 23'")
-pre_eco = hourly_df[(hourly_df['Datetime'] >= '2025-12-20') & 
-                    (hourly_df['Datetime'] < '2025-12-23 15:00')]
-post_eco = hourly_df[(hourly_df['Datetime'] >= '2025-12-23 16:00') & 
-                     (hourly_df['Datetime'] <= '2025-12-26')]
+pre_eco = hourly_phases['pre_eco_window']
+post_eco = hourly_phases['post_eco_window']
 if len(pre_eco) > 0 and len(post_eco) > 0:
     pre_mean = pre_eco['Min'].mean()
     post_mean = post_eco['Min'].mean()
@@ -120,8 +131,8 @@ if len(pre_eco) > 0 and len(post_eco) > 0:
 
 # 1.4 Verify Dec 19 anomaly
 print("\n📌 CLAIM 4: 'Dec 19 anomaly - Min dipped to 13.21V while Max stayed stable'")
-dec19 = hourly_df[hourly_df['Datetime'].dt.date == pd.Timestamp('2025-12-19').date()]
-dec18 = hourly_df[hourly_df['Datetime'].dt.date == pd.Timestamp('2025-12-18').date()]
+dec19 = hourly_phases.day(phases.event('dec19_anomaly'))
+dec18 = hourly_phases.day(phases.event('dec19_anomaly') - pd.Timedelta(days=1))
 if len(dec19) > 0 and len(dec18) > 0:
     dec19_min = dec19['Min'].min()
     dec19_max = dec19['Max'].max()
@@ -150,12 +161,13 @@ print(f"   ✓ VERIFIED: Math is correct (33Ah at upper bound)")
 # SECTION 2: EXTENDED STASIS ANALYSIS (DEC 23 - JAN 7)
 # ============================================================================
 
+tracer.mark('2. Extended stasis')
 print("\n" + "=" * 80)
 print("SECTION 2: EXTENDED STASIS ANALYSIS (POST-ECO MODE)")
 print("=" * 80)
 
 # Analyze post-Eco period
-post_eco_extended = hourly_df[hourly_df['Datetime'] >= '2025-12-24']
+post_eco_extended = hourly_phases['post_eco_extended']
 if len(post_eco_extended) > 0:
     print(f"\n📊 Post-Eco Mode Statistics (Dec 24 - Jan 7):")
     print(f"   Records: {len(post_eco_extended)}")
@@ -168,10 +180,8 @@ if len(post_eco_extended) > 0:
 
     # Weekly breakdown
     print("\n📅 Weekly Voltage Trends:")
-    week1 = post_eco_extended[(post_eco_extended['Datetime'] >= '2025-12-24') & 
-                              (post_eco_extended['Datetime'] < '2025-12-31')]
-    week2 = post_eco_extended[(post_eco_extended['Datetime'] >= '2025-12-31') & 
-                              (post_eco_extended['Datetime'] < '2026-01-07')]
+    week1 = hourly_phases['post_eco_week1']
+    week2 = hourly_phases['post_eco_week2']
     if len(week1) > 0:
         print(f"   Week 1 (Dec 24-30): Mean={week1['Midpoint'].mean():.4f}V, "
               f"Range=[{week1['Min'].min():.2f}V-{week1['Max'].max():.2f}V]")
@@ -189,11 +199,13 @@ if len(post_eco_extended) > 48:
     print(f"   First 24h mean: {first_day:.4f}V")
     print(f"   Last 24h mean: {last_day:.4f}V")
     print(f"   Drift over {days_elapsed} days: {post_eco_drift:.1f}mV ({post_eco_drift/max(1,days_elapsed):.2f}mV/day)")
+    print(f"   Hourly trend: {drift_trend(post_eco_extended).format(unit='mV/day')}")
 
 # ============================================================================
 # SECTION 3: HIGH-FREQUENCY ANALYSIS WITH 60-SECOND MA
 # ============================================================================
 
+tracer.mark('3. High-frequency MA-60')
 print("\n" + "=" * 80)
 print("SECTION 3: HIGH-FREQUENCY VOLTAGE ANALYSIS (MA-60s)")
 print("=" * 80)
@@ -203,75 +215,63 @@ print("=" * 80)
 # while raw readings are rounded to 0.01V
 
 # Filter to just the high-frequency (sub-second) data
-hf_raw = hf_df[hf_df['voltage'].apply(lambda x: len(str(x).split('.')[-1]) <= 2)].copy()
-print(f"\n📊 High-Frequency Raw Data:")
-print(f"   Total records: {len(hf_raw)}")
-print(f"   Time span: {hf_raw['Datetime'].min()} to {hf_raw['Datetime'].max()}")
-
-# Calculate time differences
-hf_raw['time_diff'] = hf_raw['Datetime'].diff().dt.total_seconds()
-
-# Get average sampling rate
-median_interval = hf_raw['time_diff'].median()
-mean_interval = hf_raw['time_diff'].mean()
-print(f"   Median sampling interval: {median_interval:.2f}s")
-print(f"   Mean sampling interval: {mean_interval:.2f}s")
-
-# Calculate 60-second moving average
-# Group by 60-second windows
-hf_raw['minute_bucket'] = hf_raw['Datetime'].dt.floor('60s')
-ma60 = hf_raw.groupby('minute_bucket').agg({
-    'voltage': ['mean', 'std', 'min', 'max', 'count']
-}).reset_index()
-ma60.columns = ['Datetime', 'MA60_Mean', 'MA60_Std', 'MA60_Min', 'MA60_Max', 'Sample_Count']
-ma60 = ma60[ma60['Sample_Count'] > 3]  # Only buckets with sufficient samples
-
-print(f"\n📈 60-Second Moving Average Analysis:")
-print(f"   Total 60s buckets: {len(ma60)}")
-print(f"   Overall MA60 mean: {ma60['MA60_Mean'].mean():.4f}V")
-print(f"   Overall MA60 std: {ma60['MA60_Mean'].std()*1000:.2f}mV")
-print(f"   Avg samples per bucket: {ma60['Sample_Count'].mean():.1f}")
-
-# Analyze noise characteristics using MA60
-noise_within_bucket = ma60['MA60_Std'].mean()
-noise_between_buckets = ma60['MA60_Mean'].std()
-print(f"\n📊 Noise Characterization:")
-print(f"   Within-bucket noise (avg std): {noise_within_bucket*1000:.2f}mV")
-print(f"   Between-bucket noise (MA60 std): {noise_between_buckets*1000:.2f}mV")
-print(f"   Avg Min-Max range per bucket: {(ma60['MA60_Max'] - ma60['MA60_Min']).mean()*1000:.1f}mV")
-
-# Daily MA60 statistics
-ma60['Date'] = ma60['Datetime'].dt.date
-daily_ma60 = ma60.groupby('Date').agg({
-    'MA60_Mean': ['mean', 'std', 'min', 'max'],
-    'Sample_Count': 'sum'
-}).reset_index()
-daily_ma60.columns = ['Date', 'Mean', 'Std', 'Min', 'Max', 'Total_Samples']
-
-print(f"\n📅 Daily MA60 Summary:")
-print("-" * 70)
-print(f"{'Date':<12} {'Mean(V)':<10} {'Std(mV)':<10} {'Min(V)':<10} {'Max(V)':<10} {'Samples':<10}")
-print("-" * 70)
-for _, row in daily_ma60.iterrows():
-    print(f"{str(row['Date']):<12} {row['Mean']:.4f}     {row['Std']*1000:.2f}       "
-          f"{row['Min']:.4f}     {row['Max']:.4f}     {int(row['Total_Samples'])}")
+# Memory-mapped int64 timestamps / int16 10 mV counts, scanned in slices; nothing is copied into a DataFrame
+if raw_history is None or len(raw_history) < 2:
+    print(f"\n   No raw high-frequency history export; skipping the MA-60 analysis")
+else:
+    tracer.rows(len(raw_history))
+    print(f"\n📊 High-Frequency Raw Data:")
+    print(f"   Total records: {len(raw_history)}")
+    print(f"   Time span: {raw_history.start} to {raw_history.end}")
+
+    # Sampling rate from the gaps between readings, tallied slice by slice
+    median_interval, mean_interval = raw_history.sampling_intervals()
+    print(f"   Median sampling interval: {median_interval:.2f}s")
+    print(f"   Mean sampling interval: {mean_interval:.2f}s")
+
+    # Calculate 60-second moving average
+    # Per-bucket sufficient statistics, fed one slice of the memmap at a time
+    ma60_state = MA60Aggregator()
+    for hf_ts, hf_counts in raw_history.iter_chunks():
+        ma60_state.update(hf_ts, raw_history.millivolts(hf_counts))
+    ma60 = ma60_state.to_frame()  # Only buckets with sufficient samples (>3)
+
+    print(f"\n📈 60-Second Moving Average Analysis:")
+    print(f"   Total 60s buckets: {len(ma60)}")
+    print(f"   Overall MA60 mean: {ma60['MA60_Mean'].mean():.4f}V")
+    print(f"   Overall MA60 std: {ma60['MA60_Mean'].std()*1000:.2f}mV")
+    print(f"   Avg samples per bucket: {ma60['Sample_Count'].mean():.1f}")
+
+    # Analyze noise characteristics using MA60
+    noise_within_bucket = ma60['MA60_Std'].mean()
+    noise_between_buckets = ma60['MA60_Mean'].std()
+    print(f"\n📊 Noise Characterization:")
+    print(f"   Within-bucket noise (avg std): {noise_within_bucket*1000:.2f}mV")
+    print(f"   Between-bucket noise (MA60 std): {noise_between_buckets*1000:.2f}mV")
+    print(f"   Avg Min-Max range per bucket: {(ma60['MA60_Max'] - ma60['MA60_Min']).mean()*1000:.1f}mV")
+
+    # Daily MA60 statistics
+    daily_ma60 = ma60_state.daily_summary()
+
+    print(f"\n📅 Daily MA60 Summary:")
+    print("-" * 70)
+    print(f"{'Date':<12} {'Mean(V)':<10} {'Std(mV)':<10} {'Min(V)':<10} {'Max(V)':<10} {'Samples':<10}")
+    print("-" * 70)
+    for _, row in daily_ma60.iterrows():
+        print(f"{str(row['Date']):<12} {row['Mean']:.4f}     {row['Std']*1000:.2f}       "
+              f"{row['Min']:.4f}     {row['Max']:.4f}     {int(row['Total_Samples'])}")
 
 # ============================================================================
 # SECTION 4: VOLTAGE-TEMPERATURE CORRELATION
 # ============================================================================
 
+tracer.mark('4. Voltage-temperature correlation')
 print("\n" + "=" * 80)
 print("SECTION 4: VOLTAGE-TEMPERATURE CORRELATION ANALYSIS")
 print("=" * 80)
 
-# Merge voltage and temperature data
-merged = pd.merge_asof(
-    hourly_df.sort_values('Datetime'),
-    temp_df[['Datetime', 'Temp_Midpoint']].sort_values('Datetime'),
-    on='Datetime',
-    tolerance=pd.Timedelta('1H')
-)
-merged = merged.dropna(subset=['Temp_Midpoint'])
+# Voltage with temperature (and humidity) joined as of each hour; also reused by insight 3
+merged = load_aligned().dropna(subset=['Temp_Midpoint'])
 
 if len(merged) > 10:
     # Calculate correlation
@@ -306,10 +306,21 @@ if len(merged) > 10:
     else:
         print(f"   ⚠ DEVIATION from report's thermal analysis")
 
+    # Recursive (exponentially forgetting) fit with drift, to see how the coefficient moves over time
+    rls = ThermalRLS(DEFAULT_FORGETTING)
+    timeline = rls.replay(merged['Datetime'], merged['Temp_Midpoint'], merged['Midpoint']).dropna()
+    if len(timeline):
+        print(f"\n   Recursive estimate (forgetting {DEFAULT_FORGETTING}, drift fitted jointly):")
+        print(f"   Latest: {rls.coefficient:.3f} ± {rls.coefficient_stderr:.3f} mV/°F, "
+              f"drift {rls.drift:+.2f} mV/day")
+        print(f"   Range over record: {timeline['Coeff_mV_per_F'].min():.3f} to "
+              f"{timeline['Coeff_mV_per_F'].max():.3f} mV/°F")
+
 # ============================================================================
 # SECTION 5: ANOMALY DETECTION
 # ============================================================================
 
+tracer.mark('5. Anomaly detection')
 print("\n" + "=" * 80)
 print("SECTION 5: ANOMALY DETECTION")
 print("=" * 80)
@@ -349,18 +360,28 @@ if len(post_eco_extended) > 0:
             print(f"   {row['Datetime']}: Spread={row['Spread']*1000:.0f}mV "
                   f"(Min={row['Min']:.2f}V, Max={row['Max']:.2f}V)")
 
+# Streaming detector replayed over the whole record: each hour is judged
+# against robust rolling baselines built from the hours before it only
+events = events_frame(detect_hourly(hourly_df))
+print(f"\n🔍 Streaming Detector ({len(events)} events over the full record):")
+for rule, count in events['Rule'].value_counts().sort_index().items():
+    print(f"   {rule}: {count}")
+for _, event in events[events['Datetime'] >= phases.event('stasis_start')].iterrows():
+    print(f"   {event['Datetime']}: {event['Rule']} - {event['Detail']}")
+
 # ============================================================================
 # SECTION 6: UPDATED STATE OF CHARGE ESTIMATE
 # ============================================================================
 
+tracer.mark('6. State of charge')
 print("\n" + "=" * 80)
 print("SECTION 6: UPDATED STATE OF CHARGE ESTIMATE")
 print("=" * 80)
 
 # Extended stasis period through Jan 7
-original_stasis_end = pd.Timestamp('2025-12-23')
+original_stasis_end = phases.phase('winter_drift').end
 new_stasis_end = pd.Timestamp('2026-01-07')
-original_stasis_start = pd.Timestamp('2025-11-04')  # Post-recharge
+original_stasis_start = phases.event('recharge_complete')  # Post-recharge
 
 total_days = (new_stasis_end - original_stasis_start).days
 total_hours = total_days * 24
@@ -380,7 +401,7 @@ for p in parasitic_estimates:
     print(f"   At {p*1000:.0f}mA: {loss:.1f}Ah lost → {remaining:.0f}Ah remaining ({soc:.1f}% SOC)")
 
 # Voltage-based SOC estimate
-jan7_voltage = hourly_df[hourly_df['Datetime'].dt.date == pd.Timestamp('2026-01-07').date()]['Midpoint'].mean()
+jan7_voltage = hourly_phases.day('2026-01-07')['Midpoint'].mean()
 print(f"\n   Current resting voltage (Jan 7): {jan7_voltage:.4f}V")
 print(f"   LiFePO4 voltage at 90% SOC (57°F): ~13.20-13.25V")
 print(f"   ✓ Voltage consistent with >90% SOC estimate")
@@ -389,30 +410,30 @@ print(f"   ✓ Voltage consistent with >90% SOC estimate")
 # SECTION 7: NOISE FLOOR ANALYSIS (HIGH-FREQUENCY)
 # ============================================================================
 
+tracer.mark('7. Noise floor')
 print("\n" + "=" * 80)
 print("SECTION 7: INSTRUMENTATION NOISE FLOOR ANALYSIS")
 print("=" * 80)
 
-if len(hf_raw) > 1000:
-    # Analyze noise patterns
-    voltage_values = hf_raw['voltage'].value_counts().sort_index()
+if raw_history is not None and len(raw_history) > 1000:
+    # Analyze noise patterns (bincount tally of the int16 ADC counts, one slice at a time)
+    count_values, value_counts = raw_history.value_counts()
     
     print(f"\n📊 Voltage Value Distribution (High-Frequency Data):")
-    print(f"   Unique values: {len(voltage_values)}")
+    print(f"   Unique values: {len(count_values)}")
     print(f"   Most common values:")
-    for v, count in voltage_values.head(10).items():
-        pct = count / len(hf_raw) * 100
+    for v, count in zip(raw_history.volts(count_values[:10]), value_counts[:10]):
+        pct = count / len(raw_history) * 100
         print(f"      {v:.2f}V: {count} ({pct:.1f}%)")
     
     # Calculate ADC resolution estimate
-    voltage_steps = sorted(hf_raw['voltage'].unique())
-    if len(voltage_steps) > 1:
-        min_step = min(voltage_steps[i+1] - voltage_steps[i] for i in range(len(voltage_steps)-1))
+    if len(count_values) > 1:
+        min_step = np.diff(count_values).min() * raw_history.step_mv / 1000
         print(f"\n   Minimum voltage step: {min_step*1000:.0f}mV (ADC resolution)")
         print(f"   Shelly reports: 10mV resolution")
     
     # Jitter analysis
-    jitter = hf_raw['voltage'].max() - hf_raw['voltage'].min()
+    jitter = (int(count_values[-1]) - int(count_values[0])) * raw_history.step_mv / 1000
     print(f"\n📊 Jitter Analysis:")
     print(f"   Total range: {jitter*1000:.0f}mV")
     print(f"   Report claimed: 30-40mV jitter")
@@ -423,6 +444,7 @@ if len(hf_raw) > 1000:
 # SECTION 8: STANDBY ENDURANCE PROJECTION
 # ============================================================================
 
+tracer.mark('8. Standby endurance')
 print("\n" + "=" * 80)
 print("SECTION 8: STANDBY ENDURANCE PROJECTION")
 print("=" * 80)
@@ -448,16 +470,16 @@ for parasitic in [0.020, 0.025, 0.030]:
 # SECTION 9: NEW INSIGHTS
 # ============================================================================
 
+tracer.mark('9. New insights')
 print("\n" + "=" * 80)
 print("SECTION 9: NEW INSIGHTS FROM EXTENDED DATA")
 print("=" * 80)
 
 # Insight 1: Voltage stability post-Eco
-post_eco_jan = hourly_df[hourly_df['Datetime'] >= '2026-01-01']
+post_eco_jan = hourly_phases['january']
 if len(post_eco_jan) > 0:
     jan_std = post_eco_jan['Midpoint'].std()
-    dec_post_eco = hourly_df[(hourly_df['Datetime'] >= '2025-12-24') & 
-                              (hourly_df['Datetime'] < '2026-01-01')]
+    dec_post_eco = hourly_phases['december_post_eco']
     if len(dec_post_eco) > 0:
         dec_std = dec_post_eco['Midpoint'].std()
         print(f"\n🔍 INSIGHT 1: Voltage Stability Comparison")
@@ -471,10 +493,8 @@ if len(post_eco_jan) > 0:
 # Insight 2: Drift rate flattening
 print(f"\n🔍 INSIGHT 2: Drift Rate Analysis")
 # Compare early winter drift to recent drift
-early_drift = hourly_df[(hourly_df['Datetime'] >= '2025-11-22') & 
-                        (hourly_df['Datetime'] <= '2025-12-07')]
-late_drift = hourly_df[(hourly_df['Datetime'] >= '2025-12-24') & 
-                       (hourly_df['Datetime'] <= '2026-01-07')]
+early_drift = hourly_phases['early_drift']
+late_drift = hourly_phases['late_drift']
 if len(early_drift) > 24 and len(late_drift) > 24:
     early_slope = (early_drift.head(24)['Midpoint'].mean() - 
                    early_drift.tail(24)['Midpoint'].mean()) / 15 * 1000  # mV/day
@@ -482,13 +502,15 @@ if len(early_drift) > 24 and len(late_drift) > 24:
                   late_drift.tail(24)['Midpoint'].mean()) / 14 * 1000  # mV/day
     print(f"   Early winter drift (Nov 22 - Dec 7): {early_slope:.2f}mV/day")
     print(f"   Recent drift (Dec 24 - Jan 7): {late_slope:.2f}mV/day")
+    print(f"   Early hourly trend: {drift_trend(early_drift).format(unit='mV/day')}")
+    print(f"   Recent hourly trend: {drift_trend(late_drift).format(unit='mV/day')}")
     if abs(late_slope) < abs(early_slope):
         print(f"   → Drift has SLOWED by {(1 - abs(late_slope)/abs(early_slope))*100:.0f}%")
         print(f"   → Suggests voltage is approaching electrochemical equilibrium")
 
 # Insight 3: Temperature-voltage dynamics in January
 print(f"\n🔍 INSIGHT 3: January Temperature-Voltage Dynamics")
-jan_merged = merged[merged['Datetime'] >= '2026-01-01']
+jan_merged = phases.index(merged)['january']
 if len(jan_merged) > 10:
     jan_corr = jan_merged['Midpoint'].corr(jan_merged['Temp_Midpoint'])
     jan_temp_range = jan_merged['Temp_Midpoint'].max() - jan_merged['Temp_Midpoint'].min()
@@ -515,11 +537,16 @@ late_spread = hourly_df[hourly_df['Datetime'].dt.month == 1]['Max'] - \
 if len(early_spread) > 0 and len(late_spread) > 0:
     print(f"   November avg spread: {early_spread.mean()*1000:.1f}mV")
     print(f"   January avg spread: {late_spread.mean()*1000:.1f}mV")
+    print(f"   November spread: {spread_mean(early_spread).format('.1f', 'mV')}")
+    print(f"   January spread: {spread_mean(late_spread).format('.1f', 'mV')}")
     if late_spread.mean() <= early_spread.mean() * 1.1:
         print(f"   ✓ No evidence of cell divergence")
     else:
         print(f"   ⚠ Possible cell divergence detected")
 
+tracer.end_mark()
 print("\n" + "=" * 80)
 print("ANALYSIS COMPLETE")
 print("=" * 80)
+
+tracer.close(echo=True)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Shared Data Loading Layer
+Parses each CSV export once and keeps a typed on-disk cache
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from history_stream import iter_history_batches
+from ingest import read_export
+from raw_history import META_FILE as RAW_META_FILE, RawHistory, write_raw_history
+from timeseries_store import TimeSeriesStore
+
+try:
+    import pyarrow  # noqa: F401  (enables the Feather cache format)
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Data/ holds the V8.3 exports (through Jan 7), data/ the V2.0 exports (through Jan 11).
+# LIFEPO4_DATA_DIR overrides both so the scripts can be pointed at another bank.
+DEFAULT_DATA_DIR = REPO_ROOT / 'Data'
+DATA_DIR_ENV = 'LIFEPO4_DATA_DIR'
+
+HOURLY_FILE = 'combined_output.csv'
+HISTORY_FILE = 'history.csv'
+TEMPERATURE_FILE = 'Combined_Temperature_Data.csv'
+HUMIDITY_FILE = 'Combined_Humidity_Data.csv'
+
+CACHE_DIR_NAME = '.cache'
+STORE_DIR_NAME = 'store'
+RAW_HISTORY_DIR_NAME = 'raw_history'
+CACHE_VERSION = 2
+
+
+def resolve_data_dir(data_dir=None, default=DEFAULT_DATA_DIR):
+    """Return the data directory: explicit argument, then $LIFEPO4_DATA_DIR, then `default`."""
+    if data_dir is not None:
+        return Path(data_dir)
+    return Path(os.environ.get(DATA_DIR_ENV, default))
+
+
+# ============================================================================
+# ON-DISK CACHE
+# ============================================================================
+
+def _file_sha1(path, block_size=1 << 20):
+    """SHA-1 of a file's contents, read in 1 MB blocks."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_paths(source, kind):
+    cache_dir = source.parent / CACHE_DIR_NAME
+    ext = 'feather' if HAVE_PYARROW else 'pkl'
+    return cache_dir / f'{source.stem}.{kind}.{ext}', cache_dir / f'{source.stem}.{kind}.json'
+
+
+def _read_cached(source, kind):
+    """Return the cached frame for `source`, or None if missing or stale.
+
+    A matching mtime and size is trusted directly; otherwise the file is hashed
+    so that a touched-but-unchanged export still hits the cache.
+    """
+    data_path, meta_path = _cache_paths(source, kind)
+    if not data_path.exists() or not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION:
+        return None
+
+    st = source.stat()
+    if meta.get('mtime_ns') != st.st_mtime_ns or meta.get('size') != st.st_size:
+        if meta.get('sha1') != _file_sha1(source):
+            return None
+        meta['mtime_ns'] = st.st_mtime_ns
+        meta['size'] = st.st_size
+        meta_path.write_text(json.dumps(meta))
+
+    try:
+        if data_path.suffix == '.feather':
+            return pd.read_feather(data_path)
+        with open(data_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _write_cached(source, kind, df):
+    data_path, meta_path = _cache_paths(source, kind)
+    try:
+        data_path.parent.mkdir(exist_ok=True)
+        if data_path.suffix == '.feather':
+            df.reset_index(drop=True).to_feather(data_path)
+        else:
+            with open(data_path, 'wb') as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        st = source.stat()
+        meta = {
+            'version': CACHE_VERSION,
+            'source': source.name,
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'sha1': _file_sha1(source),
+        }
+        meta_path.write_text(json.dumps(meta))
+    except OSError:
+        # Read-only data directory: the cache is an optimisation, not a requirement
+        pass
+
+
+def _load(source, kind, parser, use_cache):
+    source = Path(source)
+    if use_cache:
+        cached = _read_cached(source, kind)
+        if cached is not None:
+            return cached
+    df = parser(source)
+    if use_cache:
+        _write_cached(source, kind, df)
+    return df
+
+
+# ============================================================================
+# PARSERS
+# ============================================================================
+
+# Each export is read through ingest.read_export(), which detects the layout
+# (Date,Time,Min,Max or the ISO Timestamp,Voltage_Min,Voltage_Max described in
+# docs/METHODS.md) and parses timestamps with the fixed-format parser.
+
+def _parse_hourly(path):
+    return read_export(path, 'voltage')
+
+
+def _parse_history(path):
+    return read_export(path, 'history')
+
+
+def _parse_temperature(path):
+    return read_export(path, 'temperature')
+
+
+def _parse_humidity(path):
+    return read_export(path, 'humidity')
+
+
+# ============================================================================
+# PUBLIC LOADERS
+# ============================================================================
+
+def load_hourly(data_dir=None, use_cache=True):
+    """Hourly Min/Max voltage with Datetime, Midpoint and Spread columns."""
+    return _load(resolve_data_dir(data_dir) / HOURLY_FILE, 'hourly', _parse_hourly, use_cache)
+
+
+def load_history(data_dir=None, use_cache=True):
+    """Home Assistant history export with numeric states only.
+
+    Returns Datetime (naive UTC) and float voltage, sorted by time.
+    """
+    return _load(resolve_data_dir(data_dir) / HISTORY_FILE, 'history', _parse_history, use_cache)
+
+
+def load_temperature(data_dir=None, use_cache=True):
+    """Hourly Min/Max temperature (°F) with Datetime and Temp_Midpoint columns."""
+    return _load(resolve_data_dir(data_dir) / TEMPERATURE_FILE, 'temperature',
+                 _parse_temperature, use_cache)
+
+
+def load_humidity(data_dir=None, use_cache=True):
+    """Hourly humidity (%) with a Datetime column."""
+    return _load(resolve_data_dir(data_dir) / HUMIDITY_FILE, 'humidity', _parse_humidity, use_cache)
+
+
+def clear_cache(data_dir=None):
+    """Delete every cached frame, the columnar store and the raw history columns for a data directory."""
+    cache_dir = resolve_data_dir(data_dir) / CACHE_DIR_NAME
+    if cache_dir.is_dir():
+        shutil.rmtree(cache_dir)
+
+
+# ============================================================================
+# COLUMNAR STORE
+# ============================================================================
+
+# series name -> (loader, source file, stored columns). The raw history is
+# kept in its own memory-mapped columns (open_raw_history), not here.
+STORE_SERIES = {
+    'voltage': (load_hourly, HOURLY_FILE, ['Min', 'Max', 'Midpoint', 'Spread']),
+    'temperature': (load_temperature, TEMPERATURE_FILE, ['Min', 'Max', 'Temp_Midpoint']),
+    'humidity': (load_humidity, HUMIDITY_FILE, ['Humidity']),
+}
+
+
+def sync_store(data_dir=None):
+    """Open the month-partitioned store for a data directory, refreshing changed sources.
+
+    Each CSV is ingested when its SHA-1 differs from the last sync. Exports
+    are treated as append-only: only rows from the newest stored month onward
+    are re-appended, so a daily refresh rewrites one or two partitions.
+    clear_cache() forces a full rebuild.
+    """
+    data_dir = resolve_data_dir(data_dir)
+    store = TimeSeriesStore(data_dir / CACHE_DIR_NAME / STORE_DIR_NAME)
+    manifest_path = store.root / 'sources.json'
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+
+    changed = False
+    for series, (loader, filename, columns) in STORE_SERIES.items():
+        source = data_dir / filename
+        if not source.exists():
+            continue
+        digest = _file_sha1(source)
+        if manifest.get(series) == digest:
+            continue
+        df = loader(data_dir)[['Datetime'] + columns]
+        keys = store.partitions(series)
+        if keys:
+            df = df[df['Datetime'] >= pd.Timestamp(keys[-1])]
+        if len(df):
+            store.append(series, df)
+        manifest[series] = digest
+        changed = True
+
+    if changed:
+        store.root.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest))
+    return store
+
+
+# ============================================================================
+# RAW HIGH-FREQUENCY HISTORY
+# ============================================================================
+
+def open_raw_history(data_dir=None):
+    """Memory-mapped raw 10 mV readings from history.csv, or None when there is no export.
+
+    The binary columns are rebuilt by streaming the CSV whenever its SHA-1
+    changes. As in _read_cached(), a matching mtime and size is trusted
+    without hashing, so opening an unchanged export is just two np.memmap
+    calls.
+    """
+    data_dir = resolve_data_dir(data_dir)
+    source = data_dir / HISTORY_FILE
+    if not source.exists():
+        return None
+    raw_dir = data_dir / CACHE_DIR_NAME / RAW_HISTORY_DIR_NAME
+    meta_path = raw_dir / RAW_META_FILE
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        meta = {}
+    st = source.stat()
+    if meta.get('mtime_ns') != st.st_mtime_ns or meta.get('size') != st.st_size:
+        digest = _file_sha1(source)
+        if meta.get('source_sha1') != digest:
+            write_raw_history(iter_history_batches(source), raw_dir, source_sha1=digest)
+            meta = json.loads(meta_path.read_text())
+        meta['mtime_ns'] = st.st_mtime_ns
+        meta['size'] = st.st_size
+        meta_path.write_text(json.dumps(meta))
+    return RawHistory(raw_dir)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Plot Decimation
+M4 (first/last/min/max per pixel column) reduction so dense series render in time bounded by figure width
+"""
+
+import numpy as np
+import pandas as pd
+
+POINTS_PER_COLUMN = 4  # first, last, min, max
+
+
+def axes_pixel_width(ax, dpi):
+    """Width of an axes in output pixels at `dpi`."""
+    return max(1, int(ax.get_position().width * ax.figure.get_figwidth() * dpi))
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if x.dtype.kind == 'M':
+        return pd.DatetimeIndex(x).as_unit('ns').asi8.astype(np.float64)
+    return x.astype(np.float64)
+
+
+def m4_indices(x, ys, n_columns):
+    """Row indices that keep the first, last, min and max of every y per pixel column.
+
+    `x` must be sorted. Rows are binned into `n_columns` equal-width x
+    intervals; for each bin the first and last row and, for every series in
+    `ys`, the rows holding its minimum and maximum are kept. Drawing only
+    these rows gives the same rasterized line, band and extremes as drawing
+    every row. NaNs never win a min or max.
+    """
+    xf = _as_float(x)
+    n = len(xf)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    span = xf[-1] - xf[0]
+    if span <= 0:
+        bins = np.zeros(n, dtype=np.int64)
+    else:
+        bins = np.minimum(((xf - xf[0]) / span * n_columns).astype(np.int64), n_columns - 1)
+
+    new_bin = np.r_[True, bins[1:] != bins[:-1]]
+    starts = np.flatnonzero(new_bin)
+    ends = np.r_[starts[1:], n] - 1
+    run = np.cumsum(new_bin) - 1  # row -> index of its (non-empty) bin in `starts`
+    keep = [starts, ends]
+    for y in ys:
+        y = np.asarray(y, dtype=np.float64)
+        nan = np.isnan(y)
+        for reduce, fill in ((np.minimum, np.inf), (np.maximum, -np.inf)):
+            filled = np.where(nan, fill, y)
+            extreme = reduce.reduceat(filled, starts)
+            # First row of each bin that attains the bin's extreme
+            hits = np.flatnonzero(filled == extreme[run])
+            keep.append(hits[np.r_[True, run[hits[1:]] != run[hits[:-1]]]])
+    return np.unique(np.concatenate(keep))
+
+
+def decimate_frame(df, x_col, y_cols, n_columns):
+    """Rows of `df` needed to draw `y_cols` against `x_col` at `n_columns` pixels.
+
+    Frames already small enough (at most POINTS_PER_COLUMN rows per column)
+    are returned unchanged.
+    """
+    if len(df) <= POINTS_PER_COLUMN * n_columns:
+        return df
+    idx = m4_indices(df[x_col].to_numpy(), [df[c].to_numpy() for c in y_cols], n_columns)
+    return df.iloc[idx]
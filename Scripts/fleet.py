@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Fleet Batch Analysis
+Runs the per-bank parasitic draw, drift, spread and MA-60 analyses from a manifest across a process pool
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bootstrap import HOURLY_BLOCK, bootstrap_slope
+from data_loader import load_hourly, load_temperature, open_raw_history
+from joint_model import bank_series, fit_banks, self_discharge_ma
+from ma60 import MA60Aggregator
+from monte_carlo import DEFAULT_SAMPLES, UncertaintyBudget, simulate_parasitic
+from parasitic import (BATTERY_MV_PER_C, ECO_OFFSET_MV, INSTRUMENT_MV_PER_C, MV_PER_SOC_PCT,
+                       TEMP_UNCERTAINTY_C, UNCERTAINTY_MV, estimate_parasitic)
+from phases import load_phases
+from soc import load_curve, soc_series
+
+# Per-bank settings and their defaults (the reference 12V 500Ah bank in analysis/)
+BANK_DEFAULTS = {
+    'capacity_ah': 500,
+    'battery_mv_per_c': BATTERY_MV_PER_C,
+    'instrument_mv_per_c': INSTRUMENT_MV_PER_C,
+    'eco_offset_mv': ECO_OFFSET_MV,
+    'mv_per_soc_pct': MV_PER_SOC_PCT,
+    'start_temp_c': 18.3,         # bank temperature at stasis start
+    'end_temp_c': 12.8,           # bank temperature at the end of the record
+    'uncertainty_mv': UNCERTAINTY_MV,
+    'temp_uncertainty_c': TEMP_UNCERTAINTY_C,
+}
+
+
+def load_manifest(path):
+    """Bank specs from a JSON manifest, with defaults filled in.
+
+    Each entry needs a `data_dir` (relative paths are resolved against the
+    manifest's folder) and may override any BANK_DEFAULTS key, give a
+    `phases` file or a calibrated `soc_curve`, and override event times
+    under `events`. `name` defaults to the data directory's name.
+    """
+    path = Path(path)
+    manifest = json.loads(path.read_text())
+    banks = []
+    for entry in manifest['banks']:
+        if 'data_dir' not in entry:
+            raise ValueError(f"manifest bank entry is missing 'data_dir': {entry}")
+        bank = {**BANK_DEFAULTS, **entry}
+        bank['data_dir'] = str((path.parent / entry['data_dir']).resolve())
+        if entry.get('phases'):
+            bank['phases'] = str((path.parent / entry['phases']).resolve())
+        if entry.get('soc_curve'):
+            bank['soc_curve'] = str((path.parent / entry['soc_curve']).resolve())
+        bank.setdefault('name', Path(bank['data_dir']).name)
+        banks.append(bank)
+    names = [b['name'] for b in banks]
+    if len(set(names)) != len(names):
+        raise ValueError(f"bank names must be unique: {names}")
+    return banks
+
+
+def _value_at(df, when, column='Min'):
+    row = df.loc[df['Datetime'] == when, column]
+    return row.iloc[0] if len(row) else np.nan
+
+
+def analyze_bank(bank):
+    """Summary row for one bank (the metrics of analysis_summary.csv, as numbers)."""
+    data_dir = bank['data_dir']
+    hourly = load_hourly(data_dir)
+    phases = load_phases(data_dir, bank.get('phases'), bank.get('events'))
+    hourly_phases = phases.index(hourly)
+
+    first, last = hourly['Datetime'].iloc[0], hourly['Datetime'].iloc[-1]
+    expected_hours = int((last - first) / pd.Timedelta(hours=1)) + 1
+    row = {
+        'Bank': bank['name'],
+        'Data Dir': data_dir,
+        'Capacity (Ah)': bank['capacity_ah'],
+        'Data Start': first,
+        'Data End': last,
+        'Total Days': (last - first).days,
+        'Total Hours': len(hourly),
+        'Missing Hours': expected_hours - hourly['Datetime'].nunique(),
+        'Voltage Min (V)': hourly['Min'].min(),
+        'Voltage Max (V)': hourly['Max'].max(),
+        'Current Voltage (V)': hourly['Min'].iloc[-1],
+    }
+
+    # Eco Mode shift: 24 h of Min either side of the switch
+    eco = phases.event('eco_mode')
+    pre = hourly_phases.between(eco - pd.Timedelta(hours=24), eco)['Min'].mean()
+    post = hourly_phases.between(eco, eco + pd.Timedelta(hours=24))['Min'].mean()
+    row['Eco Mode Shift (mV)'] = (post - pre) * 1000
+
+    # Parasitic-draw interval (stasis start to the last reading); the estimate
+    # itself is computed for the whole fleet at once in add_parasitic_columns()
+    eco_v = bank['eco_offset_mv'] / 1000
+    start = phases.event('stasis_start')
+    v_start = _value_at(hourly, start)
+    v_end = hourly['Min'].iloc[-1] + (eco_v if last >= eco else 0)
+    row.update({
+        'Stasis Start': start,
+        'Stasis Hours': (last - start).total_seconds() / 3600,
+        'Start Voltage (V)': v_start,
+        'End Voltage (V)': hourly['Min'].iloc[-1],
+        'Eco Start': start >= eco,
+        'Eco End': last >= eco,
+    })
+
+    # Drift over the extended (post-Eco) stasis, endpoint to endpoint
+    ext_start = phases.event('extended_stasis_start')
+    ext_days = (last - ext_start).total_seconds() / 86400
+    ext_delta_mv = (v_end - _value_at(hourly, ext_start)) * 1000
+    row['Extended Drift Rate (mV/day)'] = ext_delta_mv / ext_days if ext_days > 0 else np.nan
+    extended = hourly_phases['extended_stasis']
+    trend = bootstrap_slope(extended['Datetime'], extended['Min'] * 1000, block_len=HOURLY_BLOCK,
+                            seed=0)
+    row.update({
+        'Extended Drift Trend (mV/day)': trend.estimate,
+        'Extended Drift Trend Low (mV/day)': trend.low,
+        'Extended Drift Trend High (mV/day)': trend.high,
+    })
+
+    # Spread (Max - Min) across the stasis and in the most recent month
+    stasis = hourly_phases['stasis']
+    month_start = last.normalize().replace(day=1)
+    recent = hourly_phases.between(month_start)
+    row['Stasis Spread Mean (mV)'] = stasis['Spread'].mean() * 1000
+    row['Recent Envelope Mean (mV)'] = recent['Spread'].mean() * 1000
+
+    # Temperature, when the bank has a temperature export
+    try:
+        temp = load_temperature(data_dir)
+    except FileNotFoundError:
+        temp = None
+    if temp is not None:
+        row['Temperature Mean (°F)'] = temp['Temp_Midpoint'].mean()
+        row['Temperature Daily Swing (°F)'] = (temp['Max'] - temp['Min']).mean()
+
+    # Absolute SOC of the last reading from the bank's resting-voltage curve
+    soc = soc_series(hourly.iloc[-1:], temp, curve=load_curve(data_dir, bank.get('soc_curve')),
+                     mv_per_c=bank['battery_mv_per_c'])
+    row['Resting-Voltage SOC (%)'] = soc['SOC'].iloc[0]
+
+    # MA-60 noise on the raw 10 mV readings
+    raw_history = open_raw_history(data_dir)
+    if raw_history is not None and len(raw_history) > 1:
+        ts, counts = raw_history.between()
+        ma60 = MA60Aggregator().update(ts, raw_history.millivolts(counts)).to_frame()
+        raw_std = raw_history.volts(counts).std(ddof=1) * 1000
+        ma_std = ma60['MA60_Mean'].std() * 1000
+        row.update({
+            'Raw Voltage Std Dev (mV)': raw_std,
+            'MA-60 Voltage Std Dev (mV)': ma_std,
+            'MA-60 Noise Reduction (%)': (1 - ma_std / raw_std) * 100,
+        })
+    return row
+
+
+def _analyze_safely(bank):
+    try:
+        return analyze_bank(bank)
+    except Exception as exc:  # one broken export should not sink the fleet run
+        return {'Bank': bank['name'], 'Data Dir': bank['data_dir'], 'Error': f'{type(exc).__name__}: {exc}'}
+
+
+def add_parasitic_columns(fleet, banks):
+    """Parasitic current, SOC and bounds for every bank in one vectorized call."""
+    fleet = fleet.copy()
+    if 'Start Voltage (V)' not in fleet.columns:
+        return fleet
+    spec = pd.DataFrame(banks).set_index('name').reindex(fleet['Bank'])
+
+    def column(name):
+        return spec[name].to_numpy(dtype=float)
+
+    est = estimate_parasitic(
+        fleet['Start Voltage (V)'].to_numpy(dtype=float), fleet['End Voltage (V)'].to_numpy(dtype=float),
+        fleet['Stasis Hours'].to_numpy(dtype=float), column('start_temp_c'), column('end_temp_c'),
+        column('capacity_ah'),
+        eco_start=fleet['Eco Start'].fillna(False).to_numpy(dtype=bool),
+        eco_end=fleet['Eco End'].fillna(False).to_numpy(dtype=bool),
+        eco_offset_mv=column('eco_offset_mv'), battery_mv_per_c=column('battery_mv_per_c'),
+        instrument_mv_per_c=column('instrument_mv_per_c'), mv_per_soc_pct=column('mv_per_soc_pct'),
+        uncertainty_mv=column('uncertainty_mv'), temp_uncertainty_c=column('temp_uncertainty_c'),
+    )
+    fleet['Parasitic Current (mA)'] = est.current_ma
+    fleet['Parasitic Current CI (mA)'] = est.ci_ma
+    fleet['Parasitic Current Low (mA)'] = est.current_best_ma
+    fleet['Parasitic Current High (mA)'] = est.current_worst_ma
+    fleet['Current SOC (%)'] = est.soc
+    return fleet
+
+
+def add_joint_fit_columns(fleet, banks):
+    """Drift, thermal coefficient and Eco step fitted jointly, every bank in one batched solve."""
+    fleet = fleet.copy()
+    spec = {bank['name']: bank for bank in banks}
+    ok = fleet['Error'].isna() if 'Error' in fleet.columns else pd.Series(True, index=fleet.index)
+    rows = fleet.index[ok]
+    if len(rows) == 0:
+        return fleet
+    fit_rows, fit_specs, series = [], [], []
+    for i in rows:
+        bank = spec[fleet.at[i, 'Bank']]
+        try:
+            series.append(bank_series(bank['data_dir'],
+                                      load_phases(bank['data_dir'], bank.get('phases'), bank.get('events'))))
+        except Exception as exc:  # one broken export should not sink the batched fit
+            fleet.loc[i, 'Error'] = f'{type(exc).__name__}: {exc}'
+            continue
+        fit_rows.append(i)
+        fit_specs.append(bank)
+    if not fit_rows:
+        return fleet
+    rows = pd.Index(fit_rows)
+    fit = fit_banks(series)
+    fleet.loc[rows, 'Joint Drift (mV/day)'] = fit.drift_mv_per_day
+    fleet.loc[rows, 'Joint Temp Coeff (mV/°C)'] = fit.temp_mv_per_c
+    fleet.loc[rows, 'Joint Eco Step (mV)'] = fit.eco_step_mv
+    fleet.loc[rows, 'Joint Parasitic Current (mA)'] = self_discharge_ma(
+        fit, np.array([b['capacity_ah'] for b in fit_specs], dtype=float),
+        np.array([b['mv_per_soc_pct'] for b in fit_specs], dtype=float))
+    return fleet
+
+
+def add_monte_carlo_columns(fleet, banks, n_samples=DEFAULT_SAMPLES, seed=None):
+    """95% Monte Carlo intervals for current and SOC, one simulation per bank.
+
+    Each bank's `uncertainty_mv` sets the per-reading sensor offset and its
+    `temp_uncertainty_c` the temperature reading spread, as in the
+    best/worst bounds of add_parasitic_columns().
+    """
+    fleet = fleet.copy()
+    if 'Start Voltage (V)' not in fleet.columns:
+        return fleet
+    rng = np.random.default_rng(seed)
+    spec = {bank['name']: bank for bank in banks}
+    intervals = {}
+    for i, row in fleet.iterrows():
+        if pd.isna(row['Start Voltage (V)']):
+            continue
+        bank = spec[row['Bank']]
+        mc = simulate_parasitic(
+            row['Start Voltage (V)'], row['End Voltage (V)'], row['Stasis Hours'],
+            bank['start_temp_c'], bank['end_temp_c'], bank['capacity_ah'],
+            eco_start=row['Eco Start'], eco_end=row['Eco End'], eco_offset_mv=bank['eco_offset_mv'],
+            battery_mv_per_c=bank['battery_mv_per_c'], instrument_mv_per_c=bank['instrument_mv_per_c'],
+            mv_per_soc_pct=bank['mv_per_soc_pct'], n_samples=n_samples, seed=rng,
+            budget=UncertaintyBudget(sensor_offset_mv=bank['uncertainty_mv'],
+                                     temp_sensor_c_sd=bank['temp_uncertainty_c']),
+        ).summary()
+        intervals[i] = {
+            'Parasitic Current MC Low (mA)': mc['current_ma']['low'],
+            'Parasitic Current MC High (mA)': mc['current_ma']['high'],
+            'Current SOC MC Low (%)': mc['soc']['low'],
+            'Current SOC MC High (%)': mc['soc']['high'],
+        }
+    return fleet.join(pd.DataFrame.from_dict(intervals, orient='index'))
+
+
+def run_fleet(banks, workers=1, mc_samples=0, seed=None):
+    """Fleet table, one row per bank, analysed in up to `workers` processes.
+
+    With `mc_samples` > 0 each bank also gets Monte Carlo intervals.
+    """
+    if workers <= 1 or len(banks) <= 1:
+        rows = [_analyze_safely(bank) for bank in banks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(banks))) as pool:
+            rows = list(pool.map(_analyze_safely, banks))
+    fleet = add_parasitic_columns(pd.DataFrame(rows), banks)
+    fleet = add_joint_fit_columns(fleet, banks)
+    if mc_samples > 0:
+        fleet = add_monte_carlo_columns(fleet, banks, mc_samples, seed)
+    return fleet
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyse every bank in a fleet manifest')
+    parser.add_argument('manifest', help='fleet manifest (JSON), e.g. config/fleet.example.json')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--out', default='fleet_summary.csv', help='output CSV (default: fleet_summary.csv)')
+    parser.add_argument('--mc-samples', type=int, default=0,
+                        help=f'Monte Carlo samples per bank for percentile intervals (e.g. {DEFAULT_SAMPLES})')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for the Monte Carlo draws')
+    args = parser.parse_args()
+
+    banks = load_manifest(args.manifest)
+    fleet = run_fleet(banks, args.workers, args.mc_samples, args.seed)
+    fleet.to_csv(args.out, index=False)
+
+    print(f"Analysed {len(banks)} banks -> {args.out}")
+    columns = ['Bank', 'Parasitic Current (mA)', 'Parasitic Current CI (mA)', 'Joint Parasitic Current (mA)',
+               'Current SOC (%)', 'Extended Drift Rate (mV/day)', 'Recent Envelope Mean (mV)']
+    print(fleet.reindex(columns=columns).to_string(index=False, float_format=lambda v: f'{v:.2f}'))
+    if 'Error' in fleet.columns:
+        for _, failed in fleet[fleet['Error'].notna()].iterrows():
+            print(f"⚠ {failed['Bank']}: {failed['Error']}")
+
+
+if __name__ == '__main__':
+    main()
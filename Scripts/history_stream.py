@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Streaming Ingestion for Home Assistant History Exports
+Reads history.csv in chunks and builds MA-60 buckets with bounded memory
+"""
+
+import argparse
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from ingest import LAYOUTS, parse_datetime
+from ma60 import BUCKET_NS, MA60_COLUMNS, MIN_SAMPLES, MA60Aggregator
+from quantization import is_raw_reading
+
+DEFAULT_CHUNKSIZE = 1_000_000
+HA_LAYOUT = LAYOUTS['home_assistant']
+
+
+class HistoryBatch(NamedTuple):
+    """One chunk of numeric history rows, sorted by time."""
+    timestamps: np.ndarray   # int64 epoch ns (UTC)
+    millivolts: np.ndarray   # int32
+    raw: np.ndarray          # bool, True for raw 10 mV readings (False for hourly means)
+
+
+def iter_history_batches(path, chunksize=DEFAULT_CHUNKSIZE, entity_id=None):
+    """Yield typed HistoryBatch chunks from a Home Assistant history export.
+
+    Non-numeric states ('unavailable', 'unknown') are dropped per chunk, and
+    only the state and last_changed columns are materialised, so memory is
+    bounded by `chunksize` rather than by the export size. An export with an
+    entity_id column must hold one sensor, or `entity_id` must pick one:
+    readings of several sensors are never merged into one stream.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    has_entity = 'entity_id' in header
+    if entity_id is not None and not has_entity:
+        raise ValueError(f"{path} has no entity_id column to select {entity_id!r} from")
+    usecols = ['entity_id', 'state', 'last_changed'] if has_entity else ['state', 'last_changed']
+    reader = pd.read_csv(path, usecols=usecols, dtype=str, chunksize=chunksize)
+    seen = None
+    for chunk in reader:
+        if entity_id is not None:
+            chunk = chunk[chunk['entity_id'] == entity_id]
+        elif has_entity:
+            entities = set(chunk['entity_id'].dropna().unique())
+            seen = entities if seen is None else seen | entities
+            if len(seen) > 1:
+                raise ValueError(f"{path} holds several sensors ({', '.join(sorted(seen))}); "
+                                 f"pass entity_id= to pick one")
+        voltage = pd.to_numeric(chunk['state'], errors='coerce').to_numpy(dtype=np.float64)
+        keep = ~np.isnan(voltage)
+        if not keep.any():
+            continue
+        voltage = voltage[keep]
+        timestamps = parse_datetime([chunk['last_changed'].to_numpy(dtype=object)[keep]],
+                                    HA_LAYOUT.formats, utc=True).view(np.int64)
+        order = np.argsort(timestamps, kind='stable')
+        voltage = voltage[order]
+        yield HistoryBatch(
+            timestamps=timestamps[order],
+            millivolts=np.rint(voltage * 1000).astype(np.int32),
+            raw=is_raw_reading(voltage),
+        )
+
+
+def iter_ma60_buckets(batches, min_samples=MIN_SAMPLES, aggregator=None):
+    """Yield finalized 60-second buckets of raw readings as DataFrames.
+
+    Each batch is folded into an MA60Aggregator; every bucket before the
+    batch's last minute is then final and emitted, while the open minute is
+    held back for the next batch. Batches must arrive in time order, as Home
+    Assistant exports do; one that reaches back into an emitted minute
+    raises ValueError rather than producing a second bucket for it. Pass
+    `aggregator` to receive the full state as well (e.g. to save it for
+    later incremental refreshes).
+    """
+    pending = MA60Aggregator()
+    emitted_until = None   # start of the open minute: every earlier bucket has been yielded
+    for batch in batches:
+        ts = batch.timestamps[batch.raw]
+        if len(ts) == 0:
+            continue
+        if emitted_until is not None and ts[0] < emitted_until:
+            raise ValueError(f"history batch starting {pd.Timestamp(int(ts[0]))} reaches back before "
+                             f"buckets already emitted; the export must be sorted by time")
+        emitted_until = ts[-1] // BUCKET_NS * BUCKET_NS
+        pending.update(ts, batch.millivolts[batch.raw])
+        done = pending.split_before(ts[-1])
+        if aggregator is not None:
+            aggregator.merge_from(done)
+        yield done.to_frame(min_samples)
+    if aggregator is not None:
+        aggregator.merge_from(pending)
+    yield pending.to_frame(min_samples)
+
+
+def stream_ma60(path, chunksize=DEFAULT_CHUNKSIZE, entity_id=None, min_samples=MIN_SAMPLES):
+    """MA-60 table for a history export, built chunk by chunk."""
+    frames = list(iter_ma60_buckets(iter_history_batches(path, chunksize, entity_id), min_samples))
+    if not frames:
+        return pd.DataFrame(columns=MA60_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a Home Assistant history export into MA-60 buckets')
+    parser.add_argument('history', help='path to history.csv')
+    parser.add_argument('--out', default='ma60.csv', help='output CSV (default: ma60.csv)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--entity-id', default=None, help='keep only this sensor')
+    parser.add_argument('--state', default=None,
+                        help='MA-60 state file (.npz); only readings newer than the saved state are ingested')
+    args = parser.parse_args()
+
+    batches = iter_history_batches(args.history, args.chunksize, args.entity_id)
+
+    if args.state:
+        state = MA60Aggregator.load(args.state) if os.path.exists(args.state) else MA60Aggregator()
+        since = state.max_timestamp_ns
+        n_new = 0
+        for batch in batches:
+            new = batch.raw if since is None else batch.raw & (batch.timestamps > since)
+            state.update(batch.timestamps[new], batch.millivolts[new])
+            n_new += int(new.sum())
+        state.save(args.state)
+        ma60 = state.to_frame()
+        ma60.to_csv(args.out, index=False)
+        print(f"Ingested {n_new} new readings; wrote {len(ma60)} MA-60 buckets to {args.out}")
+        return
+
+    first = True
+    n_buckets = 0
+    for frame in iter_ma60_buckets(batches):
+        frame.to_csv(args.out, mode='w' if first else 'a', header=first, index=False)
+        first = False
+        n_buckets += len(frame)
+    print(f"Wrote {n_buckets} MA-60 buckets to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
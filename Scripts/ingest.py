@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Schema-Adaptive CSV Ingest
+Detects which known export layout a CSV uses and normalizes it to one typed schema per sensor
+"""
+
+import argparse
+import re
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# Columns every layout of a kind is normalized to (Datetime is naive datetime64[ns])
+SCHEMAS = {
+    'voltage': ['Datetime', 'Min', 'Max', 'Midpoint', 'Spread'],
+    'temperature': ['Datetime', 'Min', 'Max', 'Temp_Midpoint'],
+    'humidity': ['Datetime', 'Humidity'],
+    'history': ['Datetime', 'voltage', 'entity_id'],  # entity_id only when the export has it
+}
+
+
+class Layout(NamedTuple):
+    name: str
+    kinds: tuple            # sensor kinds the layout is used for
+    columns: tuple          # header columns that identify it
+    datetime: tuple         # column(s) holding the timestamp, joined with ' ' when several
+    formats: tuple          # fixed strptime-style format per datetime column
+    rename: dict            # source column -> schema column
+    utc: bool = False       # timestamps carry a zone and are converted to naive UTC
+
+
+_LAYOUTS = [
+    # Shelly exports in Data/ and data/ (voltage and temperature share the header)
+    Layout('date_time_minmax', ('voltage', 'temperature'), ('Date', 'Time', 'Min', 'Max'),
+           ('Date', 'Time'), ('%d/%m/%Y', '%H:%M'), {}),
+    Layout('date_time_humidity', ('humidity',), ('Date', 'Time', 'Humidity'),
+           ('Date', 'Time'), ('%d/%m/%Y', '%H:%M'), {}),
+    # Layout described in docs/METHODS.md (UTC; 'T', 'Z' and '+00:00' variants fall back to ISO 8601)
+    Layout('iso_voltage', ('voltage',), ('Timestamp', 'Voltage_Min', 'Voltage_Max'),
+           ('Timestamp',), ('%Y-%m-%d %H:%M:%S',), {'Voltage_Min': 'Min', 'Voltage_Max': 'Max'}, utc=True),
+    # Home Assistant history export (entity_id is optional)
+    Layout('home_assistant', ('history',), ('state', 'last_changed'),
+           ('last_changed',), ('%Y-%m-%dT%H:%M:%S.%fZ',), {'state': 'voltage'}, utc=True),
+]
+LAYOUTS = {layout.name: layout for layout in _LAYOUTS}
+
+_FIELD_WIDTHS = {'Y': 4, 'm': 2, 'd': 2, 'H': 2, 'M': 2, 'S': 2}
+_FIELD_RANGES = {'m': (1, 12), 'd': (1, 31), 'H': (0, 23), 'M': (0, 59), 'S': (0, 59)}
+_NS = {'H': 3_600 * 10**9, 'M': 60 * 10**9, 'S': 10**9}
+
+
+def detect_layout(columns, kind=None):
+    """The Layout whose identifying columns are all in `columns`.
+
+    Raises ValueError for an unknown header, or when the header is shared by
+    several kinds (voltage and temperature exports) and `kind` is not given.
+    """
+    columns = set(columns)
+    for layout in LAYOUTS.values():
+        if not columns.issuperset(layout.columns):
+            continue
+        if kind is not None and kind not in layout.kinds:
+            continue
+        if kind is None and len(layout.kinds) > 1:
+            raise ValueError(f"layout {layout.name!r} is used for {' and '.join(layout.kinds)} exports; "
+                             "pass kind= to choose")
+        return layout
+    wanted = f" for {kind}" if kind else ""
+    raise ValueError(f"unrecognised CSV layout{wanted}: columns {sorted(columns)}")
+
+
+# ============================================================================
+# FIXED-FORMAT DATETIME PARSING
+# ============================================================================
+
+def _days_from_civil(year, month, day):
+    # Days since 1970-01-01 in the proleptic Gregorian calendar (H. Hinnant's algorithm)
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    yoe = year - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146_097 + doe - 719_468
+
+
+def _compile(fmt, width):
+    """[(directive or None, start, length, literal)] for a format applied to `width`-byte strings."""
+    tokens = re.findall(r'%(.)|([^%]+)', fmt)
+    fixed = sum(_FIELD_WIDTHS.get(d, 0) + len(lit) for d, lit in tokens)
+    fields, pos = [], 0
+    for directive, literal in tokens:
+        if literal:
+            fields.append((None, pos, len(literal), literal.encode('ascii')))
+            pos += len(literal)
+        elif directive == 'f':
+            n = width - fixed          # fractional digits take whatever width is left
+            if not 1 <= n <= 9:
+                return None
+            fields.append(('f', pos, n, None))
+            pos += n
+        elif directive in _FIELD_WIDTHS:
+            fields.append((directive, pos, _FIELD_WIDTHS[directive], None))
+            pos += _FIELD_WIDTHS[directive]
+        else:
+            raise ValueError(f"unsupported directive %{directive} in {fmt!r}")
+    return fields if pos == width else None
+
+
+def parse_fixed(strings, fmt):
+    """Nanoseconds since the epoch for fixed-width strings in `fmt`, or None if any string deviates.
+
+    Supports %Y %m %d %H %M %S, %f (any number of digits, the same in every
+    row) and literal characters. The strings are copied once into a byte
+    matrix and every field is read as a column of digits, so there is no
+    per-row format matching; a format without a date yields time-of-day
+    offsets. Any row of a different width, a non-digit in a field or an
+    out-of-range field makes the whole call return None so the caller can
+    fall back to a general parser.
+    """
+    values = np.asarray(strings, dtype=object)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+    try:
+        width = len(values[0])
+        buf = values.astype(f'S{width + 1}')   # one spare byte shows up any longer string
+    except (TypeError, UnicodeEncodeError):
+        return None
+    fields = _compile(fmt, width)
+    if fields is None:
+        return None
+    chars = buf.view(np.uint8).reshape(len(values), width + 1)
+    if chars[:, width].any() or not chars[:, width - 1].all():
+        return None
+
+    parts = {}
+    for directive, start, n, literal in fields:
+        block = chars[:, start:start + n]
+        if directive is None:
+            if (block != np.frombuffer(literal, dtype=np.uint8)).any():
+                return None
+            continue
+        digits = block.astype(np.int64) - 48
+        if ((digits < 0) | (digits > 9)).any():
+            return None
+        parts[directive] = digits @ (10 ** np.arange(n - 1, -1, -1, dtype=np.int64))
+        if directive == 'f':
+            parts[directive] *= 10 ** (9 - n)
+        elif directive in _FIELD_RANGES:
+            lo, hi = _FIELD_RANGES[directive]
+            if ((parts[directive] < lo) | (parts[directive] > hi)).any():
+                return None
+
+    ns = np.zeros(len(values), dtype=np.int64)
+    if 'Y' in parts or 'm' in parts or 'd' in parts:
+        year, month, day = parts.get('Y', 1970), parts.get('m', 1), parts.get('d', 1)
+        first = _days_from_civil(year, month, 1)
+        month_days = _days_from_civil(year + (month == 12), month % 12 + 1, 1) - first
+        if np.any(day > month_days):
+            return None   # 31/04, 29/02 in a common year, ...
+        ns += (first + day - 1) * 86_400 * 10**9
+    for directive, scale in _NS.items():
+        if directive in parts:
+            ns += parts[directive] * scale
+    return ns + parts.get('f', 0)
+
+
+def parse_datetime(columns, formats, utc=False):
+    """Naive datetime64[ns] array from one or more string columns with fixed formats.
+
+    Uses parse_fixed() column by column and adds the results (a date column
+    plus a time column need no string concatenation). When a column does
+    not match its fixed format, the columns are joined and handed to pandas:
+    with the joined format, or as ISO 8601 for zoned timestamps.
+    """
+    ns = [parse_fixed(col, fmt) for col, fmt in zip(columns, formats)]
+    if all(part is not None for part in ns):
+        return np.sum(ns, axis=0).astype('datetime64[ns]')
+    joined = pd.Series(columns[0], dtype=object)
+    for col in columns[1:]:
+        joined = joined + ' ' + pd.Series(col, dtype=object)
+    if utc:
+        parsed = pd.to_datetime(joined, utc=True, format='ISO8601').dt.tz_localize(None)
+    else:
+        parsed = pd.to_datetime(joined, format=' '.join(formats))
+    return parsed.to_numpy().astype('datetime64[ns]')
+
+
+# ============================================================================
+# NORMALIZATION
+# ============================================================================
+
+def normalize(df, layout, kind=None):
+    """Frame in SCHEMAS[kind] (plus any extra source columns) sorted by Datetime."""
+    kind = kind or layout.kinds[0]
+    datetimes = parse_datetime([df[c].to_numpy(dtype=object) for c in layout.datetime], layout.formats,
+                               layout.utc)
+    out = df.drop(columns=list(layout.datetime)).rename(columns=layout.rename)
+    out.insert(0, 'Datetime', datetimes)
+
+    if kind == 'history':
+        # Filter out non-numeric values (e.g., 'unavailable')
+        out['voltage'] = pd.to_numeric(out['voltage'], errors='coerce').astype('float64')
+        out = out[out['voltage'].notna()]
+    elif kind == 'voltage':
+        out['Midpoint'] = (out['Min'] + out['Max']) / 2
+        out['Spread'] = out['Max'] - out['Min']
+    elif kind == 'temperature':
+        out['Temp_Midpoint'] = (out['Min'] + out['Max']) / 2
+
+    schema = [c for c in SCHEMAS[kind] if c in out.columns]
+    out = out[schema + [c for c in out.columns if c not in schema]]
+    return out.sort_values('Datetime', kind='stable').reset_index(drop=True)
+
+
+def read_export(path, kind=None):
+    """Read any known export layout into the typed schema for its kind.
+
+    The header is read first to pick the layout; the file is then parsed with
+    explicit dtypes and only the columns the layout needs.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    layout = detect_layout(header, kind)
+    kind = kind or layout.kinds[0]
+    dtype = {c: str for c in layout.datetime}
+    if kind == 'history':
+        usecols = [c for c in ('entity_id', 'state', 'last_changed') if c in header]
+        dtype.update({'entity_id': 'category', 'state': str})
+    else:
+        usecols = list(layout.columns)
+        dtype.update({c: 'float64' for c in layout.columns if c not in layout.datetime})
+    return normalize(pd.read_csv(path, usecols=usecols, dtype=dtype), layout, kind)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Detect the layout of a sensor export and normalize it')
+    parser.add_argument('csv', help='export to read')
+    parser.add_argument('--kind', choices=sorted(SCHEMAS), default=None,
+                        help='sensor kind (needed for the Date,Time,Min,Max layout)')
+    parser.add_argument('--out', default=None, help='write the normalized frame to this CSV')
+    args = parser.parse_args()
+
+    header = pd.read_csv(args.csv, nrows=0).columns
+    layout = detect_layout(header, args.kind)
+    df = read_export(args.csv, args.kind)
+    print(f"{args.csv}: layout {layout.name}, {args.kind or layout.kinds[0]}")
+    print(f"   {len(df)} rows, {df['Datetime'].min()} to {df['Datetime'].max()}")
+    print(f"   Columns: {', '.join(df.columns)}")
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print(f"   Saved: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Section Instrumentation
+Wall time, CPU time, peak RSS and row counts per analysis section, with optional per-section profiles
+"""
+
+import atexit
+import cProfile
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import NamedTuple
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import pyinstrument
+    HAVE_PYINSTRUMENT = True
+except ImportError:
+    HAVE_PYINSTRUMENT = False
+
+TRACE_ENV = 'LIFEPO4_TRACE'        # write the section trace here (.json or .csv)
+PROFILE_ENV = 'LIFEPO4_PROFILE'    # dump one profile per top-level section into this directory
+PROFILER_ENV = 'LIFEPO4_PROFILER'  # 'cprofile' (default) or 'pyinstrument'
+
+TRACE_COLUMNS = ['Section', 'Wall_s', 'CPU_s', 'Peak_RSS_MB', 'RSS_Growth_MB', 'Rows']
+
+
+class SectionTiming(NamedTuple):
+    section: str            # 'name', or 'outer/inner' for nested sections
+    wall_s: float
+    cpu_s: float            # user + system time of this process
+    peak_rss_mb: float      # process high-water mark when the section ended
+    rss_growth_mb: float    # how far the section raised that mark
+    rows: int               # rows processed, as reported by the section (0 if not given)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (NaN where unavailable)."""
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10  # bytes on macOS, KB on Linux
+
+
+class _Open:
+    __slots__ = ('name', 'rows', 'wall', 'cpu', 'rss', 'profiler', 'is_mark')
+
+    def __init__(self, name, rows, is_mark):
+        self.name, self.rows, self.is_mark = name, rows or 0, is_mark
+        self.profiler = None
+        self.wall, self.cpu, self.rss = time.perf_counter(), time.process_time(), peak_rss_mb()
+
+
+class Tracer:
+    """Records a SectionTiming for every section of a run.
+
+    Sections are opened with the `section()` context manager, the `timed()`
+    decorator, or, for flat scripts, `mark(name)`, which closes the previous
+    marked section and opens the next. Sections nest. With `profile_dir`,
+    each top-level section also runs under cProfile (or pyinstrument) and
+    its profile is dumped as `<nn>_<section>.prof` / `.html`.
+    """
+
+    def __init__(self, trace_path=None, profile_dir=None, profiler='cprofile'):
+        if profiler not in ('cprofile', 'pyinstrument'):
+            raise ValueError(f"unknown profiler {profiler!r}; expected 'cprofile' or 'pyinstrument'")
+        if profiler == 'pyinstrument' and not HAVE_PYINSTRUMENT:
+            raise ImportError("pyinstrument is not installed; use profiler='cprofile'")
+        self.trace_path = Path(trace_path) if trace_path else None
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.profiler = profiler
+        self.records = []
+        self.started = datetime.now()
+        self._stack = []
+        self._profiled = 0
+
+    # ------------------------------------------------------------------
+    # Sections
+    # ------------------------------------------------------------------
+
+    def _start(self, name, rows=None, is_mark=False):
+        section = _Open(name, rows, is_mark)
+        if self.profile_dir is not None and not self._stack:
+            section.profiler = self._start_profiler()
+        self._stack.append(section)
+        # Re-read the clocks so profiler start-up is not charged to the section
+        section.wall, section.cpu = time.perf_counter(), time.process_time()
+        return section
+
+    def _stop(self):
+        section = self._stack.pop()
+        wall = time.perf_counter() - section.wall
+        cpu = time.process_time() - section.cpu
+        rss = peak_rss_mb()
+        if section.profiler is not None:
+            self._dump_profile(section)
+        path = '/'.join([s.name for s in self._stack] + [section.name])
+        record = SectionTiming(path, wall, cpu, rss, rss - section.rss, int(section.rows))
+        self.records.append(record)
+        return record
+
+    @contextmanager
+    def section(self, name, rows=None):
+        """Time the enclosed block as section `name`; yields the tracer for rows()."""
+        self._start(name, rows)
+        try:
+            yield self
+        finally:
+            self._stop()
+
+    def mark(self, name, rows=None):
+        """Close the current marked section (if any) and start `name`."""
+        self.end_mark()
+        self._start(name, rows, is_mark=True)
+
+    def end_mark(self):
+        """Close the current marked section, if one is open."""
+        if self._stack and self._stack[-1].is_mark:
+            self._stop()
+
+    def rows(self, n):
+        """Add `n` rows to the innermost open section."""
+        if self._stack:
+            self._stack[-1].rows += int(n)
+        return n
+
+    def timed(self, name=None, rows=None):
+        """Decorator form of section(); `rows(result)` may count the rows returned."""
+        def decorate(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.section(name or func.__name__):
+                    result = func(*args, **kwargs)
+                    if rows is not None:
+                        self.rows(rows(result))
+                    return result
+            return wrapper
+        return decorate
+
+    # ------------------------------------------------------------------
+    # Profiles
+    # ------------------------------------------------------------------
+
+    def _start_profiler(self):
+        if self.profiler == 'pyinstrument':
+            profiler = pyinstrument.Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _dump_profile(self, section):
+        self._profiled += 1
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{self._profiled:02d}_{re.sub(r'[^A-Za-z0-9]+', '_', section.name).strip('_').lower()}"
+        if self.profiler == 'pyinstrument':
+            section.profiler.stop()
+            (self.profile_dir / f'{stem}.html').write_text(section.profiler.output_html())
+        else:
+            section.profiler.disable()
+            section.profiler.dump_stats(str(self.profile_dir / f'{stem}.prof'))
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def frame(self):
+        """Recorded sections as a DataFrame with TRACE_COLUMNS, in completion order."""
+        return pd.DataFrame([tuple(r) for r in self.records], columns=TRACE_COLUMNS)
+
+    def write(self, path=None):
+        """Write the trace as CSV (by suffix) or JSON; returns the path."""
+        path = Path(path or self.trace_path)
+        if path.suffix.lower() == '.csv':
+            self.frame().to_csv(path, index=False)
+        else:
+            path.write_text(json.dumps({
+                'started': self.started.isoformat(timespec='seconds'),
+                'argv': sys.argv,
+                'sections': [r._asdict() for r in self.records],
+            }, indent=2))
+        return path
+
+    def report(self):
+        """Sections sorted by wall time, formatted for the console."""
+        lines = [f"   {'Section':<40} {'Wall (s)':>9} {'CPU (s)':>9} {'Peak RSS (MB)':>14} {'Rows':>12}"]
+        for r in sorted(self.records, key=lambda r: -r.wall_s):
+            lines.append(f"   {r.section[:40]:<40} {r.wall_s:>9.3f} {r.cpu_s:>9.3f} "
+                         f"{r.peak_rss_mb:>14.1f} {r.rows:>12,}")
+        return '\n'.join(lines)
+
+    def close(self, echo=False):
+        """Close every open section and write the trace if a path was given. Idempotent.
+
+        With `echo`, a written trace is also printed as report().
+        """
+        while self._stack:
+            self._stop()
+        if self.trace_path is not None and self.records:
+            self.write()
+            if echo:
+                print(f"\nSection timings (trace: {self.trace_path}):")
+                print(self.report())
+
+
+def tracer_from_env():
+    """Tracer configured from LIFEPO4_TRACE / LIFEPO4_PROFILE / LIFEPO4_PROFILER.
+
+    With neither variable set it still records timings (the overhead is a
+    few clock reads per section) but writes nothing. The trace is written
+    at interpreter exit as well, so a run that fails part-way still leaves
+    the sections it finished.
+    """
+    tracer = Tracer(os.environ.get(TRACE_ENV) or None, os.environ.get(PROFILE_ENV) or None,
+                    os.environ.get(PROFILER_ENV, 'cprofile'))
+    if tracer.trace_path is not None:
+        atexit.register(tracer.close)
+    return tracer
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Data Integrity Checks
+Gap runs, duplicate timestamps and quantization checks on int64 epoch arrays
+"""
+
+import argparse
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (HISTORY_FILE, HOURLY_FILE, HUMIDITY_FILE, TEMPERATURE_FILE, load_history, load_hourly,
+                         load_humidity, load_temperature, resolve_data_dir)
+from quantization import ADC_STEP_MV, decimal_places, to_millivolts
+
+GAP_COLUMNS = ['Start', 'End', 'Missing']  # first and last missing slot, slots in the run
+
+# file -> (loader, value column checked for quantization, ADC step in mV or None)
+SENSOR_FILES = {
+    HOURLY_FILE: (load_hourly, 'Min', ADC_STEP_MV),
+    TEMPERATURE_FILE: (load_temperature, 'Temp_Midpoint', None),
+    HUMIDITY_FILE: (load_humidity, 'Humidity', None),
+    HISTORY_FILE: (load_history, 'voltage', None),  # raw readings mixed with hourly means
+}
+
+
+class Quantization(NamedTuple):
+    decimals: int     # most common number of decimal places
+    off_grid: int     # readings off the ADC step grid (0 when no step is given)
+    rows: int
+
+
+class IntegrityReport(NamedTuple):
+    rows: int
+    start: pd.Timestamp
+    end: pd.Timestamp
+    duplicates: int       # rows repeating an earlier timestamp
+    out_of_order: int     # rows earlier than their predecessor
+    gaps: pd.DataFrame    # GAP_COLUMNS, one row per run of missing slots
+    missing: int          # missing slots in total
+    quantization: Quantization
+
+
+def epoch_ns(datetimes):
+    """Naive datetimes as an int64 array of nanoseconds since the epoch."""
+    return pd.DatetimeIndex(datetimes).as_unit('ns').asi8
+
+
+def step_ns(freq):
+    """Sampling interval ('h', '1min', '15s', ...) in nanoseconds."""
+    return pd.Timedelta(pd.tseries.frequencies.to_offset(freq)).value
+
+
+def _sorted(t_ns):
+    if len(t_ns) > 1 and (t_ns[1:] < t_ns[:-1]).any():
+        return np.sort(t_ns)
+    return t_ns
+
+
+# ============================================================================
+# TIMESTAMPS
+# ============================================================================
+
+def gap_runs(datetimes, freq='h'):
+    """Runs of empty slots on the regular grid `freq` anchored at the first sample.
+
+    Each sample occupies slot (t - t0) // step, so hourly exports are checked
+    hour by hour and minute data minute by minute; a slot is missing when no
+    sample falls in it. The work is one integer division and one diff over
+    the epoch array (plus a sort if the input is out of order), so it scales
+    linearly to years of minute data, and the result holds one row per run
+    rather than one per missing slot.
+    """
+    t_ns = _sorted(epoch_ns(datetimes))
+    if len(t_ns) < 2:
+        return pd.DataFrame({'Start': pd.to_datetime([]), 'End': pd.to_datetime([]),
+                             'Missing': np.empty(0, dtype=np.int64)})
+    step = step_ns(freq)
+    slots = (t_ns - t_ns[0]) // step
+    jumps = np.diff(slots)
+    at = np.flatnonzero(jumps > 1)
+    first = slots[at] + 1
+    last = slots[at + 1] - 1
+    return pd.DataFrame({
+        'Start': pd.to_datetime(t_ns[0] + first * step),
+        'End': pd.to_datetime(t_ns[0] + last * step),
+        'Missing': last - first + 1,
+    })
+
+
+def count_missing(gaps, freq='h', start=None, end=None):
+    """Missing slots in `gaps` (from gap_runs) that fall within [start, end]."""
+    if len(gaps) == 0:
+        return 0
+    step = step_ns(freq)
+    first = epoch_ns(gaps['Start'])
+    n = gaps['Missing'].to_numpy()
+    lo = np.zeros(len(n), dtype=np.int64)
+    hi = n - 1
+    if start is not None:
+        lo = np.maximum(lo, -((first - pd.Timestamp(start).value) // step))  # ceil division
+    if end is not None:
+        hi = np.minimum(hi, (pd.Timestamp(end).value - first) // step)
+    return int(np.maximum(hi - lo + 1, 0).sum())
+
+
+def missing_times(gaps, freq='h'):
+    """Every missing slot in `gaps` as a DatetimeIndex (for per-day breakdowns)."""
+    step = step_ns(freq)
+    n = gaps['Missing'].to_numpy()
+    offsets = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    return pd.DatetimeIndex(np.repeat(epoch_ns(gaps['Start']), n) + offsets * step)
+
+
+def duplicate_count(datetimes):
+    """(rows repeating an earlier timestamp, rows earlier than their predecessor)."""
+    t_ns = epoch_ns(datetimes)
+    out_of_order = int((t_ns[1:] < t_ns[:-1]).sum())
+    duplicates = int((np.diff(_sorted(t_ns)) == 0).sum())
+    return duplicates, out_of_order
+
+
+# ============================================================================
+# VALUES
+# ============================================================================
+
+def check_quantization(values, step_mv=None):
+    """Modal decimal places and, given an ADC step, how many readings are off its grid.
+
+    Both checks are integer residuals: values scaled by 10**d are compared
+    with their rounding, and integer millivolts are taken modulo the step.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return Quantization(0, 0, 0)
+    decimals = int(np.bincount(decimal_places(values)).argmax())
+    off_grid = 0
+    if step_mv:
+        off_grid = int((to_millivolts(values) % step_mv != 0).sum())
+    return Quantization(decimals, off_grid, len(values))
+
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+
+def check_series(datetimes, values=None, freq='h', step_mv=None):
+    """Full integrity report for one time series."""
+    t_ns = epoch_ns(datetimes)
+    duplicates, out_of_order = duplicate_count(t_ns)
+    gaps = gap_runs(t_ns, freq)
+    quantization = check_quantization(values, step_mv) if values is not None else Quantization(0, 0, 0)
+    start, end = (pd.Timestamp(t_ns.min()), pd.Timestamp(t_ns.max())) if len(t_ns) else (pd.NaT, pd.NaT)
+    return IntegrityReport(len(t_ns), start, end, duplicates, out_of_order, gaps,
+                           int(gaps['Missing'].sum()), quantization)
+
+
+def check_data_dir(data_dir=None, freq='h'):
+    """{file name: IntegrityReport} for every sensor export present in a data directory."""
+    data_dir = resolve_data_dir(data_dir)
+    reports = {}
+    for filename, (loader, column, step_mv) in SENSOR_FILES.items():
+        if not (data_dir / filename).exists():
+            continue
+        df = loader(data_dir)
+        reports[filename] = check_series(df['Datetime'], df[column], freq=freq, step_mv=step_mv)
+    return reports
+
+
+def gap_table(reports):
+    """All gap runs from check_data_dir() in one frame with a File column."""
+    frames = [r.gaps.assign(File=name) for name, r in reports.items() if len(r.gaps)]
+    if not frames:
+        return pd.DataFrame(columns=['File'] + GAP_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[['File'] + GAP_COLUMNS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check sensor exports for gaps, duplicates and quantization')
+    parser.add_argument('data_dir', nargs='?', default=None, help='data directory (default: $LIFEPO4_DATA_DIR or Data/)')
+    parser.add_argument('--freq', default='h', help="expected sampling interval (default: 'h')")
+    parser.add_argument('--gaps', default=None, help='write the gap-run table to this CSV')
+    args = parser.parse_args()
+
+    reports = check_data_dir(args.data_dir, args.freq)
+    for name, r in reports.items():
+        print(f"{name}: {r.rows} rows, {r.start} to {r.end}")
+        print(f"   Missing slots: {r.missing} in {len(r.gaps)} runs"
+              + (f" (longest {r.gaps['Missing'].max()})" if len(r.gaps) else ""))
+        print(f"   Duplicate timestamps: {r.duplicates}, out of order: {r.out_of_order}")
+        print(f"   Precision: {r.quantization.decimals} decimal places, {r.quantization.off_grid} off grid")
+
+    gaps = gap_table(reports)
+    if args.gaps:
+        gaps.to_csv(args.gaps, index=False)
+        print(f"Saved {len(gaps)} gap runs to {args.gaps}")
+    elif len(gaps):
+        print(gaps.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Joint Drift, Temperature and Eco Mode Regression
+One least-squares fit of voltage on time, temperature, the Eco Mode step and diurnal harmonics, batched across banks
+"""
+
+import argparse
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from align import load_aligned
+from parasitic import MV_PER_SOC_PCT, drift_current_ma
+from phases import load_phases
+from soc import fahrenheit_to_celsius
+
+DIURNAL_HARMONICS = 2          # 24 h and 12 h cycles
+DEFAULT_WINDOW = 'stasis'      # phase fitted by default: no charging or load tests
+NS_PER_DAY = 86_400 * 10**9
+NS_PER_HOUR = 3_600 * 10**9
+
+BASE_TERMS = ['intercept', 'drift_mv_per_day', 'temp_mv_per_c', 'eco_step_mv', 'no_temp_offset_mv']
+
+
+def term_names(harmonics=DIURNAL_HARMONICS):
+    names = list(BASE_TERMS)
+    for k in range(1, harmonics + 1):
+        names += [f'diurnal_sin_{k}', f'diurnal_cos_{k}']
+    return names
+
+
+class BankSeries(NamedTuple):
+    """One bank's hourly inputs to the joint fit."""
+    datetime: np.ndarray            # datetime64[ns]
+    voltage: np.ndarray             # V
+    temp_c: np.ndarray              # °C, NaN where no reading
+    eco_time: Optional[pd.Timestamp] = None
+
+
+class JointFit(NamedTuple):
+    """Coefficients of every bank; terms a bank's data cannot identify are NaN."""
+    terms: list
+    coef: np.ndarray                # (banks, terms)
+    stderr: np.ndarray              # (banks, terms), assumes independent hourly residuals
+    n: np.ndarray                   # hours used per bank
+    rmse_mv: np.ndarray
+
+    def term(self, name):
+        return self.coef[:, self.terms.index(name)]
+
+    @property
+    def drift_mv_per_day(self):
+        """Drift with temperature, Eco Mode and the diurnal cycle held fixed: the self-discharge signal."""
+        return self.term('drift_mv_per_day')
+
+    @property
+    def temp_mv_per_c(self):
+        """Combined battery + instrument thermal coefficient."""
+        return self.term('temp_mv_per_c')
+
+    @property
+    def eco_step_mv(self):
+        return self.term('eco_step_mv')
+
+    def to_frame(self, names=None):
+        frame = pd.DataFrame(self.coef, columns=self.terms)
+        for name in ('drift_mv_per_day', 'temp_mv_per_c', 'eco_step_mv'):
+            frame[f'{name}_stderr'] = self.stderr[:, self.terms.index(name)]
+        frame['n'] = self.n
+        frame['rmse_mv'] = self.rmse_mv
+        if names is not None:
+            frame.insert(0, 'Bank', list(names))
+        return frame
+
+
+def design_matrix(datetimes, temp_c, eco_time=None, harmonics=DIURNAL_HARMONICS):
+    """Regressors for one bank, in term_names() order.
+
+    Time and temperature are centred on the bank's own means so the columns
+    are close to orthogonal to the intercept; the slopes are unchanged. The
+    Eco column is 1 from `eco_time` on. Hours without a temperature reading
+    are kept at the mean temperature and flagged in the no-temperature
+    column, whose offset absorbs them, so a temperature export that starts
+    late does not throw away the rest of the record.
+    """
+    t_ns = np.asarray(datetimes, dtype='datetime64[ns]').view(np.int64)
+    temp_c = np.asarray(temp_c, dtype=np.float64)
+    X = np.empty((len(t_ns), len(BASE_TERMS) + 2 * harmonics))
+    X[:, 0] = 1.0
+    days = (t_ns - t_ns[0]) / NS_PER_DAY if len(t_ns) else np.empty(0)
+    X[:, 1] = days - days.mean() if len(days) else days
+    known = ~np.isnan(temp_c)
+    X[:, 2] = np.where(known, temp_c - (temp_c[known].mean() if known.any() else 0.0), 0.0)
+    X[:, 3] = 0.0 if eco_time is None else t_ns >= pd.Timestamp(eco_time).as_unit('ns').value
+    X[:, 4] = ~known
+    phase = 2 * np.pi * ((t_ns % NS_PER_DAY) / NS_PER_HOUR) / 24
+    for k in range(1, harmonics + 1):
+        X[:, len(BASE_TERMS) + 2 * k - 2] = np.sin(k * phase)
+        X[:, len(BASE_TERMS) + 2 * k - 1] = np.cos(k * phase)
+    return X
+
+
+def fit_banks(series, harmonics=DIURNAL_HARMONICS):
+    """Least-squares fit of every bank at once.
+
+    Each bank's design matrix is padded with zero-weight rows to the longest
+    bank and stacked into one (banks, hours, terms) array, which one batched
+    np.linalg.svd factorizes; coefficients and standard errors both come
+    from that factorization. Padded rows and hours without a voltage
+    contribute nothing, which makes the result identical to fitting each
+    bank separately. A term whose column is constant over a bank's rows (no
+    Eco switch inside the window, no temperature export, or one that covers
+    every hour) is dropped for that bank. Singular values below the rank
+    tolerance are discarded, and a term is reported only if it lies in the
+    row space of what remains, so collinear terms (e.g. a temperature export
+    that starts exactly at the Eco switch) come out NaN instead of as huge,
+    offsetting coefficients.
+    """
+    terms = term_names(harmonics)
+    p = len(terms)
+    n_banks = len(series)
+    length = max((len(s.datetime) for s in series), default=0)
+
+    X = np.zeros((n_banks, length, p))
+    y = np.zeros((n_banks, length))
+    w = np.zeros((n_banks, length))
+    for b, s in enumerate(series):
+        m = len(s.datetime)
+        X[b, :m] = design_matrix(s.datetime, s.temp_c, s.eco_time, harmonics)
+        y[b, :m] = np.asarray(s.voltage, dtype=np.float64) * 1000
+        w[b, :m] = 1.0
+    valid = (w > 0) & ~np.isnan(y) & ~np.isnan(X).any(axis=2)
+    X[~valid] = 0.0
+    y[~valid] = 0.0
+
+    # A column identifies its term only if it varies over the bank's valid rows
+    big = np.where(valid[..., None], X, np.inf).min(axis=1)
+    small = np.where(valid[..., None], X, -np.inf).max(axis=1)
+    active = small - big > 0
+    active[:, 0] = valid.any(axis=1)
+    X = np.where(active[:, None, :], X, 0.0)
+
+    # Unit-norm columns so the rank tolerance does not depend on units
+    scale = np.sqrt((X ** 2).sum(axis=1))
+    scale[scale == 0] = 1.0
+    U, sv, Vt = np.linalg.svd(X / scale[:, None, :], full_matrices=False)
+    tol = sv.max(axis=1, initial=0.0, keepdims=True) * max(length, p) * np.finfo(np.float64).eps
+    kept = sv > tol
+    inv_sv = np.where(kept, 1.0 / np.where(kept, sv, 1.0), 0.0)
+    coef = np.einsum('bkj,bk,bnk,bn->bj', Vt, inv_sv, U, y) / scale
+    # e_j lies in the row space (term j is estimable) when the kept right singular vectors span it
+    identified = active & (np.einsum('bkj,bk->bj', Vt ** 2, kept) > 1 - 1e-8)
+
+    resid = (y - np.einsum('bni,bi->bn', X, coef)) * valid
+    n = valid.sum(axis=1)
+    dof = n - kept.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma2 = np.where(dof > 0, (resid ** 2).sum(axis=1) / dof, np.nan)
+        stderr = np.sqrt(sigma2[:, None] * np.einsum('bkj,bk->bj', Vt ** 2, inv_sv ** 2)) / scale
+        rmse = np.sqrt((resid ** 2).sum(axis=1) / n)
+    coef = np.where(identified, coef, np.nan)
+    stderr = np.where(identified, stderr, np.nan)
+    return JointFit(terms, coef, stderr, n, rmse)
+
+
+def self_discharge_ma(fit, capacity_ah=500, mv_per_soc_pct=MV_PER_SOC_PCT):
+    """Parasitic current of every bank from its corrected drift; arguments broadcast per bank."""
+    return drift_current_ma(fit.drift_mv_per_day, capacity_ah, mv_per_soc_pct)
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def bank_series(data_dir=None, phases=None, window=DEFAULT_WINDOW, column='Midpoint'):
+    """A bank's hourly `column` and temperature over phase `window` (None = whole record).
+
+    `phases` defaults to the bank's load_phases(); its 'eco_mode' event,
+    when present, places the Eco step.
+    """
+    phases = phases or load_phases(data_dir)
+    aligned = load_aligned(data_dir)
+    if window is not None:
+        aligned = phases.index(aligned)[window]
+    try:
+        eco_time = phases.event('eco_mode')
+    except KeyError:
+        eco_time = None
+    return BankSeries(aligned['Datetime'].to_numpy(dtype='datetime64[ns]'),
+                      aligned[column].to_numpy(dtype=np.float64),
+                      fahrenheit_to_celsius(aligned['Temp_Midpoint']), eco_time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit drift, temperature and Eco Mode jointly for one or more banks')
+    parser.add_argument('data_dirs', nargs='*', default=[None],
+                        help='one data directory per bank (default: $LIFEPO4_DATA_DIR or Data/)')
+    parser.add_argument('--window', default=DEFAULT_WINDOW, help=f'phase to fit (default: {DEFAULT_WINDOW})')
+    parser.add_argument('--harmonics', type=int, default=DIURNAL_HARMONICS,
+                        help=f'diurnal harmonics (default: {DIURNAL_HARMONICS})')
+    parser.add_argument('--capacity-ah', type=float, default=500, help='bank capacity (default: 500)')
+    parser.add_argument('--out', default=None, help='write the coefficients to this CSV')
+    args = parser.parse_args()
+
+    names = [Path(d).resolve().name if d else 'default' for d in args.data_dirs]
+    fit = fit_banks([bank_series(d, window=args.window) for d in args.data_dirs], args.harmonics)
+    table = fit.to_frame(names)
+    table['current_ma'] = self_discharge_ma(fit, args.capacity_ah)
+    columns = ['Bank', 'n', 'drift_mv_per_day', 'temp_mv_per_c', 'eco_step_mv', 'current_ma', 'rmse_mv']
+    print(table[columns].to_string(index=False, float_format=lambda v: f'{v:.2f}'))
+    if args.out:
+        table.to_csv(args.out, index=False)
+        print(f"Saved: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Incremental MA-60 Aggregator
+Per-bucket sufficient statistics that update in O(new rows) and merge associatively
+"""
+
+import numpy as np
+import pandas as pd
+
+BUCKET_NS = 60 * 10**9
+DAY_NS = 86_400 * 10**9
+MIN_SAMPLES = 4  # matches the `Sample_Count > 3` filter in the analysis scripts
+
+MA60_COLUMNS = ['Datetime', 'MA60_Mean', 'MA60_Std', 'MA60_Min', 'MA60_Max', 'Sample_Count']
+DAILY_COLUMNS = ['Date', 'Mean', 'Std', 'Min', 'Max', 'Total_Samples']
+
+_STATE_FIELDS = ('bucket', 'count', 'total', 'total_sq', 'vmin', 'vmax')
+
+
+def _reduce_sorted(bucket, count, total, total_sq, vmin, vmax):
+    """Combine runs of equal bucket ids in sorted partial-state arrays."""
+    if len(bucket) == 0:
+        return bucket, count, total, total_sq, vmin, vmax
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    if len(starts) == len(bucket):
+        return bucket, count, total, total_sq, vmin, vmax
+    return (
+        bucket[starts],
+        np.add.reduceat(count, starts),
+        np.add.reduceat(total, starts),
+        np.add.reduceat(total_sq, starts),
+        np.minimum.reduceat(vmin, starts),
+        np.maximum.reduceat(vmax, starts),
+    )
+
+
+class MA60Aggregator:
+    """Sufficient statistics (count, sum, sum of squares, min, max) per 60-second bucket.
+
+    Values are integer millivolts, so sums are exact and the result does not
+    depend on the order in which rows, files or workers are combined:
+    `a.merge(b).merge(c)` equals `a.merge(b.merge(c))`. Mean and sample std
+    per bucket are derived on demand, and the daily summary is cached per day
+    so an update only recomputes the days it touched.
+    """
+
+    def __init__(self):
+        # State is a list of sorted, reduced, non-overlapping chunks in time
+        # order, so appending new minutes adds a chunk instead of copying all
+        # earlier ones. Reading a whole field consolidates them into a single
+        # chunk, which serves every read until the next append; the daily
+        # summary reads only the chunks covering the days it refreshes.
+        self._chunks = []
+        self.max_timestamp_ns = None    # newest reading seen, for incremental ingestion
+        self._daily_cache = {}          # day number -> summary row
+        self._daily_min_samples = None  # min_samples the cache was built with
+        self._dirty_days = set()
+
+    def __len__(self):
+        return sum(len(chunk[0]) for chunk in self._chunks)
+
+    def _state(self):
+        if not self._chunks:
+            return tuple(np.empty(0, dtype=np.int64) for _ in _STATE_FIELDS)
+        if len(self._chunks) > 1:
+            self._chunks = [tuple(np.concatenate(arrs) for arrs in zip(*self._chunks))]
+        return self._chunks[0]
+
+    def _between(self, lo, hi):
+        """State of the buckets in [lo, hi), read only from the chunks that overlap it."""
+        pieces = []
+        for chunk in reversed(self._chunks):
+            if chunk[0][-1] < lo:
+                break
+            if chunk[0][0] >= hi:
+                continue
+            start, stop = np.searchsorted(chunk[0], [lo, hi], side='left')
+            pieces.insert(0, tuple(arr[start:stop] for arr in chunk))
+        if not pieces:
+            return tuple(np.empty(0, dtype=np.int64) for _ in _STATE_FIELDS)
+        if len(pieces) == 1:
+            return pieces[0]
+        return tuple(np.concatenate(arrs) for arrs in zip(*pieces))
+
+    def _set_state(self, state):
+        self._chunks = [tuple(state)] if len(state[0]) else []
+
+    # bucket start (units of 60 s since epoch) and the per-bucket statistics
+    bucket = property(lambda self: self._state()[0])
+    count = property(lambda self: self._state()[1])
+    total = property(lambda self: self._state()[2])
+    total_sq = property(lambda self: self._state()[3])
+    vmin = property(lambda self: self._state()[4])
+    vmax = property(lambda self: self._state()[5])
+
+    def _mark_dirty(self, buckets):
+        if len(buckets):
+            self._dirty_days.update(np.unique(buckets * BUCKET_NS // DAY_NS).tolist())
+
+    @property
+    def n_samples(self):
+        return int(sum(chunk[1].sum() for chunk in self._chunks))
+
+    @property
+    def last_timestamp(self):
+        """Start of the latest bucket as a Timestamp, or None when empty."""
+        return pd.Timestamp(int(self._chunks[-1][0][-1]) * BUCKET_NS) if self._chunks else None
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _partial(timestamps_ns, millivolts):
+        """Reduce new rows to per-bucket partial states."""
+        bucket = np.asarray(timestamps_ns, dtype=np.int64) // BUCKET_NS
+        mv = np.asarray(millivolts, dtype=np.int64)
+        order = np.argsort(bucket, kind='stable')
+        bucket, mv = bucket[order], mv[order]
+        ones = np.ones(len(bucket), dtype=np.int64)
+        return _reduce_sorted(bucket, ones, mv, mv * mv, mv, mv)
+
+    def _absorb(self, partial):
+        """Fold sorted, reduced partial state into this aggregator."""
+        bucket = partial[0]
+        if len(bucket) == 0:
+            return self
+        self._mark_dirty(bucket)
+        partial = tuple(partial)
+        if not self._chunks:
+            self._chunks = [partial]
+            return self
+
+        # Only chunks reaching the first new bucket are rewritten; data that
+        # starts after the last bucket is appended as a chunk, so the cost is
+        # O(new buckets) plus whatever existing buckets it overlaps.
+        touched = []
+        while self._chunks and self._chunks[-1][0][-1] >= bucket[0]:
+            touched.insert(0, self._chunks.pop())
+        if touched:
+            first = touched[0]
+            split = np.searchsorted(first[0], bucket[0], side='left')
+            if split:
+                self._chunks.append(tuple(arr[:split] for arr in first))
+                touched[0] = tuple(arr[split:] for arr in first)
+            combined = tuple(np.concatenate(arrs) for arrs in zip(*touched, partial))
+            order = np.argsort(combined[0], kind='stable')
+            partial = _reduce_sorted(*(arr[order] for arr in combined))
+        self._chunks.append(partial)
+        return self
+
+    def _note_timestamp(self, timestamp_ns):
+        if timestamp_ns is not None:
+            if self.max_timestamp_ns is None or timestamp_ns > self.max_timestamp_ns:
+                self.max_timestamp_ns = int(timestamp_ns)
+
+    def update(self, timestamps_ns, millivolts):
+        """Add raw readings (int64 epoch ns, integer millivolts). Returns self."""
+        timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+        if len(timestamps_ns):
+            self._note_timestamp(timestamps_ns.max())
+        return self._absorb(self._partial(timestamps_ns, millivolts))
+
+    def update_frame(self, df, time_col='Datetime', voltage_col='voltage'):
+        """Add raw readings from a DataFrame with datetime and volt columns."""
+        ts = pd.DatetimeIndex(df[time_col]).as_unit('ns').asi8
+        mv = np.rint(df[voltage_col].to_numpy(dtype=np.float64) * 1000).astype(np.int64)
+        return self.update(ts, mv)
+
+    def merge_from(self, other):
+        """Fold another aggregator's partial state into this one in place. Returns self."""
+        self._note_timestamp(other.max_timestamp_ns)
+        return self._absorb(other._state())
+
+    def merge(self, other):
+        """Return a new aggregator holding the union of two partial states."""
+        return MA60Aggregator().merge_from(self).merge_from(other)
+
+    def split_before(self, timestamp_ns):
+        """Remove and return the buckets that start before `timestamp_ns`."""
+        cut = np.searchsorted(self.bucket, int(timestamp_ns) // BUCKET_NS, side='left')
+        done = MA60Aggregator()
+        done._set_state(tuple(arr[:cut] for arr in self._state()))
+        self._set_state(tuple(arr[cut:] for arr in self._state()))
+        self._daily_min_samples = None  # force a full rebuild of the daily cache
+        return done
+
+    # ------------------------------------------------------------------
+    # Outputs
+    # ------------------------------------------------------------------
+
+    def to_frame(self, min_samples=MIN_SAMPLES):
+        """MA-60 table with the same columns as the analysis scripts."""
+        keep = self.count >= min_samples
+        count = self.count[keep].astype(np.float64)
+        total = self.total[keep].astype(np.float64)
+        total_sq = self.total_sq[keep].astype(np.float64)
+        mean = total / count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (total_sq - total * mean) / (count - 1)  # sample variance, as pandas std()
+        return pd.DataFrame({
+            'Datetime': pd.to_datetime(self.bucket[keep] * BUCKET_NS),
+            'MA60_Mean': mean / 1000,
+            'MA60_Std': np.sqrt(np.maximum(var, 0)) / 1000,
+            'MA60_Min': self.vmin[keep] / 1000,
+            'MA60_Max': self.vmax[keep] / 1000,
+            'Sample_Count': self.count[keep],
+        })
+
+    def daily_summary(self, min_samples=MIN_SAMPLES):
+        """Daily statistics of bucket means, refreshed only for days touched since the last call."""
+        if self._daily_min_samples != min_samples:
+            self._daily_cache = {}
+            self._daily_min_samples = min_samples
+            self._dirty_days = set(np.unique(self.bucket * BUCKET_NS // DAY_NS).tolist())
+
+        buckets_per_day = DAY_NS // BUCKET_NS
+        for day in sorted(self._dirty_days):
+            _, count, total, _, _, _ = self._between(day * buckets_per_day, (day + 1) * buckets_per_day)
+            keep = count >= min_samples
+            if not keep.any():
+                self._daily_cache.pop(day, None)
+                continue
+            means = total[keep] / count[keep] / 1000
+            self._daily_cache[day] = (
+                pd.Timestamp(day * DAY_NS).date(),
+                means.mean(),
+                means.std(ddof=1) if len(means) > 1 else np.nan,
+                means.min(),
+                means.max(),
+                int(count[keep].sum()),
+            )
+        self._dirty_days.clear()
+
+        rows = [self._daily_cache[day] for day in sorted(self._daily_cache)]
+        return pd.DataFrame(rows, columns=DAILY_COLUMNS)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self, path):
+        """Write the partial state to an .npz file."""
+        last = -1 if self.max_timestamp_ns is None else self.max_timestamp_ns
+        np.savez(path, max_timestamp_ns=np.int64(last), **{f: getattr(self, f) for f in _STATE_FIELDS})
+
+    @classmethod
+    def load(cls, path):
+        """Read a partial state written by save()."""
+        agg = cls()
+        with np.load(path) as data:
+            agg._set_state(tuple(data[f].astype(np.int64) for f in _STATE_FIELDS))
+            last = int(data['max_timestamp_ns'])
+            agg.max_timestamp_ns = None if last < 0 else last
+        agg._mark_dirty(agg.bucket)
+        return agg
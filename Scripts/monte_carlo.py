@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo Uncertainty Propagation
+Sampled distributions of parasitic current and SOC from the measurement and model uncertainty budget
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+
+from parasitic import (BATTERY_MV_PER_C, ECO_OFFSET_MV, INSTRUMENT_MV_PER_C, MV_PER_SOC_PCT,
+                       estimate_parasitic)
+from quantization import ADC_STEP_MV
+
+DEFAULT_SAMPLES = 1_000_000
+DEFAULT_BATCH = 250_000
+
+
+class UncertaintyBudget(NamedTuple):
+    """Input uncertainties, as standard deviations unless noted."""
+    adc_step_mv: float = ADC_STEP_MV      # each reading is uniform within ±step/2 of the true value
+    sensor_offset_mv: float = 2.0         # docs/METHODS.md calibration: uniform within ±, drawn per reading
+    battery_mv_per_c_sd: float = 0.38     # docs/METHODS.md: ±0.21 mV/°F
+    instrument_mv_per_c_sd: float = 1.0
+    eco_offset_mv_sd: float = 2.0         # measured shift ranges ~6-9 mV
+    temp_sensor_c_sd: float = 1.0         # per temperature reading
+    mv_per_soc_pct_sd: float = 0.0
+
+
+class MonteCarloResult(NamedTuple):
+    current_ma: np.ndarray
+    soc: np.ndarray
+
+    def interval(self, values, ci=95.0):
+        """(median, low, high) of `values` for a central `ci` percent interval."""
+        tail = (100 - ci) / 2
+        return tuple(np.percentile(values, [50, tail, 100 - tail]))
+
+    def summary(self, ci=95.0):
+        """Mean, median and percentile interval for current and SOC."""
+        out = {}
+        for name, values in (('current_ma', self.current_ma), ('soc', self.soc)):
+            median, low, high = self.interval(values, ci)
+            out[name] = {'mean': float(values.mean()), 'std': float(values.std(ddof=1)),
+                         'median': float(median), 'low': float(low), 'high': float(high)}
+        return out
+
+
+def simulate_parasitic(v_start, v_end, hours, t_start_c, t_end_c, capacity_ah=500,
+                       eco_start=False, eco_end=False, eco_offset_mv=ECO_OFFSET_MV,
+                       battery_mv_per_c=BATTERY_MV_PER_C, instrument_mv_per_c=INSTRUMENT_MV_PER_C,
+                       mv_per_soc_pct=MV_PER_SOC_PCT, budget=UncertaintyBudget(),
+                       n_samples=DEFAULT_SAMPLES, seed=None, batch_size=DEFAULT_BATCH):
+    """Propagate the uncertainty budget through estimate_parasitic() for one interval.
+
+    Each sample perturbs the two voltage readings (ADC quantization and the
+    sensor offset, which the calibration shows varying with the voltage
+    level, so it is drawn per reading rather than cancelling), both
+    temperature readings, the battery and instrument coefficients, the Eco
+    offset and the SOC slope, then evaluates the same correction chain as
+    the point estimate. The current is signed as in estimate_parasitic()
+    (positive while the bank discharges), so samples on either side of zero
+    drift do not fold onto one side. Draws are made in batches of `batch_size` so memory stays
+    bounded; pass `seed` (int or Generator) for reproducible runs.
+    """
+    rng = np.random.default_rng(seed)
+    current = np.empty(n_samples)
+    soc = np.empty(n_samples)
+    half_step = budget.adc_step_mv / 2000  # V
+    offset = budget.sensor_offset_mv / 1000  # V
+
+    for lo in range(0, n_samples, batch_size):
+        n = min(batch_size, n_samples - lo)
+
+        def normal(mean, sd):
+            return rng.normal(mean, sd, n) if sd > 0 else mean
+
+        def reading(volts):
+            return volts + rng.uniform(-half_step, half_step, n) + rng.uniform(-offset, offset, n)
+
+        est = estimate_parasitic(
+            reading(v_start),
+            reading(v_end),
+            hours,
+            normal(t_start_c, budget.temp_sensor_c_sd),
+            normal(t_end_c, budget.temp_sensor_c_sd),
+            capacity_ah,
+            eco_start=eco_start, eco_end=eco_end,
+            eco_offset_mv=normal(eco_offset_mv, budget.eco_offset_mv_sd),
+            battery_mv_per_c=normal(battery_mv_per_c, budget.battery_mv_per_c_sd),
+            instrument_mv_per_c=normal(instrument_mv_per_c, budget.instrument_mv_per_c_sd),
+            mv_per_soc_pct=normal(mv_per_soc_pct, budget.mv_per_soc_pct_sd),
+        )
+        current[lo:lo + n] = est.current_ma
+        soc[lo:lo + n] = est.soc
+    return MonteCarloResult(current, soc)
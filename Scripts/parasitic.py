@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Parasitic Draw and SOC Estimator
+Vectorized voltage-drift to parasitic current conversion with Eco Mode and thermal corrections
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+ECO_OFFSET_MV = 9.0          # Eco Mode lowered the reported baseline by ~9 mV
+BATTERY_MV_PER_C = 2.0       # LiFePO4 open-circuit voltage temperature coefficient
+INSTRUMENT_MV_PER_C = 7.0    # Shelly measurement drift with temperature
+MV_PER_SOC_PCT = 10.0        # resting-voltage slope near full charge
+UNCERTAINTY_MV = 5.0         # voltage measurement uncertainty
+TEMP_UNCERTAINTY_C = 1.0     # temperature uncertainty
+
+
+class ParasiticEstimate(NamedTuple):
+    """Arrays broadcast from the inputs of estimate_parasitic()."""
+    current_ma: np.ndarray       # central estimate, positive while the bank discharges
+    current_best_ma: np.ndarray  # smallest current consistent with the uncertainties
+    current_worst_ma: np.ndarray # largest current consistent with the uncertainties
+    delta_v_mv: np.ndarray       # observed change after the Eco correction
+    capacity_delta_mv: np.ndarray  # change left after both thermal corrections
+    delta_soc: np.ndarray        # percent
+    ah_lost: np.ndarray          # negative when the corrected voltage rose
+
+    @property
+    def soc(self):
+        """SOC at the end of each interval, assuming 100% at its start."""
+        return 100 + self.delta_soc
+
+    @property
+    def ci_ma(self):
+        """Half-width of the best/worst current range."""
+        return (self.current_worst_ma - self.current_best_ma) / 2
+
+
+def _current_ma(capacity_delta_mv, capacity_ah, hours, mv_per_soc_pct):
+    # Signed throughout: a corrected rise gives a negative current rather than
+    # folding onto the discharge side, so best <= central <= worst always holds
+    delta_soc = capacity_delta_mv / mv_per_soc_pct
+    ah_lost = -capacity_ah * delta_soc / 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return ah_lost * 1000 / hours, delta_soc, ah_lost
+
+
+def drift_current_ma(drift_mv_per_day, capacity_ah=500, mv_per_soc_pct=MV_PER_SOC_PCT):
+    """Parasitic current (mA) implied by an already-corrected drift rate (mV/day); broadcasts."""
+    current, _, _ = _current_ma(np.asarray(drift_mv_per_day, dtype=float), capacity_ah, 24.0, mv_per_soc_pct)
+    return current
+
+
+def estimate_parasitic(v_start, v_end, hours, t_start_c, t_end_c, capacity_ah=500,
+                       eco_start=False, eco_end=False, eco_offset_mv=ECO_OFFSET_MV,
+                       battery_mv_per_c=BATTERY_MV_PER_C, instrument_mv_per_c=INSTRUMENT_MV_PER_C,
+                       mv_per_soc_pct=MV_PER_SOC_PCT, uncertainty_mv=UNCERTAINTY_MV,
+                       temp_uncertainty_c=TEMP_UNCERTAINTY_C):
+    """Parasitic current, SOC change and best/worst bounds for any number of intervals.
+
+    Every argument broadcasts, so one call covers many (bank, start, end)
+    intervals: pass arrays of start/end voltages (V), durations (h) and
+    temperatures (°C), and per-bank capacities or coefficients as arrays
+    of the same length. `eco_start`/`eco_end` flag readings taken with Eco
+    Mode on; those get `eco_offset_mv` added back, so an interval that spans
+    the switch is corrected and one entirely after it is not.
+
+    The observed change is reduced by the instrument and battery thermal
+    effects, and the remainder is converted to SOC at `mv_per_soc_pct` and
+    to amp-hours of `capacity_ah`. Currents are signed, positive while the
+    bank discharges. The best and worst cases shift voltage by
+    ±`uncertainty_mv` and temperature by ±`temp_uncertainty_c`.
+    """
+    eco_mv = eco_offset_mv * (np.asarray(eco_end, dtype=float) - np.asarray(eco_start, dtype=float))
+    delta_v_mv = (np.asarray(v_end, dtype=float) - np.asarray(v_start, dtype=float)) * 1000 + eco_mv
+    delta_t = np.asarray(t_end_c, dtype=float) - np.asarray(t_start_c, dtype=float)
+    battery_mv = battery_mv_per_c * delta_t
+    instrument_mv = instrument_mv_per_c * delta_t
+
+    capacity_delta_mv = delta_v_mv - instrument_mv - battery_mv
+    current, delta_soc, ah_lost = _current_ma(capacity_delta_mv, capacity_ah, hours, mv_per_soc_pct)
+
+    # Best case (minimum current) / worst case (maximum current)
+    thermal_slack = (instrument_mv_per_c + battery_mv_per_c) * temp_uncertainty_c
+    best, _, _ = _current_ma(capacity_delta_mv + uncertainty_mv + thermal_slack,
+                             capacity_ah, hours, mv_per_soc_pct)
+    worst, _, _ = _current_ma(capacity_delta_mv - uncertainty_mv - thermal_slack,
+                              capacity_ah, hours, mv_per_soc_pct)
+    return ParasiticEstimate(current, best, worst, delta_v_mv, capacity_delta_mv, delta_soc, ah_lost)
+
+
+def sliding_parasitic(datetimes, voltage, temp_c, window, eco_time=None, capacity_ah=500, **kwargs):
+    """Parasitic-current time series over a trailing window ending at every row.
+
+    `window` is a duration (e.g. pd.Timedelta(days=7)); each row is paired
+    with the first row at or after `time - window`. `temp_c` is a
+    temperature per row (°C) or a scalar. Rows after `eco_time` are treated
+    as Eco-corrected. Extra keyword arguments go to estimate_parasitic().
+    Returns a DataFrame with Datetime, Hours and the estimate columns.
+    """
+    ts = pd.DatetimeIndex(datetimes).as_unit('ns').asi8
+    voltage = np.asarray(voltage, dtype=float)
+    temp_c = np.broadcast_to(np.asarray(temp_c, dtype=float), voltage.shape)
+    start = np.searchsorted(ts, ts - pd.Timedelta(window).value, side='left')
+    hours = (ts - ts[start]) / 3.6e12
+    if eco_time is None:
+        eco = np.zeros(len(ts), dtype=bool)
+    else:
+        eco = ts >= pd.Timestamp(eco_time).as_unit('ns').value
+    est = estimate_parasitic(voltage[start], voltage, hours, temp_c[start], temp_c, capacity_ah,
+                             eco_start=eco[start], eco_end=eco, **kwargs)
+    valid = hours > 0
+    return pd.DataFrame({
+        'Datetime': np.asarray(ts[valid]).view('datetime64[ns]'),
+        'Hours': hours[valid],
+        'Current_mA': est.current_ma[valid],
+        'Current_Best_mA': est.current_best_ma[valid],
+        'Current_Worst_mA': est.current_worst_ma[valid],
+        'Delta_SOC': est.delta_soc[valid],
+    })
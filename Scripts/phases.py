@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Phase and Event Registry
+Named event times and analysis phases from config/phases.json, sliced by precomputed row bounds
+"""
+
+import json
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_loader import REPO_ROOT, resolve_data_dir
+
+PHASES_FILE = 'phases.json'
+DEFAULT_PHASES_PATH = REPO_ROOT / 'config' / PHASES_FILE
+
+
+class Event(NamedTuple):
+    name: str
+    time: pd.Timestamp
+    label: str
+
+
+class Phase(NamedTuple):
+    name: str
+    start: Optional[pd.Timestamp]   # None = from the first row
+    end: Optional[pd.Timestamp]     # None = through the last row
+    label: str
+    closed: str = 'left'            # 'left' is [start, end), 'both' is [start, end]
+    color: Optional[str] = None
+    timeline: bool = False
+
+
+class PhaseRegistry:
+    """Events and phases for one battery bank.
+
+    Phase bounds may be a timestamp string, an event name or null (open
+    ended), so moving an event in the config moves every phase built on it.
+    """
+
+    def __init__(self, events, phases):
+        self._events = {e.name: e for e in events}
+        self._phases = {p.name: p for p in phases}
+
+    @classmethod
+    def from_dict(cls, config):
+        events = [Event(name, pd.Timestamp(spec['time']), spec.get('label', name))
+                  for name, spec in config.get('events', {}).items()]
+        times = {e.name: e.time for e in events}
+
+        def bound(value):
+            if value is None:
+                return None
+            return times[value] if value in times else pd.Timestamp(value)
+
+        phases = []
+        for name, spec in config.get('phases', {}).items():
+            closed = spec.get('closed', 'left')
+            if closed not in ('left', 'both'):
+                raise ValueError(f"phase '{name}': closed must be 'left' or 'both', not {closed!r}")
+            phases.append(Phase(name, bound(spec.get('start')), bound(spec.get('end')),
+                                spec.get('label', name), closed, spec.get('color'),
+                                bool(spec.get('timeline', False))))
+        return cls(events, phases)
+
+    @classmethod
+    def from_file(cls, path):
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+    def event(self, name):
+        """Time of a named event."""
+        return self._events[name].time
+
+    def event_label(self, name):
+        return self._events[name].label
+
+    def events(self):
+        return sorted(self._events.values(), key=lambda e: e.time)
+
+    def phase(self, name):
+        return self._phases[name]
+
+    def phases(self):
+        return list(self._phases.values())
+
+    def timeline(self):
+        """Phases flagged for the phase-annotation plots, in time order."""
+        return sorted((p for p in self._phases.values() if p.timeline), key=lambda p: p.start)
+
+    def index(self, df, time_col='Datetime'):
+        """Precompute every phase's row bounds in a time-sorted frame."""
+        return PhaseIndex(df, self, time_col)
+
+
+class PhaseIndex:
+    """Row bounds of every phase within one time-sorted frame.
+
+    The bounds come from one searchsorted pass at construction; indexing by
+    phase name then returns ``df.iloc[lo:hi]``, a positional slice that
+    shares the frame's data instead of re-scanning it with a boolean mask.
+    """
+
+    def __init__(self, df, registry, time_col='Datetime'):
+        self.df = df
+        self.registry = registry
+        self._ts = pd.DatetimeIndex(df[time_col]).as_unit('ns').asi8
+        if len(self._ts) > 1 and (np.diff(self._ts) < 0).any():
+            raise ValueError(f"'{time_col}' must be sorted to build a phase index")
+        self.bounds = {p.name: self._bounds(p.start, p.end, p.closed) for p in registry.phases()}
+
+    def _bounds(self, start, end, closed='left'):
+        lo = 0 if start is None else int(np.searchsorted(self._ts, pd.Timestamp(start).as_unit('ns').value, 'left'))
+        side = 'right' if closed == 'both' else 'left'
+        hi = len(self._ts) if end is None else int(np.searchsorted(self._ts, pd.Timestamp(end).as_unit('ns').value, side))
+        return lo, max(lo, hi)
+
+    def __getitem__(self, name):
+        lo, hi = self.bounds[name]
+        return self.df.iloc[lo:hi]
+
+    def between(self, start=None, end=None, closed='left'):
+        """Rows with start <= time < end (time <= end when closed='both')."""
+        lo, hi = self._bounds(start, end, closed)
+        return self.df.iloc[lo:hi]
+
+    def day(self, date):
+        """Rows falling on one calendar day."""
+        start = pd.Timestamp(date).normalize()
+        return self.between(start, start + pd.Timedelta(days=1))
+
+
+def load_phases(data_dir=None, path=None, events=None):
+    """Phase registry for a bank.
+
+    Uses `path` when given, else a phases.json inside the data directory
+    (so each bank can carry its own event dates), else config/phases.json.
+    `events` maps event names to times that override (or add to) the file's,
+    e.g. from a fleet manifest; phases built on those events move with them.
+    """
+    if path is None:
+        candidate = resolve_data_dir(data_dir) / PHASES_FILE
+        path = candidate if candidate.exists() else DEFAULT_PHASES_PATH
+    config = json.loads(Path(path).read_text())
+    for name, time in (events or {}).items():
+        config.setdefault('events', {}).setdefault(name, {'label': name})['time'] = time
+    return PhaseRegistry.from_dict(config)
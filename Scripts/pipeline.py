@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Incremental Analysis Pipeline
+A small DAG of analysis steps whose results are cached under a hash of their code, parameters and inputs
+"""
+
+import hashlib
+import inspect
+import json
+import pickle
+import re
+import sys
+import sysconfig
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 2
+_ITEM_DEP = re.compile(r'^(\w+)\[(.+)\]$')  # 'phase_windows[january]' -> one item of a dict output
+
+
+# ============================================================================
+# CONTENT HASHING
+# ============================================================================
+
+def _update(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr([(c, str(t)) for c, t in value.dtypes.items()]).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(f'{value.name}:{value.dtype}'.encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f'{value.dtype}:{value.shape}'.encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b'{')
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode())
+            _update(digest, value[key])
+        digest.update(b'}')
+    elif isinstance(value, (list, tuple)) and not hasattr(value, '_fields'):
+        digest.update(b'[')
+        for item in value:
+            _update(digest, item)
+        digest.update(b']')
+    else:
+        digest.update(pickle.dumps(value, protocol=4))
+
+
+def fingerprint(value):
+    """Content hash of a step result (frames, arrays, dicts, lists and picklable scalars)."""
+    digest = hashlib.sha1()
+    _update(digest, value)
+    return digest.hexdigest()
+
+
+def _file_stamp(path):
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+_INSTALLED = tuple(str(Path(sysconfig.get_paths()[key]).resolve())
+                   for key in ('stdlib', 'platstdlib', 'purelib', 'platlib'))
+_module_hashes = {}   # module file -> sha1 of its bytes, once per process
+
+
+def _local_file(module):
+    """Source file of a module that is not part of Python or an installed package, else None."""
+    path = getattr(module, '__file__', None)
+    if not path or not path.endswith('.py'):
+        return None
+    path = str(Path(path).resolve())
+    return None if path.startswith(_INSTALLED) else path
+
+
+def _module_of(value):
+    if inspect.ismodule(value):
+        return value
+    return sys.modules.get(getattr(value, '__module__', None) or '')
+
+
+def _local_modules(namespace, own):
+    """Files of every local module reachable from `namespace` through module-level names."""
+    found = set()
+    pending = [namespace]
+    while pending:
+        for value in list(pending.pop().values()):
+            module = _module_of(value)
+            if module is None or module.__dict__ is own:
+                continue
+            path = _local_file(module)
+            if path is not None and path not in found:
+                found.add(path)
+                pending.append(vars(module))
+    return sorted(found)
+
+
+def _code_names(code):
+    """Global names a code object and the functions nested in it may read."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def _function_source(func):
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        return getattr(func, '__qualname__', repr(func))
+
+
+def _hash_globals(func, digest, seen):
+    """Fold in the module-level values `func` reads, following helpers defined beside it.
+
+    Constants such as END_DATE are hashed by content; a helper function from
+    the same module contributes its source and, in turn, its own globals.
+    Modules, classes and functions from other modules are covered by the
+    module hashes instead.
+    """
+    namespace = func.__globals__
+    for name in sorted(_code_names(func.__code__)):
+        if name not in namespace:
+            continue   # a builtin or an attribute name
+        value = namespace[name]
+        if inspect.ismodule(value) or inspect.isclass(value):
+            continue
+        if inspect.isfunction(value):
+            if value.__globals__ is namespace and value not in seen:
+                seen.add(value)
+                digest.update(f'{name}:{_function_source(value)}'.encode())
+                _hash_globals(value, digest, seen)
+            continue
+        if callable(value):
+            continue
+        try:
+            digest.update(f'{name}={fingerprint(value)}'.encode())
+        except Exception:  # unpicklable object: its type is all that can be keyed on
+            digest.update(f'{name}:{type(value).__qualname__}'.encode())
+
+
+def _source_hash(func):
+    """Hash of a step's own source, the globals it reads and the local modules its module imports.
+
+    The step's module itself is left out, so editing one step does not
+    invalidate the others; a change to any helper module it reaches (directly
+    or through other local modules), or to a module-level constant or helper
+    function the step uses, does.
+    """
+    digest = hashlib.sha1(_function_source(func).encode())
+    namespace = getattr(func, '__globals__', None)
+    if namespace is not None:
+        _hash_globals(func, digest, {func})
+        for path in _local_modules(namespace, namespace):
+            if path not in _module_hashes:
+                _module_hashes[path] = hashlib.sha1(Path(path).read_bytes()).hexdigest()
+            digest.update(f'{Path(path).name}={_module_hashes[path]}'.encode())
+    return digest.hexdigest()
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+class Step(NamedTuple):
+    name: str
+    func: object
+    deps: tuple        # step names, or 'step[item]' for one entry of a dict result
+    params: dict
+    version: int
+    cache: bool        # persist the result between runs
+    outputs: tuple     # files the step writes; it is skipped while its key and the files are unchanged
+
+
+class Pipeline:
+    """Steps evaluated on demand, each at most once per run.
+
+    A step's key hashes its source code, the module-level values it reads,
+    the local modules its module imports, `version`, `params` and the
+    content hash of every input it depends on. Keying on input *content*
+    rather than on upstream keys means a step whose inputs come out
+    unchanged (e.g. a phase window that ends before newly appended data) is
+    not recomputed even though an upstream step was. Cached results are
+    pickled under `cache_dir`, one entry per step; `status` records what
+    each step did
+    in this run ('computed', 'cached' or 'skipped').
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.steps = {}
+        self.status = {}
+        self._values = {}
+        self._hashes = {}
+
+    def add(self, name, func, deps=(), params=None, version=1, cache=True, outputs=()):
+        """Register `func(*dep_values, **params)` as step `name`."""
+        if name in self.steps:
+            raise ValueError(f"duplicate step name: {name!r}")
+        for dep in deps:
+            base = _ITEM_DEP.match(dep).group(1) if _ITEM_DEP.match(dep) else dep
+            if base not in self.steps:
+                raise ValueError(f"step {name!r} depends on unknown step {base!r}")
+        self.steps[name] = Step(name, func, tuple(deps), dict(params or {}), version, cache,
+                                tuple(str(p) for p in outputs))
+        return func
+
+    def step(self, name, deps=(), params=None, version=1, cache=True, outputs=()):
+        """Decorator form of add()."""
+        def register(func):
+            return self.add(name, func, deps, params, version, cache, outputs)
+        return register
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def get(self, name):
+        """Result of step `name`, computing or loading it (and its inputs) as needed."""
+        if name not in self._values:
+            self._evaluate(self.steps[name])
+        return self._values[name]
+
+    def _dep_value(self, dep):
+        match = _ITEM_DEP.match(dep)
+        if match:
+            return self.get(match.group(1))[match.group(2)]
+        return self.get(dep)
+
+    def _dep_hash(self, dep):
+        if dep not in self._hashes:
+            self._hashes[dep] = fingerprint(self._dep_value(dep))
+        return self._hashes[dep]
+
+    def key(self, name):
+        """Hash of step `name`'s code, version, parameters and input contents."""
+        step = self.steps[name]
+        digest = hashlib.sha1()
+        digest.update(f'{CACHE_VERSION}:{step.name}:{step.version}:{_source_hash(step.func)}'.encode())
+        _update(digest, step.params)
+        for dep in step.deps:
+            digest.update(f'{dep}={self._dep_hash(dep)}'.encode())
+        return digest.hexdigest()
+
+    def _paths(self, name):
+        return self.cache_dir / f'{name}.pkl', self.cache_dir / f'{name}.json'
+
+    def _evaluate(self, step):
+        key = self.key(step.name)
+        persist = self.cache_dir is not None and (step.cache or step.outputs)
+        if persist:
+            data_path, meta_path = self._paths(step.name)
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                meta = None
+            # Outputs must still be the files this step wrote: another run
+            # (e.g. for a different data directory) may have overwritten them
+            fresh = (meta is not None and meta.get('key') == key
+                     and all(_file_stamp(p) is not None and meta.get('outputs', {}).get(p) == _file_stamp(p)
+                             for p in step.outputs))
+            if fresh and (not step.cache or data_path.exists()):
+                try:
+                    value = pickle.loads(data_path.read_bytes()) if step.cache else None
+                except Exception:  # unreadable entry: recompute
+                    pass
+                else:
+                    self._values[step.name] = value
+                    if meta.get('hash'):
+                        self._hashes[step.name] = meta['hash']
+                    self.status[step.name] = 'cached' if step.cache else 'skipped'
+                    return
+
+        value = step.func(*[self._dep_value(dep) for dep in step.deps], **step.params)
+        self._values[step.name] = value
+        self.status[step.name] = 'computed'
+        if persist:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            meta = {'key': key, 'outputs': {p: _file_stamp(p) for p in step.outputs}}
+            if step.cache:
+                data_path.write_bytes(pickle.dumps(value, protocol=4))
+                meta['hash'] = self._dep_hash(step.name)
+            meta_path.write_text(json.dumps(meta, indent=2))
+
+    def run(self, targets=None):
+        """Evaluate `targets` (default: every step); returns {name: status}."""
+        for name in targets or list(self.steps):
+            self.get(name)
+        return dict(self.status)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+ADC Quantization Helpers
+Vectorized checks for the Shelly Plus Uni's 10 mV reporting grid
+"""
+
+import numpy as np
+
+# The Shelly reports raw readings in 10 mV steps (two decimal places in volts);
+# Home Assistant hourly statistics carry six decimals.
+ADC_STEP_MV = 10
+RAW_DECIMALS = 2
+
+# Tolerance on the scaled residual. Parsed CSV floats sit within ~1e-12 of the
+# grid, while a genuine third decimal leaves a residual of at least 0.1.
+GRID_TOLERANCE = 1e-6
+
+
+def to_millivolts(voltage):
+    """Convert volts to integer millivolts (int32), rounding to nearest."""
+    return np.rint(np.asarray(voltage, dtype=np.float64) * 1000).astype(np.int32)
+
+
+def on_grid(voltage, decimals=RAW_DECIMALS, tol=GRID_TOLERANCE):
+    """Boolean mask: True where a voltage has at most `decimals` decimal places.
+
+    Scales by 10**decimals and checks the distance to the nearest integer, which
+    replaces the per-row `len(str(x).split('.')[-1]) <= 2` test with three array
+    operations. NaN inputs return False.
+    """
+    scaled = np.asarray(voltage, dtype=np.float64) * (10 ** decimals)
+    return np.abs(scaled - np.rint(scaled)) <= tol
+
+
+def is_raw_reading(voltage):
+    """Boolean mask separating raw Shelly readings from hourly averages in history.csv."""
+    return on_grid(voltage, RAW_DECIMALS)
+
+
+def millivolts_on_grid(millivolts, step_mv=ADC_STEP_MV):
+    """Boolean mask for integer millivolt values that fall on the ADC step grid."""
+    return np.asarray(millivolts) % step_mv == 0
+
+
+def decimal_places(values, max_decimals=6, tol=GRID_TOLERANCE):
+    """Fewest decimal places (0..max_decimals) that represent each value exactly.
+
+    Vectorized replacement for `len(str(x).split('.')[-1])`: a value has d
+    decimals when it is on the 10**-d grid but not on the coarser ones.
+    Values with more than `max_decimals` (and NaN) return max_decimals + 1.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    places = np.full(values.shape, max_decimals + 1, dtype=np.int8)
+    pending = np.ones(values.shape, dtype=bool)
+    for d in range(max_decimals + 1):
+        hit = pending & on_grid(values, d, tol)
+        places[hit] = d
+        pending &= ~hit
+        if not pending.any():
+            break
+    return places
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped Raw Voltage History
+Compact int64 timestamp / int16 ADC-count columns for the Shelly's 10 mV readings
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from quantization import ADC_STEP_MV
+
+TIMESTAMPS_FILE = 'timestamps.i8'   # little-endian int64 epoch ns
+COUNTS_FILE = 'counts.i2'           # little-endian int16, volts = count * step_mv / 1000
+META_FILE = 'meta.json'
+
+TS_DTYPE = np.dtype('<i8')
+COUNT_DTYPE = np.dtype('<i2')
+CHUNK_ROWS = 1_000_000   # rows per slice when a whole range is scanned
+
+
+def write_raw_history(batches, out_dir, step_mv=ADC_STEP_MV, source_sha1=None):
+    """Write the raw readings from HistoryBatch chunks as flat binary columns.
+
+    Only rows flagged raw are kept (hourly means are not on the ADC grid).
+    Each batch is appended straight to disk, so memory stays at one batch.
+    Exports are time-ordered; if a batch steps back in time the columns are
+    sorted once at the end. Returns the number of rows written.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ts_path = out_dir / TIMESTAMPS_FILE
+    counts_path = out_dir / COUNTS_FILE
+
+    rows = 0
+    last_ts = None
+    ordered = True
+    with open(ts_path, 'wb') as f_ts, open(counts_path, 'wb') as f_counts:
+        for batch in batches:
+            ts = batch.timestamps[batch.raw]
+            if len(ts) == 0:
+                continue
+            counts = np.rint(batch.millivolts[batch.raw] / step_mv)
+            if counts.min() < np.iinfo(COUNT_DTYPE).min or counts.max() > np.iinfo(COUNT_DTYPE).max:
+                raise ValueError(f"readings exceed the int16 range at {step_mv} mV per count")
+            if last_ts is not None and ts[0] < last_ts:
+                ordered = False
+            last_ts = ts[-1]
+            f_ts.write(ts.astype(TS_DTYPE).tobytes())
+            f_counts.write(counts.astype(COUNT_DTYPE).tobytes())
+            rows += len(ts)
+
+    if not ordered:
+        ts = np.fromfile(ts_path, dtype=TS_DTYPE)
+        order = np.argsort(ts, kind='stable')
+        ts[order].tofile(ts_path)
+        np.fromfile(counts_path, dtype=COUNT_DTYPE)[order].tofile(counts_path)
+
+    meta = {'rows': rows, 'step_mv': step_mv, 'source_sha1': source_sha1}
+    (out_dir / META_FILE).write_text(json.dumps(meta))
+    return rows
+
+
+class RawHistory:
+    """Read-only np.memmap view of a raw history written by write_raw_history().
+
+    Nothing is loaded until sliced; `between()` uses searchsorted on the
+    memory-mapped timestamps, so a time-range read touches only the pages for
+    that range. Counts stay int16 (2 bytes per reading instead of a float and
+    an object string in a DataFrame).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / META_FILE).read_text())
+        self.step_mv = self.meta['step_mv']
+        rows = self.meta['rows']
+        if rows:
+            self.timestamps = np.memmap(self.path / TIMESTAMPS_FILE, dtype=TS_DTYPE, mode='r', shape=(rows,))
+            self.counts = np.memmap(self.path / COUNTS_FILE, dtype=COUNT_DTYPE, mode='r', shape=(rows,))
+        else:
+            self.timestamps = np.empty(0, dtype=TS_DTYPE)
+            self.counts = np.empty(0, dtype=COUNT_DTYPE)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def start(self):
+        return pd.Timestamp(int(self.timestamps[0])) if len(self) else None
+
+    @property
+    def end(self):
+        return pd.Timestamp(int(self.timestamps[-1])) if len(self) else None
+
+    def index_range(self, start=None, end=None):
+        """Row bounds [lo, hi) for start <= time < end."""
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, pd.Timestamp(start).as_unit('ns').value))
+        hi = len(self) if end is None else int(np.searchsorted(self.timestamps, pd.Timestamp(end).as_unit('ns').value))
+        return lo, max(lo, hi)
+
+    def between(self, start=None, end=None):
+        """(timestamps, counts) memmap views for start <= time < end, without copying."""
+        lo, hi = self.index_range(start, end)
+        return self.timestamps[lo:hi], self.counts[lo:hi]
+
+    def iter_chunks(self, start=None, end=None, rows=CHUNK_ROWS):
+        """(timestamps, counts) memmap views of start <= time < end, `rows` at a time."""
+        lo, hi = self.index_range(start, end)
+        for i in range(lo, hi, rows):
+            j = min(i + rows, hi)
+            yield self.timestamps[i:j], self.counts[i:j]
+
+    def sampling_intervals(self, start=None, end=None):
+        """(median, mean) gap between readings in seconds, scanned chunk by chunk.
+
+        Only the distinct gaps and their tallies are kept, so memory does not
+        grow with the length of the range. Returns NaNs for fewer than two rows.
+        """
+        gaps = np.empty(0, dtype=np.int64)
+        tally = np.empty(0, dtype=np.int64)
+        prev = None
+        first = last = None
+        for ts, _ in self.iter_chunks(start, end):
+            if len(ts) == 0:
+                continue
+            first = int(ts[0]) if first is None else first
+            last = int(ts[-1])
+            diff = np.diff(ts if prev is None else np.r_[prev, ts])
+            prev = ts[-1]
+            gaps, inverse = np.unique(np.r_[gaps, diff], return_inverse=True)
+            tally = np.bincount(inverse, weights=np.r_[tally, np.ones(len(diff))]).astype(np.int64)
+        n = int(tally.sum())
+        if n == 0:
+            return np.nan, np.nan
+        cum = np.cumsum(tally)
+        # np.median's definition: the mean of the two middle order statistics
+        middle = gaps[np.searchsorted(cum, [(n - 1) // 2 + 1, n // 2 + 1])]
+        return middle.mean() / 1e9, (last - first) / n / 1e9
+
+    def value_counts(self, start=None, end=None):
+        """Distinct ADC counts and how often each occurs, tallied chunk by chunk."""
+        offset = -np.iinfo(COUNT_DTYPE).min
+        tally = np.zeros(np.iinfo(COUNT_DTYPE).max + offset + 1, dtype=np.int64)
+        for _, counts in self.iter_chunks(start, end):
+            tally += np.bincount(counts.astype(np.int64) + offset, minlength=len(tally))
+        present = np.flatnonzero(tally)
+        return (present - offset).astype(COUNT_DTYPE), tally[present]
+
+    def millivolts(self, counts):
+        return counts.astype(np.int32) * self.step_mv
+
+    def volts(self, counts):
+        return counts.astype(np.float64) * (self.step_mv / 1000)
+
+    def to_frame(self, start=None, end=None):
+        """Materialise a time range as a DataFrame (Datetime, voltage)."""
+        ts, counts = self.between(start, end)
+        return pd.DataFrame({
+            'Datetime': np.asarray(ts).view('datetime64[ns]'),
+            'voltage': self.volts(counts),
+        })
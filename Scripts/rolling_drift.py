@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Rolling Drift-Rate Engine
+Rolling OLS slope over real timestamps in one vectorized pass using cumulative sums
+"""
+
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86_400 * 10**9
+
+
+def _window_starts(t_ns, window):
+    """First row index of the window ending at each row.
+
+    An int window counts rows; anything else is a duration, and the window
+    ending at row j covers (t_j - window, t_j].
+    """
+    n = len(t_ns)
+    if isinstance(window, (int, np.integer)):
+        return np.maximum(np.arange(n) - int(window) + 1, 0)
+    window_ns = pd.Timedelta(window).value
+    return np.searchsorted(t_ns, t_ns - window_ns, side='right')
+
+
+def _windowed_sum(values, starts):
+    """Sum of values[starts[j]:j+1] for every j, via one cumulative sum."""
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    return csum[1:] - csum[starts]
+
+
+def rolling_ols(datetimes, values, window, min_periods=11, origin=None):
+    """Least-squares line y = intercept + slope * x for every trailing window.
+
+    Parameters
+    ----------
+    datetimes : array-like of datetime64
+        Sample times, sorted ascending. Gaps are handled naturally because x is
+        the real elapsed time, not the row number.
+    values : array-like of float
+        Samples (e.g. hourly Midpoint voltage). NaNs are ignored.
+    window : int or timedelta-like
+        Row count, or a duration such as '7D' / pd.Timedelta(days=7).
+    min_periods : int
+        Windows with fewer valid samples return NaN.
+    origin : datetime-like, optional
+        x = 0 reference for the intercept; defaults to the first timestamp.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per input sample (the window's last sample) with columns
+        Datetime, slope (units per day), intercept, r2, stderr (of the slope)
+        and n. Matches scipy.stats.linregress on x in days since `origin`.
+    """
+    t_ns = pd.DatetimeIndex(datetimes).as_unit('ns').asi8
+    y = np.asarray(values, dtype=np.float64)
+    if origin is None:
+        origin_ns = t_ns[0] if len(t_ns) else 0
+    else:
+        origin_ns = pd.Timestamp(origin).value
+
+    starts = _window_starts(t_ns, window)
+    valid = ~np.isnan(y)
+
+    # Shift x and y by global offsets before accumulating so the windowed
+    # differences do not cancel catastrophically on long series.
+    x = (t_ns - origin_ns) / NS_PER_DAY
+    x_shift = x[valid].mean() if valid.any() else 0.0
+    y_shift = y[valid].mean() if valid.any() else 0.0
+    xc = np.where(valid, x - x_shift, 0.0)
+    yc = np.where(valid, y - y_shift, 0.0)
+
+    n = _windowed_sum(valid.astype(np.float64), starts)
+    sx = _windowed_sum(xc, starts)
+    sy = _windowed_sum(yc, starts)
+    sxx = _windowed_sum(xc * xc, starts)
+    syy = _windowed_sum(yc * yc, starts)
+    sxy = _windowed_sum(xc * yc, starts)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Centered (co)variances within each window
+        cxx = sxx - sx * sx / n
+        cyy = syy - sy * sy / n
+        cxy = sxy - sx * sy / n
+
+        slope = cxy / cxx
+        mean_x = sx / n + x_shift
+        mean_y = sy / n + y_shift
+        intercept = mean_y - slope * mean_x
+        r2 = np.where(cyy > 0, cxy * cxy / (cxx * cyy), 0.0)
+        sse = np.maximum(cyy - slope * cxy, 0.0)
+        stderr = np.sqrt(sse / (n - 2) / cxx)
+
+    too_few = (n < max(min_periods, 3)) | ~(cxx > 0)
+    for arr in (slope, intercept, r2, stderr):
+        arr[too_few] = np.nan
+
+    return pd.DataFrame({
+        'Datetime': pd.DatetimeIndex(datetimes),
+        'slope': slope,
+        'intercept': intercept,
+        'r2': r2,
+        'stderr': stderr,
+        'n': n.astype(np.int64),
+    })
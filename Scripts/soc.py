@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Resting-Voltage SOC Lookup
+Piecewise-linear voltage to SOC curve from docs/METHODS.md (or a per-bank calibration), temperature compensated
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from align import DEFAULT_TOLERANCE, align
+from data_loader import REPO_ROOT, load_hourly, load_temperature, resolve_data_dir
+from parasitic import BATTERY_MV_PER_C
+
+SOC_CURVE_FILE = 'soc_curve.json'
+DEFAULT_SOC_CURVE_PATH = REPO_ROOT / 'config' / SOC_CURVE_FILE
+
+
+class SocCurve(NamedTuple):
+    voltage: np.ndarray         # V, strictly increasing
+    soc: np.ndarray             # %, non-decreasing
+    reference_temp_c: float     # temperature the curve was measured at
+    label: str = ''
+
+    @classmethod
+    def from_dict(cls, config):
+        points = np.asarray(config['points'], dtype=np.float64)
+        order = np.argsort(points[:, 0], kind='stable')
+        voltage, soc = points[order, 0], points[order, 1]
+        if len(voltage) < 2 or (np.diff(voltage) <= 0).any() or (np.diff(soc) < 0).any():
+            raise ValueError("SOC curve needs at least two points with distinct voltages and SOC "
+                             "non-decreasing in voltage")
+        return cls(voltage, soc, float(config.get('reference_temp_c', 25.0)), config.get('label', ''))
+
+
+def load_curve(data_dir=None, path=None):
+    """SOC curve for a bank.
+
+    Uses `path` when given, else a soc_curve.json inside the data directory
+    (a per-bank calibration), else config/soc_curve.json (the METHODS table).
+    """
+    if path is None:
+        candidate = resolve_data_dir(data_dir) / SOC_CURVE_FILE
+        path = candidate if candidate.exists() else DEFAULT_SOC_CURVE_PATH
+    return SocCurve.from_dict(json.loads(Path(path).read_text()))
+
+
+def fahrenheit_to_celsius(temp_f):
+    return (np.asarray(temp_f, dtype=np.float64) - 32) * 5 / 9
+
+
+# ============================================================================
+# LOOKUP
+# ============================================================================
+
+def compensate(voltage, temp_c, reference_temp_c, mv_per_c=BATTERY_MV_PER_C):
+    """Voltage referred to `reference_temp_c`; NaN temperatures are left uncompensated."""
+    voltage = np.asarray(voltage, dtype=np.float64)
+    if temp_c is None:
+        return voltage
+    delta_t = np.asarray(temp_c, dtype=np.float64) - reference_temp_c
+    return voltage - np.where(np.isnan(delta_t), 0.0, delta_t) * mv_per_c / 1000
+
+
+def voltage_to_soc(voltage, temp_c=None, curve=None, mv_per_c=BATTERY_MV_PER_C):
+    """SOC (%) for an array of resting voltages (V), in one np.interp call.
+
+    `temp_c` (scalar or per-row, NaN where unknown) refers each reading to
+    the curve's reference temperature at `mv_per_c` first; pass
+    BATTERY_MV_PER_C + INSTRUMENT_MV_PER_C to remove the Shelly's drift as
+    well. Voltages outside the curve clamp to its end points.
+    """
+    curve = curve or load_curve()
+    v_ref = compensate(voltage, temp_c, curve.reference_temp_c, mv_per_c)
+    soc = np.interp(v_ref, curve.voltage, curve.soc)
+    return np.where(np.isnan(v_ref), np.nan, soc)
+
+
+def soc_to_voltage(soc, temp_c=None, curve=None, mv_per_c=BATTERY_MV_PER_C):
+    """Inverse of voltage_to_soc(): the resting voltage (V) for an SOC (%) at `temp_c`.
+
+    Flat stretches of the curve map to their lowest voltage.
+    """
+    curve = curve or load_curve()
+    soc = np.asarray(soc, dtype=np.float64)
+    # searchsorted finds the first point at or above each SOC, then interpolate from its neighbour
+    hi = np.clip(np.searchsorted(curve.soc, soc, side='left'), 1, len(curve.soc) - 1)
+    lo = hi - 1
+    span = curve.soc[hi] - curve.soc[lo]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frac = np.clip(np.where(span > 0, (soc - curve.soc[lo]) / span, 0.0), 0.0, 1.0)
+    voltage = curve.voltage[lo] + frac * (curve.voltage[hi] - curve.voltage[lo])
+    if temp_c is not None:
+        voltage = voltage + (np.asarray(temp_c, dtype=np.float64) - curve.reference_temp_c) * mv_per_c / 1000
+    return voltage
+
+
+def soc_series(df, temperature=None, column=None, curve=None, mv_per_c=BATTERY_MV_PER_C,
+               tolerance=DEFAULT_TOLERANCE):
+    """SOC timeline for an hourly (Min) or raw-history (voltage) frame.
+
+    `temperature` is the frame from load_temperature() (°F); each row takes
+    the latest reading within `tolerance`, and rows without one are
+    converted uncompensated (Temp_C is NaN). Returns Datetime, Voltage,
+    Temp_C and SOC.
+    """
+    column = column or ('Min' if 'Min' in df.columns else 'voltage')
+    out = pd.DataFrame({'Datetime': df['Datetime'].to_numpy(), 'Voltage': df[column].to_numpy(dtype=np.float64)})
+    if temperature is not None and len(temperature):
+        temp = pd.DataFrame({'Datetime': temperature['Datetime'].to_numpy(),
+                             'Temp_C': fahrenheit_to_celsius(temperature['Temp_Midpoint'])})
+        out = align(out, [(temp, ['Temp_C'])], tolerance)
+    else:
+        out['Temp_C'] = np.nan
+    out['SOC'] = voltage_to_soc(out['Voltage'], out['Temp_C'], curve, mv_per_c)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a bank\'s hourly voltage to a resting-voltage SOC timeline')
+    parser.add_argument('data_dir', nargs='?', default=None, help='data directory (default: $LIFEPO4_DATA_DIR or Data/)')
+    parser.add_argument('--curve', default=None, help='SOC curve JSON (default: per-bank, then config/soc_curve.json)')
+    parser.add_argument('--out', default=None, help='write the SOC timeline to this CSV')
+    args = parser.parse_args()
+
+    data_dir = resolve_data_dir(args.data_dir)
+    curve = load_curve(data_dir, args.curve)
+    try:
+        temperature = load_temperature(data_dir)
+    except FileNotFoundError:
+        temperature = None
+    series = soc_series(load_hourly(data_dir), temperature, curve=curve)
+    compensated = series['Temp_C'].notna()
+    print(f"SOC curve: {curve.label or args.curve} ({len(curve.voltage)} points, "
+          f"{curve.reference_temp_c:g}°C reference)")
+    print(f"   {len(series)} hours, {int(compensated.sum())} temperature-compensated")
+    last = series.iloc[-1]
+    print(f"   Latest ({last['Datetime']}): {last['Voltage']:.3f}V -> {last['SOC']:.1f}% SOC")
+    if args.out:
+        series.to_csv(args.out, index=False)
+        print(f"   Saved: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
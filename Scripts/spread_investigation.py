@@ -8,19 +8,28 @@ import pandas as pd
 import numpy as np
 from scipy import stats
 
+from bootstrap import HOURLY_BLOCK, bootstrap_mean, bootstrap_slope
+from data_loader import load_hourly, load_history
+from instrument import tracer_from_env
+from phases import load_phases
+from quantization import is_raw_reading
+
+tracer = tracer_from_env()
+
 # Load hourly data
-hourly_df = pd.read_csv('/mnt/user-data/uploads/combined_output.csv')
-hourly_df['Datetime'] = pd.to_datetime(hourly_df['Date'] + ' ' + hourly_df['Time'], 
-                                        format='%d/%m/%Y %H:%M')
-hourly_df = hourly_df.sort_values('Datetime')
-hourly_df['Midpoint'] = (hourly_df['Min'] + hourly_df['Max']) / 2
-hourly_df['Spread'] = hourly_df['Max'] - hourly_df['Min']
+tracer.mark('Load data')
+hourly_df = load_hourly()
+phases = load_phases()
+hourly_phases = phases.index(hourly_df)
+tracer.rows(len(hourly_df))
+BOOTSTRAP_SEED = 0  # block-bootstrap intervals are reproducible run to run
 
 print("=" * 80)
 print("DEEP INVESTIGATION: SPREAD INCREASE ANALYSIS")
 print("=" * 80)
 
 # HYPOTHESIS 1: Spread correlates with voltage level (not cell divergence)
+tracer.mark('Hypothesis 1', rows=len(hourly_df))
 print("\n🔍 HYPOTHESIS 1: Spread varies with voltage level (benign)")
 
 # Group by voltage bands
@@ -36,7 +45,7 @@ for band, row in spread_by_voltage.iterrows():
         print(f"   {band}: Mean={row['mean']*1000:.1f}mV, Std={row['std']*1000:.1f}mV, n={int(row['count'])}")
 
 # Statistical test
-stasis = hourly_df[hourly_df['Datetime'] >= '2025-11-08']
+stasis = hourly_phases['stasis']
 corr = stasis['Midpoint'].corr(stasis['Spread'])
 print(f"\n   Voltage-Spread Correlation: {corr:.4f}")
 if abs(corr) > 0.3:
@@ -46,6 +55,7 @@ else:
     print("   → No significant correlation with voltage level")
 
 # HYPOTHESIS 2: Compare spread at SAME voltage level over time
+tracer.mark('Hypothesis 2', rows=len(hourly_df))
 print("\n🔍 HYPOTHESIS 2: Spread at same voltage level over time")
 
 # Filter to stable stasis voltage (13.20-13.30V range)
@@ -78,29 +88,32 @@ if len(nov_stable) > 10 and len(jan_stable) > 10:
         print("   ✓ NO significant difference - spread stable at same voltage")
 
 # HYPOTHESIS 3: Eco Mode effect on spread
+tracer.mark('Hypothesis 3', rows=len(hourly_df))
 print("\n🔍 HYPOTHESIS 3: Eco Mode effect on measurement spread")
 
-pre_eco = hourly_df[(hourly_df['Datetime'] >= '2025-12-20') & 
-                     (hourly_df['Datetime'] < '2025-12-23 15:00')]
-post_eco = hourly_df[hourly_df['Datetime'] >= '2025-12-23 16:00']
+pre_eco = hourly_phases['pre_eco_window']
+post_eco = hourly_phases['post_eco_settled']
 
 print(f"\n   Pre-Eco spread (Dec 20-23): Mean={pre_eco['Spread'].mean()*1000:.1f}mV")
 print(f"   Post-Eco spread (Dec 23+):  Mean={post_eco['Spread'].mean()*1000:.1f}mV")
 eco_spread_change = (post_eco['Spread'].mean() - pre_eco['Spread'].mean()) * 1000
 print(f"   Change: {eco_spread_change:+.1f}mV")
+for label, frame in (('Pre-Eco', pre_eco), ('Post-Eco', post_eco)):
+    ci = bootstrap_mean(frame['Spread'] * 1000, block_len=HOURLY_BLOCK, seed=BOOTSTRAP_SEED)
+    print(f"   {label} spread: {ci.format('.1f', 'mV')}")
 if abs(eco_spread_change) > 5:
     print("   → Eco Mode DID change measurement spread characteristics")
 else:
     print("   → Eco Mode had minimal effect on spread")
 
 # HYPOTHESIS 4: ADC noise floor analysis
+tracer.mark('Hypothesis 4', rows=len(hourly_df))
 print("\n🔍 HYPOTHESIS 4: ADC Resolution Impact")
 
 # Load high-frequency data for noise analysis
-hf_df = pd.read_csv('/mnt/user-data/uploads/history.csv')
-hf_df = hf_df[pd.to_numeric(hf_df['state'], errors='coerce').notna()]
-hf_df['voltage'] = hf_df['state'].astype(float)
-hf_raw = hf_df[hf_df['voltage'].apply(lambda x: len(str(x).split('.')[-1]) <= 2)]
+hf_df = load_history()
+tracer.rows(len(hf_df))
+hf_raw = hf_df[is_raw_reading(hf_df['voltage'].to_numpy())]
 
 # The Shelly reports in 10mV increments
 # With hourly Min/Max, the expected spread is at LEAST 10-20mV due to ADC resolution
@@ -115,6 +128,7 @@ noise_contribution = (expected_noise / observed_spread) * 100
 print(f"   ADC noise contribution: ~{noise_contribution:.0f}% of observed spread")
 
 # CONCLUSION
+tracer.mark('Conclusion')
 print("\n" + "=" * 80)
 print("CONCLUSION: IS THERE CELL DIVERGENCE?")
 print("=" * 80)
@@ -146,6 +160,7 @@ RECOMMENDATION: To definitively rule out cell divergence, measure individual
 """)
 
 # Final summary stats for the report
+tracer.mark('Summary statistics', rows=len(hourly_df))
 print("\n" + "=" * 80)
 print("SUMMARY STATISTICS FOR REPORT")
 print("=" * 80)
@@ -155,13 +170,13 @@ print(f"   Total monitoring period: {hourly_df['Datetime'].min().date()} to {hou
 print(f"   Total days: {(hourly_df['Datetime'].max() - hourly_df['Datetime'].min()).days}")
 print(f"   Total hourly records: {len(hourly_df)}")
 
-stasis = hourly_df[hourly_df['Datetime'] >= '2025-11-08']
+stasis = hourly_phases['stasis']
 print(f"\n📊 Stasis Period (Nov 8 onwards):")
 print(f"   Mean voltage: {stasis['Midpoint'].mean():.4f}V")
 print(f"   Voltage range: {stasis['Midpoint'].min():.4f}V to {stasis['Midpoint'].max():.4f}V")
 print(f"   Total drift: {(stasis['Midpoint'].max() - stasis['Midpoint'].min())*1000:.1f}mV")
 
-jan = hourly_df[hourly_df['Datetime'] >= '2026-01-01']
+jan = hourly_phases['january']
 print(f"\n📊 January 2026 Statistics:")
 print(f"   Mean voltage: {jan['Midpoint'].mean():.4f}V")
 print(f"   Std deviation: {jan['Midpoint'].std()*1000:.2f}mV")
@@ -169,9 +184,9 @@ print(f"   Min observed: {jan['Min'].min():.2f}V")
 print(f"   Max observed: {jan['Max'].max():.2f}V")
 
 # Drift rate calculation
-nov22 = hourly_df[hourly_df['Datetime'].dt.date == pd.Timestamp('2025-11-22').date()]['Midpoint'].mean()
-jan7 = hourly_df[hourly_df['Datetime'].dt.date == pd.Timestamp('2026-01-07').date()]['Midpoint'].mean()
-days = (pd.Timestamp('2026-01-07') - pd.Timestamp('2025-11-22')).days
+nov22 = hourly_phases.day(phases.event('drift_start'))['Midpoint'].mean()
+jan7 = hourly_phases.day('2026-01-07')['Midpoint'].mean()
+days = (pd.Timestamp('2026-01-07') - phases.event('drift_start')).days
 total_drift = (nov22 - jan7) * 1000
 rate = total_drift / days
 print(f"\n📊 Winter Drift (Nov 22 - Jan 7):")
@@ -179,3 +194,8 @@ print(f"   Start: {nov22:.4f}V")
 print(f"   End: {jan7:.4f}V")
 print(f"   Total: {total_drift:.1f}mV over {days} days")
 print(f"   Rate: {rate:.2f}mV/day")
+drift = hourly_phases.between(phases.event('drift_start'), '2026-01-08')
+trend = bootstrap_slope(drift['Datetime'], drift['Midpoint'] * 1000, block_len=HOURLY_BLOCK, seed=BOOTSTRAP_SEED)
+print(f"   Hourly trend: {trend.format(unit='mV/day')}")
+
+tracer.close(echo=True)
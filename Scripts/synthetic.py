@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Synthetic LiFePO4 Telemetry
+Seeded generator for the hourly voltage, temperature, humidity and Home Assistant history exports
+"""
+
+import argparse
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from data_loader import HISTORY_FILE, HOURLY_FILE, HUMIDITY_FILE, TEMPERATURE_FILE
+from parasitic import BATTERY_MV_PER_C, INSTRUMENT_MV_PER_C
+from quantization import ADC_STEP_MV
+
+NS_PER_MINUTE = 60 * 10**9
+HISTORY_ENTITY = 'sensor.shellyplusuni_synthetic_voltmeter'
+
+
+class TelemetryConfig(NamedTuple):
+    start: str = '2025-10-29'
+    days: float = 75.0                  # span of the hourly exports (today: 1,742 rows)
+    interval_min: int = 60              # export interval; < 60 packs long spans into the datetime64 range
+    history_days: float = 17.0          # high-frequency history covers the last `history_days`
+    history_interval_s: float = 13.0    # mean raw reading interval (today: ~115,500 readings)
+    rest_voltage: float = 13.28         # Midpoint at the start, volts
+    drift_mv_per_day: float = -0.5
+    temp_mean_f: float = 58.0
+    temp_swing_f: float = 3.0           # diurnal amplitude
+    temp_weather_f: float = 4.0         # slow day-to-day wander (std)
+    thermal_mv_per_c: float = BATTERY_MV_PER_C + INSTRUMENT_MV_PER_C  # reported voltage vs temperature
+    spread_mv: float = 20.0             # typical hourly Max - Min
+    noise_mv: float = 3.0
+    humidity_mean: float = 45.0
+    gap_rate: float = 0.005             # chance that an hour starts an outage
+    gap_hours: float = 4.0              # mean outage length
+    emi_rate: float = 0.002             # share of hours with an EMI dip on Min
+    emi_drop_mv: float = 60.0
+    unavailable_rate: float = 0.001     # 'unavailable' states in the history export
+    seed: int = 0
+
+
+def _quantize(volts, step_mv=ADC_STEP_MV):
+    return np.round(np.rint(volts * 1000 / step_mv) * step_mv / 1000, 2)
+
+
+def _outage_mask(n, rate, mean_len, rng):
+    """True for rows inside randomly placed outages of geometric length."""
+    starts = np.flatnonzero(rng.random(n) < rate)
+    lengths = rng.geometric(1 / max(mean_len, 1), size=len(starts))
+    delta = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(delta, starts, 1)
+    np.add.at(delta, np.minimum(starts + lengths, n), -1)
+    return np.cumsum(delta[:-1]) > 0
+
+
+def _smooth_walk(n, per_day, std, rng):
+    """AR(1) weather wander with a one-day correlation time, scaled to `std`."""
+    if n == 0 or std == 0:
+        return np.zeros(n)
+    phi = np.exp(-1 / per_day)
+    shocks = rng.normal(0, std * np.sqrt(1 - phi * phi), n)
+    # First-order recursion as a scaled cumulative sum, in blocks to keep phi**k representable
+    out = np.empty(n)
+    level = rng.normal(0, std)
+    block = max(1, int(per_day * 20))
+    k = np.arange(block)
+    powers = phi ** k
+    for lo in range(0, n, block):
+        s = shocks[lo:lo + block]
+        p = powers[:len(s)]
+        out[lo:lo + len(s)] = p * (level * phi + np.cumsum(s / p))
+        level = out[lo + len(s) - 1]
+    return out
+
+
+def generate(config=TelemetryConfig()):
+    """Synthetic exports as DataFrames keyed 'voltage', 'temperature', 'humidity' and 'history'.
+
+    The hourly frames hold Datetime plus the CSV value columns; 'history'
+    holds Datetime, entity_id and voltage (NaN where the state was
+    'unavailable'). The true Midpoint is a linear drift plus a thermal term
+    driven by a diurnal and weather-like temperature; Min/Max are quantized
+    to the 10 mV ADC grid, outages remove rows and EMI dips pull Min down.
+    """
+    rng = np.random.default_rng(config.seed)
+    step_ns = config.interval_min * NS_PER_MINUTE
+    start_ns = pd.Timestamp(config.start).value
+    n = int(config.days * 1440 // config.interval_min)
+    t_ns = start_ns + np.arange(n, dtype=np.int64) * step_ns
+    per_day = 1440 / config.interval_min
+    day_frac = (t_ns % (86_400 * 10**9)) / (86_400 * 10**9)
+    days = (t_ns - start_ns) / (86_400 * 10**9)
+
+    # Temperature (°F): afternoon peak plus slow weather wander
+    temp_f = (config.temp_mean_f + config.temp_swing_f * np.sin(2 * np.pi * (day_frac - 0.375))
+              + _smooth_walk(n, per_day, config.temp_weather_f, rng))
+    temp_c_anomaly = (temp_f - config.temp_mean_f) * 5 / 9
+
+    mid = (config.rest_voltage + (config.drift_mv_per_day * days
+                                  + config.thermal_mv_per_c * temp_c_anomaly) / 1000)
+    half_spread = np.abs(rng.normal(config.spread_mv, config.spread_mv / 4, n)) / 2000
+    v_min = mid - half_spread + rng.normal(0, config.noise_mv / 1000, n)
+    v_max = mid + half_spread + rng.normal(0, config.noise_mv / 1000, n)
+    emi = rng.random(n) < config.emi_rate
+    v_min[emi] -= config.emi_drop_mv / 1000
+
+    voltage_kept = ~_outage_mask(n, config.gap_rate, config.gap_hours * 60 / config.interval_min, rng)
+    sensor_kept = ~_outage_mask(n, config.gap_rate, config.gap_hours * 60 / config.interval_min, rng)
+    datetimes = pd.to_datetime(t_ns)
+
+    voltage = pd.DataFrame({'Datetime': datetimes, 'Min': _quantize(v_min), 'Max': _quantize(v_max)})[voltage_kept]
+    temp_noise = np.abs(rng.normal(0, 0.15, n))
+    temperature = pd.DataFrame({
+        'Datetime': datetimes,
+        'Min': np.round(temp_f - temp_noise, 1),
+        'Max': np.round(temp_f + temp_noise, 1),
+    })[sensor_kept]
+    humidity = pd.DataFrame({
+        'Datetime': datetimes,
+        'Humidity': np.round(config.humidity_mean - 0.8 * (temp_f - config.temp_mean_f)
+                             + rng.normal(0, 0.5, n), 1),
+    })[sensor_kept]
+
+    history = _history(config, t_ns, mid, voltage_kept, emi, rng)
+    return {
+        'voltage': voltage.reset_index(drop=True),
+        'temperature': temperature.reset_index(drop=True),
+        'humidity': humidity.reset_index(drop=True),
+        'history': history,
+    }
+
+
+def _history(config, t_ns, mid, kept, emi, rng):
+    """Raw 10 mV readings at jittered intervals plus six-decimal hourly means, as Home Assistant exports them."""
+    if len(t_ns) == 0 or config.history_days <= 0:
+        return pd.DataFrame({'Datetime': pd.to_datetime([]), 'entity_id': [], 'voltage': []})
+    end_ns = t_ns[-1] + (t_ns[1] - t_ns[0] if len(t_ns) > 1 else 0)
+    span_ns = int(config.history_days * 86_400 * 10**9)
+    start_ns = max(t_ns[0], end_ns - span_ns)
+    step_ns = int(config.history_interval_s * 10**9)
+    n = max(0, (end_ns - start_ns) // step_ns)
+    times = start_ns + np.arange(n, dtype=np.int64) * step_ns + rng.integers(0, step_ns, n)
+
+    # Raw readings follow the Midpoint between export rows; outages and EMI dips
+    # carry over from the export row each reading falls in
+    row = np.clip(np.searchsorted(t_ns, times, side='right') - 1, 0, len(t_ns) - 1)
+    online = kept[row]
+    times, row = times[online], row[online]
+    true_v = np.interp(times, t_ns, mid)
+    raw = true_v + rng.normal(0, config.noise_mv / 1000, len(times))
+    dip = emi[row] & (rng.random(len(times)) < 0.05)
+    raw[dip] -= config.emi_drop_mv / 1000
+    raw = _quantize(raw)
+
+    # Hourly statistics rows (mean of the hour's raw readings)
+    hour = times // (3_600 * 10**9)
+    starts = np.flatnonzero(np.r_[True, hour[1:] != hour[:-1]])
+    means = np.add.reduceat(raw, starts) / np.diff(np.r_[starts, len(raw)])
+    all_times = np.concatenate((times, hour[starts] * 3_600 * 10**9))
+    all_values = np.concatenate((raw, np.round(means, 6)))
+    order = np.argsort(all_times, kind='stable')
+    all_times, all_values = all_times[order], all_values[order]
+    all_values[rng.random(len(all_values)) < config.unavailable_rate] = np.nan
+
+    return pd.DataFrame({
+        'Datetime': pd.to_datetime(all_times),
+        'entity_id': pd.Categorical([HISTORY_ENTITY]).take(np.zeros(len(all_times), dtype=np.int64)),
+        'voltage': all_values,
+    })
+
+
+# ============================================================================
+# CSV WRITERS
+# ============================================================================
+
+def _date_time_columns(datetimes):
+    """'%d/%m/%Y' and '%H:%M' strings, formatted once per distinct day and minute of day."""
+    t_ns = pd.DatetimeIndex(datetimes).as_unit('ns').asi8
+    day = t_ns // (86_400 * 10**9)
+    minute = (t_ns // NS_PER_MINUTE) % 1440
+    days, day_idx = np.unique(day, return_inverse=True)
+    day_str = pd.to_datetime(days * 86_400 * 10**9).strftime('%d/%m/%Y').to_numpy(dtype=object)
+    minute_str = np.array([f'{m // 60:02d}:{m % 60:02d}' for m in range(1440)], dtype=object)
+    return day_str[day_idx], minute_str[minute]
+
+
+def _write_hourly(df, path, columns):
+    date, time = _date_time_columns(df['Datetime'])
+    out = pd.DataFrame({'Date': date, 'Time': time, **{c: df[c].to_numpy() for c in columns}})
+    out.to_csv(path, index=False)
+
+
+def write_exports(frames, data_dir):
+    """Write generate() output in the repo's CSV layouts; returns the data directory."""
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    _write_hourly(frames['voltage'], data_dir / HOURLY_FILE, ['Min', 'Max'])
+    _write_hourly(frames['temperature'], data_dir / TEMPERATURE_FILE, ['Min', 'Max'])
+    _write_hourly(frames['humidity'], data_dir / HUMIDITY_FILE, ['Humidity'])
+
+    history = frames['history']
+    stamps = np.datetime_as_string(history['Datetime'].to_numpy().astype('datetime64[ms]'), unit='ms')
+    pd.DataFrame({
+        'entity_id': history['entity_id'],
+        'state': history['voltage'],
+        'last_changed': np.char.add(stamps, 'Z'),
+    }).to_csv(data_dir / HISTORY_FILE, index=False, na_rep='unavailable')
+    return data_dir
+
+
+def scaled_config(scale, base=TelemetryConfig(), **overrides):
+    """`base` with `scale` times as many rows in every export.
+
+    Spans grow with the scale; once a span would run past the datetime64[ns]
+    range the sampling interval shrinks instead, so the row counts still
+    scale (e.g. 10,000x today's hourly export is written at 5-minute steps).
+    """
+    config = base._replace(**overrides)
+    limit_days = (pd.Timestamp.max - pd.Timestamp(config.start)).days - 1
+    days = config.days * scale
+    interval_min = config.interval_min
+    if days > limit_days:
+        interval_min = max(1, int(config.interval_min * limit_days / days))
+        days = config.days * scale * interval_min / config.interval_min
+    history_days = config.history_days * scale
+    span = min(history_days, days)
+    return config._replace(days=days, interval_min=interval_min, history_days=span,
+                           history_interval_s=config.history_interval_s * span / history_days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic LiFePO4 data directory')
+    parser.add_argument('out_dir', help='directory for the four CSV exports')
+    parser.add_argument('--scale', type=float, default=1.0, help="multiple of today's data size (default: 1)")
+    parser.add_argument('--drift', type=float, default=TelemetryConfig().drift_mv_per_day,
+                        help='Midpoint drift in mV/day')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = scaled_config(args.scale, drift_mv_per_day=args.drift, seed=args.seed)
+    frames = generate(config)
+    write_exports(frames, args.out_dir)
+    for name, df in frames.items():
+        print(f"   {name}: {len(df):,} rows")
+    print(f"   Saved to {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
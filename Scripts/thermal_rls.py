@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Recursive Temperature-Coefficient Estimator
+Recursive least squares with a forgetting factor for the voltage-temperature coefficient and drift, O(1) per sample
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from align import load_aligned
+
+DEFAULT_FORGETTING = 0.995   # per hour: effective memory 1 / (1 - λ) = 200 hours, ~8 days
+DEFAULT_WARMUP = 24          # samples before the estimates are reported
+INITIAL_COVARIANCE = 1e4     # diffuse prior: the first few samples set the fit
+NS_PER_DAY = 86_400 * 10**9
+NS_PER_HOUR = 3_600 * 10**9
+
+OUTPUT_DIR = '/mnt/user-data/outputs'   # as in analysis/battery_analysis.py
+DEFAULT_OUT = os.path.join(OUTPUT_DIR, 'thermal_coefficient.csv')
+
+TIMELINE_COLUMNS = ['Datetime', 'Coeff_mV_per_F', 'Coeff_Stderr', 'Drift_mV_per_day', 'N']
+
+
+class ThermalRLS:
+    """Exponentially weighted fit of voltage = a + coeff * temperature + drift * days.
+
+    Each update is one rank-one recursive-least-squares step on the 3x3
+    inverse-information matrix, so the cost per sample is constant however
+    long the record is. Older samples are down-weighted by `forgetting` per
+    hour of elapsed time (λ**Δt after a gap of Δt hours), which lets the
+    coefficient follow seasonal change at the same rate whatever the
+    sampling. Voltages are in V, temperatures in whatever unit the export
+    uses (°F for the Shelly exports); the coefficient is reported in mV per
+    that unit and the drift in mV/day.
+    """
+
+    def __init__(self, forgetting=DEFAULT_FORGETTING, warmup=DEFAULT_WARMUP, delta=INITIAL_COVARIANCE):
+        if not 0 < forgetting <= 1:
+            raise ValueError(f"forgetting factor must be in (0, 1], got {forgetting}")
+        self.forgetting = forgetting
+        self.warmup = warmup
+        self.n = 0
+        self.theta = np.zeros(3)          # [intercept mV, mV per degree, mV per day]
+        self.P = np.eye(3) * delta
+        self.resid_var = 0.0              # exponentially weighted prediction-error variance (mV²)
+        self.weight = 0.0                 # sum of forgetting weights, for resid_var
+        self.t0_ns = None                 # origins keep the regressors small and well conditioned
+        self.temp0 = None
+        self.last_ns = None
+
+    @property
+    def ready(self):
+        return self.n >= self.warmup
+
+    @property
+    def coefficient(self):
+        return self.theta[1] if self.ready else np.nan
+
+    @property
+    def drift(self):
+        return self.theta[2] if self.ready else np.nan
+
+    @property
+    def coefficient_stderr(self):
+        if not self.ready:
+            return np.nan
+        return float(np.sqrt(max(self.resid_var * self.P[1, 1], 0.0)))
+
+    def update(self, time, temp, voltage):
+        """Fold in one sample; NaN temperatures or voltages are skipped."""
+        if np.isnan(temp) or np.isnan(voltage):
+            return self
+        t_ns = pd.Timestamp(time).value if not isinstance(time, (int, np.integer)) else int(time)
+        if self.t0_ns is None:
+            self.t0_ns, self.temp0 = t_ns, temp
+        hours = 1.0 if self.last_ns is None else max(t_ns - self.last_ns, 0) / NS_PER_HOUR
+        self.last_ns = t_ns
+        x = np.array([1.0, temp - self.temp0, (t_ns - self.t0_ns) / NS_PER_DAY])
+        y = voltage * 1000
+
+        lam = self.forgetting ** hours
+        Px = self.P @ x
+        gain = Px / (lam + x @ Px)
+        err = y - self.theta @ x
+        self.theta = self.theta + gain * err
+        self.P = (self.P - np.outer(gain, Px)) / lam
+        if self.ready:
+            # Prediction errors from before warm-up mostly measure the prior, not the noise
+            self.weight = lam * self.weight + 1
+            self.resid_var += (err * err - self.resid_var) / self.weight
+        self.n += 1
+        return self
+
+    def replay(self, times, temps, voltages):
+        """Update with every sample in order; returns the estimates after each as TIMELINE_COLUMNS."""
+        t_ns = pd.DatetimeIndex(times).as_unit('ns').asi8
+        temps = np.asarray(temps, dtype=np.float64)
+        voltages = np.asarray(voltages, dtype=np.float64)
+        out = np.full((len(t_ns), 4), np.nan)
+        for i in range(len(t_ns)):
+            self.update(t_ns[i], temps[i], voltages[i])
+            out[i] = (self.coefficient, self.coefficient_stderr, self.drift, self.n)
+        timeline = pd.DataFrame(out, columns=TIMELINE_COLUMNS[1:])
+        timeline.insert(0, 'Datetime', np.asarray(t_ns).view('datetime64[ns]'))
+        timeline['N'] = timeline['N'].astype(np.int64)
+        return timeline
+
+    def save(self, path):
+        """Write the estimator state to an .npz file."""
+        np.savez(path, forgetting=self.forgetting, warmup=self.warmup, n=self.n, theta=self.theta, P=self.P,
+                 resid=np.array([self.resid_var, self.weight]),
+                 origin=np.array([-1 if self.t0_ns is None else self.t0_ns,
+                                  -1 if self.last_ns is None else self.last_ns], dtype=np.int64),
+                 temp0=np.nan if self.temp0 is None else self.temp0)
+
+    @classmethod
+    def load(cls, path):
+        """Read a state written by save()."""
+        with np.load(path) as data:
+            est = cls(float(data['forgetting']), int(data['warmup']))
+            est.n = int(data['n'])
+            est.theta = data['theta'].copy()
+            est.P = data['P'].copy()
+            est.resid_var, est.weight = (float(v) for v in data['resid'])
+            t0, last = (int(v) for v in data['origin'])
+            est.t0_ns = None if t0 < 0 else t0
+            est.last_ns = None if last < 0 else last
+            est.temp0 = None if np.isnan(data['temp0']) else float(data['temp0'])
+        return est
+
+
+def thermal_timeline(data_dir=None, forgetting=DEFAULT_FORGETTING, estimator=None):
+    """Coefficient timeline for a bank's Midpoint voltage against its temperature export.
+
+    Pass a loaded `estimator` to continue from a saved state; only hours
+    after its last sample are replayed.
+    """
+    merged = load_aligned(data_dir).dropna(subset=['Temp_Midpoint'])
+    estimator = estimator or ThermalRLS(forgetting)
+    if estimator.last_ns is not None:
+        merged = merged[merged['Datetime'] > pd.Timestamp(estimator.last_ns)]
+    return estimator.replay(merged['Datetime'], merged['Temp_Midpoint'], merged['Midpoint'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Track the voltage-temperature coefficient with recursive least squares')
+    parser.add_argument('data_dirs', nargs='*', default=[None],
+                        help='one data directory per bank (default: $LIFEPO4_DATA_DIR or Data/)')
+    parser.add_argument('--forgetting', type=float, default=DEFAULT_FORGETTING,
+                        help=f'forgetting factor per hour (default: {DEFAULT_FORGETTING})')
+    parser.add_argument('--out', default=DEFAULT_OUT, help=f'output CSV (default: {DEFAULT_OUT})')
+    parser.add_argument('--state-dir', default=None,
+                        help='keep one estimator state per bank here; only new hours are processed')
+    args = parser.parse_args()
+
+    frames = []
+    restarted = []   # banks without a saved state, whose whole timeline is replayed
+    for data_dir in args.data_dirs:
+        bank = Path(data_dir).resolve().name if data_dir else 'default'
+        state_path = os.path.join(args.state_dir, f'{bank}.npz') if args.state_dir else None
+        if state_path and os.path.exists(state_path):
+            estimator = ThermalRLS.load(state_path)
+        else:
+            estimator = ThermalRLS(args.forgetting)
+            restarted.append(bank)
+        timeline = thermal_timeline(data_dir, estimator=estimator)
+        if state_path:
+            os.makedirs(args.state_dir, exist_ok=True)
+            estimator.save(state_path)
+        frames.append(timeline.assign(Bank=bank))
+        if estimator.ready:
+            print(f"{bank}: {len(timeline)} new hours, coefficient {estimator.coefficient:.3f} "
+                  f"± {estimator.coefficient_stderr:.3f} mV/°F, drift {estimator.drift:.2f} mV/day "
+                  f"(as of {pd.Timestamp(estimator.last_ns)})")
+        else:
+            print(f"{bank}: {len(timeline)} new hours, {estimator.n} of {estimator.warmup} warm-up samples")
+
+    result = pd.concat(frames, ignore_index=True)[['Bank'] + TIMELINE_COLUMNS]
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    if args.state_dir and os.path.exists(args.out):
+        # Saved states replay only new hours, which extend the earlier output
+        if restarted:
+            earlier = pd.read_csv(args.out, dtype={'Bank': str})
+            result = pd.concat([earlier[~earlier['Bank'].isin(restarted)], result], ignore_index=True)
+            result.to_csv(args.out, index=False)
+        else:
+            result.to_csv(args.out, index=False, mode='a', header=False)
+    else:
+        result.to_csv(args.out, index=False)
+    print(f"Saved: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Columnar Time-Series Store
+Month-partitioned, memory-mapped NumPy columns with time-range queries and predicate pushdown
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+TIME_COLUMN = 'timestamp'  # int64 ns, always present and sorted within a partition
+STATS_FILE = 'stats.json'
+
+_OPS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+
+def _to_ns(value):
+    return pd.Timestamp(value).as_unit('ns').value
+
+
+def _month_bounds(key):
+    """[start, end) of a YYYY-MM partition in epoch ns."""
+    start = np.datetime64(key, 'M')
+    return int(start.astype('datetime64[ns]').astype(np.int64)), \
+        int((start + 1).astype('datetime64[ns]').astype(np.int64))
+
+
+def _partition_may_match(stats, where):
+    """False when per-partition min/max prove no row can satisfy every predicate."""
+    for column, op, value in where:
+        col = stats['columns'].get(column)
+        if col is None or col['min'] is None:
+            continue
+        lo, hi = col['min'], col['max']
+        if op == '<' and not lo < value:
+            return False
+        if op == '<=' and not lo <= value:
+            return False
+        if op == '>' and not hi > value:
+            return False
+        if op == '>=' and not hi >= value:
+            return False
+        if op == '==' and not lo <= value <= hi:
+            return False
+        if op == '!=' and lo == hi == value:
+            return False
+    return True
+
+
+class TimeSeriesStore:
+    """A directory of series, each split into monthly partitions of .npy columns.
+
+    Layout: ``<root>/<series>/<YYYY-MM>/<column>.npy`` plus a ``stats.json``
+    per partition holding the row count, time bounds and per-column min/max.
+    Queries open only the partitions overlapping the requested time range
+    whose stats can satisfy the predicates, memory-map their columns and
+    slice rows with searchsorted, so untouched months are never read.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def series(self):
+        """Names of the stored series."""
+        if not self.root.is_dir():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def partitions(self, series, start=None, end=None):
+        """Partition keys (YYYY-MM) of a series overlapping [start, end)."""
+        series_dir = self.root / series
+        if not series_dir.is_dir():
+            return []
+        keys = sorted(p.name for p in series_dir.iterdir() if (p / STATS_FILE).exists())
+        start_ns = None if start is None else _to_ns(start)
+        end_ns = None if end is None else _to_ns(end)
+        selected = []
+        for key in keys:
+            lo, hi = _month_bounds(key)
+            if start_ns is not None and hi <= start_ns:
+                continue
+            if end_ns is not None and lo >= end_ns:
+                continue
+            selected.append(key)
+        return selected
+
+    def stats(self, series, key):
+        return json.loads((self.root / series / key / STATS_FILE).read_text())
+
+    def time_bounds(self, series):
+        """(first, last) Timestamp of a series from partition stats, or (None, None)."""
+        keys = self.partitions(series)
+        if not keys:
+            return None, None
+        return (pd.Timestamp(self.stats(series, keys[0])['t_min']),
+                pd.Timestamp(self.stats(series, keys[-1])['t_max']))
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _read_partition(self, series, key, columns=None, mmap=True):
+        part_dir = self.root / series / key
+        stats = self.stats(series, key)
+        names = [TIME_COLUMN] + [c for c in stats['columns'] if columns is None or c in columns]
+        mode = 'r' if mmap else None
+        return {name: np.load(part_dir / f'{name}.npy', mmap_mode=mode) for name in names}
+
+    def _write_partition(self, series, key, arrays):
+        part_dir = self.root / series / key
+        part_dir.mkdir(parents=True, exist_ok=True)
+        for name, arr in arrays.items():
+            tmp = part_dir / f'.{name}.tmp.npy'
+            np.save(tmp, np.ascontiguousarray(arr))
+            os.replace(tmp, part_dir / f'{name}.npy')
+        ts = arrays[TIME_COLUMN]
+        columns = {}
+        for name, arr in arrays.items():
+            if name == TIME_COLUMN:
+                continue
+            finite = arr[~np.isnan(arr)] if arr.dtype.kind == 'f' else arr
+            columns[name] = {
+                'dtype': arr.dtype.str,
+                'min': finite.min().item() if len(finite) else None,
+                'max': finite.max().item() if len(finite) else None,
+            }
+        stats = {
+            'rows': int(len(ts)),
+            't_min': int(ts[0]),
+            't_max': int(ts[-1]),
+            'columns': columns,
+        }
+        (part_dir / STATS_FILE).write_text(json.dumps(stats))
+
+    def append(self, series, df, time_col='Datetime'):
+        """Append rows to a series; rows whose timestamp already exists replace the old ones.
+
+        Only the months present in `df` are rewritten. Returns the number of
+        partitions touched.
+        """
+        ts = pd.DatetimeIndex(df[time_col]).as_unit('ns').asi8
+        values = {c: df[c].to_numpy() for c in df.columns if c != time_col}
+        months = ts.astype('datetime64[ns]').astype('datetime64[M]')
+        touched = 0
+        for month in np.unique(months):
+            key = str(month)
+            sel = months == month
+            new = {TIME_COLUMN: ts[sel]}
+            new.update({c: v[sel] for c, v in values.items()})
+            if (self.root / series / key / STATS_FILE).exists():
+                old = self._read_partition(series, key, mmap=False)
+                merged = {c: np.concatenate((old[c], new[c])) for c in new if c in old}
+            else:
+                merged = new
+            # Sort by time, keeping the newest copy of duplicated timestamps
+            order = np.argsort(merged[TIME_COLUMN], kind='stable')
+            t_sorted = merged[TIME_COLUMN][order]
+            last = np.r_[t_sorted[1:] != t_sorted[:-1], True]
+            keep = order[last]
+            self._write_partition(series, key, {c: arr[keep] for c, arr in merged.items()})
+            touched += 1
+        return touched
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def query(self, series, start=None, end=None, columns=None, where=(), time_col='Datetime'):
+        """Rows of `series` with start <= time < end as a DataFrame.
+
+        `columns` limits which .npy files are opened. `where` is a sequence of
+        (column, op, value) predicates with op in <, <=, >, >=, ==, !=;
+        partitions whose min/max rule a predicate out are skipped entirely.
+        """
+        where = list(where)
+        needed = None if columns is None else set(columns) | {c for c, _, _ in where}
+        start_ns = None if start is None else _to_ns(start)
+        end_ns = None if end is None else _to_ns(end)
+
+        pieces = []
+        for key in self.partitions(series, start, end):
+            stats = self.stats(series, key)
+            if not _partition_may_match(stats, where):
+                continue
+            part = self._read_partition(series, key, needed)
+            ts = part[TIME_COLUMN]
+            lo = 0 if start_ns is None else np.searchsorted(ts, start_ns, side='left')
+            hi = len(ts) if end_ns is None else np.searchsorted(ts, end_ns, side='left')
+            if hi <= lo:
+                continue
+            sliced = {name: arr[lo:hi] for name, arr in part.items()}
+            if where:
+                mask = np.ones(hi - lo, dtype=bool)
+                for column, op, value in where:
+                    mask &= _OPS[op](sliced[column], value)
+                sliced = {name: arr[mask] for name, arr in sliced.items()}
+            pieces.append(sliced)
+
+        if not pieces:
+            empty = {time_col: np.empty(0, dtype='datetime64[ns]')}
+            empty.update({c: np.empty(0) for c in (columns or [])})
+            return pd.DataFrame(empty)
+        names = [n for n in pieces[0] if n != TIME_COLUMN and (columns is None or n in columns)]
+        out = {time_col: np.concatenate([p[TIME_COLUMN] for p in pieces]).view('datetime64[ns]')}
+        out.update({n: np.concatenate([p[n] for p in pieces]) for n in names})
+        return pd.DataFrame(out)
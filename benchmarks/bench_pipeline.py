@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Analysis Pipeline Stages
+Times load, integrity, MA-60, rolling drift, merge_asof/align and figures on synthetic telemetry at several data sizes
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Scripts'))
+from align import align
+from data_loader import load_history, load_hourly, load_humidity, load_temperature
+from integrity import check_series
+from ma60 import MA60Aggregator
+from quantization import is_raw_reading
+from rolling_drift import rolling_ols
+from synthetic import generate, scaled_config, write_exports
+
+STAGES = ['load', 'load_cached', 'integrity', 'ma60', 'rolling_drift', 'merge_asof', 'align', 'figures']
+DEFAULT_SCALES = [1, 100]             # 10000 is supported but needs tens of GB for the history export
+DEFAULT_MAX_HISTORY_ROWS = 50_000_000
+DEFAULT_TOLERANCE = 1.5               # --compare flags stages slower than baseline by this factor
+
+
+def time_call(func, *args, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def load_all(data_dir, use_cache):
+    return {
+        'voltage': load_hourly(data_dir, use_cache=use_cache),
+        'temperature': load_temperature(data_dir, use_cache=use_cache),
+        'humidity': load_humidity(data_dir, use_cache=use_cache),
+        'history': load_history(data_dir, use_cache=use_cache),
+    }
+
+
+def merge_sensors(voltage, temperature, humidity):
+    # Same joins as battery_analysis.py section 4 and visualizations.py figure 4
+    merged = pd.merge_asof(voltage, temperature[['Datetime', 'Temp_Midpoint']],
+                           on='Datetime', tolerance=pd.Timedelta('1h'))
+    merged = merged.dropna(subset=['Temp_Midpoint'])
+    return pd.merge_asof(merged, humidity[['Datetime', 'Humidity']], on='Datetime', tolerance=pd.Timedelta('1h'))
+
+
+def align_sensors(voltage, temperature, humidity):
+    # The same join in one pass over both streams
+    return align(voltage, [(temperature, ['Temp_Midpoint']), (humidity, ['Humidity'])])
+
+
+def render_all(data_dir, out_dir):
+    from visualizations import FIGURES, prepare_data, render_figures
+    return render_figures(sorted(FIGURES), prepare_data(sorted(FIGURES), data_dir), out_dir)
+
+
+def run_scale(scale, stages, repeat=1, seed=0, max_history_rows=DEFAULT_MAX_HISTORY_ROWS):
+    """{stage: (seconds, rows processed)} for one data size."""
+    config = scaled_config(scale, seed=seed)
+    history_rows = config.history_days * 86_400 / config.history_interval_s
+    if history_rows > max_history_rows:
+        config = config._replace(history_days=config.history_days * max_history_rows / history_rows)
+        print(f"   History capped at {max_history_rows:,} rows ({history_rows:,.0f} at this scale)")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        t0 = time.perf_counter()
+        frames = generate(config)
+        write_exports(frames, data_dir)
+        rows = {name: len(df) for name, df in frames.items()}
+        del frames
+        print(f"   Generated {rows['voltage']:,} hourly rows, {rows['history']:,} history rows "
+              f"in {time.perf_counter() - t0:.1f} s")
+
+        if 'load' in stages:
+            results['load'] = (time_call(load_all, data_dir, False, repeat=repeat)[0], sum(rows.values()))
+        load_all(data_dir, True)  # populate the parsed-frame cache
+        t_cached, data = time_call(load_all, data_dir, True, repeat=repeat)
+        if 'load_cached' in stages:
+            results['load_cached'] = (t_cached, sum(rows.values()))
+
+        voltage = data['voltage']
+        if 'integrity' in stages:
+            results['integrity'] = (time_call(check_series, voltage['Datetime'], voltage['Min'], 'h', 10,
+                                              repeat=repeat)[0], len(voltage))
+        if 'ma60' in stages:
+            history = data['history']
+            raw = history[is_raw_reading(history['voltage'].to_numpy())]
+            results['ma60'] = (time_call(lambda: MA60Aggregator().update_frame(raw), repeat=repeat)[0], len(raw))
+        if 'rolling_drift' in stages:
+            results['rolling_drift'] = (time_call(rolling_ols, voltage['Datetime'], voltage['Midpoint'],
+                                                  pd.Timedelta(days=7), repeat=repeat)[0], len(voltage))
+        if 'merge_asof' in stages:
+            results['merge_asof'] = (time_call(merge_sensors, voltage, data['temperature'], data['humidity'],
+                                               repeat=repeat)[0], len(voltage))
+        if 'align' in stages:
+            results['align'] = (time_call(align_sensors, voltage, data['temperature'], data['humidity'],
+                                          repeat=repeat)[0], len(voltage))
+        if 'figures' in stages:
+            with tempfile.TemporaryDirectory() as out_dir:
+                results['figures'] = (time_call(render_all, data_dir, out_dir, repeat=1)[0],
+                                      rows['voltage'] + rows['history'])
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Lines for stages slower than `baseline` by more than `tolerance`."""
+    regressions = []
+    for scale, stages in results.items():
+        for stage, seconds in stages.items():
+            before = baseline.get(scale, {}).get(stage)
+            if before and seconds > before * tolerance:
+                regressions.append(f"   {stage} at {scale}x: {before:.3f} s -> {seconds:.3f} s "
+                                   f"({seconds / before:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=DEFAULT_SCALES,
+                        help="multiples of today's data size (default: 1 100)")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeat', type=int, default=3, help='best-of repeats per stage (figures: 1)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-history-rows', type=int, default=DEFAULT_MAX_HISTORY_ROWS)
+    parser.add_argument('--save', default=None, help='write timings to this JSON file')
+    parser.add_argument('--compare', default=None, help='baseline JSON from --save; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("PIPELINE STAGE BENCHMARK")
+    print("=" * 80)
+
+    timings = {}
+    for scale in args.scales:
+        label = f'{scale:g}'
+        print(f"\n{label}x today's data:")
+        results = run_scale(scale, args.stages, args.repeat, args.seed, args.max_history_rows)
+        for stage, (seconds, rows) in results.items():
+            print(f"   {stage:<14} {seconds*1000:>10.1f} ms  ({rows / seconds / 1e6:.2f} M rows/s)")
+        timings[label] = {stage: seconds for stage, (seconds, _) in results.items()}
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(timings, f, indent=2)
+        print(f"\n   Saved: {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(timings, json.load(f), args.tolerance)
+        print(f"\n   Regressions over {args.tolerance:g}x baseline: {len(regressions)}")
+        for line in regressions:
+            print(line)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
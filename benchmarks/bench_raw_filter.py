@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Raw vs Aggregated History Classifier
+Compares the per-row string test with the vectorized grid check on a synthetic history
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Scripts'))
+from quantization import is_raw_reading
+
+
+def synthetic_history_voltage(n_rows, aggregated_fraction=0.01, seed=0):
+    """Shelly-like voltages: 10 mV raw readings with a share of 6-decimal hourly means."""
+    rng = np.random.default_rng(seed)
+    voltage = np.round(13.24 + rng.normal(0, 0.01, n_rows), 2)
+    n_agg = int(n_rows * aggregated_fraction)
+    idx = rng.choice(n_rows, n_agg, replace=False)
+    voltage[idx] = np.round(13.24 + rng.normal(0, 0.003, n_agg), 6)
+    return voltage
+
+
+def legacy_is_raw(series):
+    return series.apply(lambda x: len(str(x).split('.')[-1]) <= 2)
+
+
+def time_call(func, *args, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000,
+                        help='synthetic history rows (default: 10M)')
+    parser.add_argument('--legacy-rows', type=int, default=1_000_000,
+                        help='rows timed with the string apply; 0 to skip (default: 1M)')
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"RAW-READING CLASSIFIER BENCHMARK ({args.rows:,} rows)")
+    print("=" * 80)
+
+    voltage = synthetic_history_voltage(args.rows)
+
+    t_vec, mask = time_call(is_raw_reading, voltage)
+    print(f"\n   Vectorized grid check: {t_vec*1000:.1f} ms "
+          f"({args.rows / t_vec / 1e6:.1f} M rows/s)")
+    print(f"   Raw readings: {mask.sum():,} / {args.rows:,}")
+
+    if args.legacy_rows > 0:
+        n = min(args.legacy_rows, args.rows)
+        series = pd.Series(voltage[:n])
+        t_legacy, legacy_mask = time_call(legacy_is_raw, series, repeat=1)
+        mismatches = int((legacy_mask.to_numpy() != mask[:n]).sum())
+        rate_legacy = n / t_legacy
+        print(f"\n   String apply ({n:,} rows): {t_legacy*1000:.1f} ms "
+              f"({rate_legacy / 1e6:.2f} M rows/s)")
+        print(f"   Projected for {args.rows:,} rows: {args.rows / rate_legacy:.1f} s")
+        print(f"   Speedup: {(args.rows / rate_legacy) / t_vec:.0f}x")
+        print(f"   Classification mismatches: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()